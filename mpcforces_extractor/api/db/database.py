@@ -1,11 +1,12 @@
 import os
 from typing import List, Optional, Dict
+import numpy as np
 from fastapi import HTTPException
 from sqlmodel import Session, create_engine, SQLModel, select, text
 from sqlalchemy.sql.expression import asc, desc
-from mpcforces_extractor.datastructure.rigids import MPC
+from mpcforces_extractor.datastructure.rigids import MPC, MPCPartForces
 from mpcforces_extractor.datastructure.entities import Node
-from mpcforces_extractor.datastructure.subcases import Subcase
+from mpcforces_extractor.datastructure.subcases import ForceType, Subcase
 from mpcforces_extractor.datastructure.loads import SPCCluster, SPC
 
 
@@ -116,8 +117,8 @@ class Database:
             for subcase in Subcase.subcases:
                 db_subcase = SubcaseDBModel(
                     id=subcase.subcase_id,
-                    node_id2mpcforces=subcase.node_id2mpcforces,
-                    node_id2spcforces=subcase.node_id2spcforces,
+                    node_id2mpcforces=subcase.get_node_id2forces(ForceType.MPCFORCE),
+                    node_id2spcforces=subcase.get_node_id2forces(ForceType.SPCFORCE),
                     time=subcase.time,
                 )
                 session.add(db_subcase)
@@ -125,23 +126,87 @@ class Database:
             # Commit to the database
             session.commit()
 
-            self.rbe2s = {
-                rbe2.id: rbe2 for rbe2 in session.exec(select(RBE2DBModel)).all()
-            }
-            self.rbe3s = {
-                rbe3.id: rbe3 for rbe3 in session.exec(select(RBE3DBModel)).all()
-            }
-            self.subcases = {
-                subcase.id: subcase
-                for subcase in session.exec(select(SubcaseDBModel)).all()
-            }
-            self.spcs = {
-                spc.node_id: spc for spc in session.exec(select(SPCDBModel)).all()
-            }
-            self.spc_clusters = {
-                spc_cluster.id: spc_cluster
-                for spc_cluster in session.exec(select(SPCClusterDBModel)).all()
-            }
+            self.load_tables(session)
+
+    def load_tables(self, session):
+        """
+        Function to read the MPCs, subcases, SPCs and SPC clusters of the database
+        """
+        self.rbe2s = {rbe2.id: rbe2 for rbe2 in session.exec(select(RBE2DBModel)).all()}
+        self.rbe3s = {rbe3.id: rbe3 for rbe3 in session.exec(select(RBE3DBModel)).all()}
+        self.subcases = {
+            subcase.id: subcase
+            for subcase in session.exec(select(SubcaseDBModel)).all()
+        }
+        self.spcs = {spc.node_id: spc for spc in session.exec(select(SPCDBModel)).all()}
+        self.spc_clusters = {
+            spc_cluster.id: spc_cluster
+            for spc_cluster in session.exec(select(SPCClusterDBModel)).all()
+        }
+
+    def update_subcases(self, subcase_ids: List[int]):
+        """
+        Function to add / update the given subcases (appended to the force files
+        of a running solver) without rebuilding the database
+        """
+        subcases = [Subcase.get_subcase_by_id(subcase_id) for subcase_id in subcase_ids]
+        with Session(self.engine) as session:
+            for subcase in subcases:
+                session.merge(
+                    SubcaseDBModel(
+                        id=subcase.subcase_id,
+                        node_id2mpcforces=subcase.get_node_id2forces(
+                            ForceType.MPCFORCE
+                        ),
+                        node_id2spcforces=subcase.get_node_id2forces(
+                            ForceType.SPCFORCE
+                        ),
+                        time=subcase.time,
+                    )
+                )
+
+            self.update_mpcs(subcases, session)
+
+            for db_spc in session.exec(select(SPCDBModel)).all():
+                if db_spc.node_id in SPC.node_id_2_instance:
+                    spc = SPC.node_id_2_instance[db_spc.node_id]
+                    db_spc.subcase_id2force = dict(spc.subcase_id2force)
+                    session.add(db_spc)
+
+            for db_cluster in session.exec(select(SPCClusterDBModel)).all():
+                if db_cluster.id in SPCCluster.id_2_instances:
+                    cluster = SPCCluster.id_2_instances[db_cluster.id]
+                    db_cluster.subcase_id2summed_forces = dict(
+                        cluster.subcase_id2summed_force
+                    )
+                    session.add(db_cluster)
+
+            session.commit()
+            self.load_tables(session)
+
+        # the node forces of the selected subcase are read again
+        self.last_subcase_id = None
+
+    def update_mpcs(self, subcases: List[Subcase], session):
+        """
+        Function to add the forces of the given subcases to the MPCs of the database
+        """
+        for mpc_config, db_model in [
+            (MPC_CONFIG.RBE2, RBE2DBModel),
+            (MPC_CONFIG.RBE3, RBE3DBModel),
+        ]:
+            mpcs = list(MPC.config_2_id_2_instance.get(mpc_config.value, {}).values())
+            part_forces = MPCPartForces(mpcs).get_subcase_id2part_id2forces(subcases)
+            for mpc, new_sub2part2force in zip(mpcs, part_forces):
+                db_mpc = session.get(db_model, mpc.element_id)
+                if db_mpc is None:
+                    continue
+                # the keys of the stored json are strings
+                sub2part2force = dict(db_mpc.subcase_id2part_id2forces)
+                for subcase_id, part_id2force in new_sub2part2force.items():
+                    sub2part2force[str(subcase_id)] = part_id2force
+                db_mpc.subcase_id2part_id2forces = sub2part2force
+                session.add(db_mpc)
 
     def populate_spcs(self, session):
         """
@@ -171,32 +236,30 @@ class Database:
         Function to populate the database with nodes
         """
         if load_all_nodes:  # Load in all the nodes
-            for node in Node.node_id2node.values():
-                db_node = NodeDBModel(
-                    id=node.id,
-                    coord_x=node.coords[0],
-                    coord_y=node.coords[1],
-                    coord_z=node.coords[2],
-                )
-                session.add(db_node)
+            node_ids = Node.table.ids
+            coords = Node.table.coords
         else:  # load in just the nodes that are used in the MPCs
-            unique_nodes = set()
+            unique_node_ids = set()
             for mpc_config in MPC_CONFIG:
                 if mpc_config.value not in MPC.config_2_id_2_instance:
                     continue
                 for mpc in MPC.config_2_id_2_instance[mpc_config.value].values():
-                    for node in mpc.nodes:
-                        unique_nodes.add(node)
-                    unique_nodes.add(mpc.master_node)
-
-            for node in unique_nodes:
-                db_node = NodeDBModel(
-                    id=node.id,
-                    coord_x=node.coords[0],
-                    coord_y=node.coords[1],
-                    coord_z=node.coords[2],
-                )
-                session.add(db_node)
+                    unique_node_ids.update(mpc.node_ids)
+                    unique_node_ids.add(mpc.master_node_id)
+
+            node_ids = np.array(sorted(unique_node_ids), dtype=np.int64)
+            coords = Node.table.coords[Node.table.rows(node_ids)]
+
+        for node_id, (coord_x, coord_y, coord_z) in zip(
+            node_ids.tolist(), coords.tolist()
+        ):
+            db_node = NodeDBModel(
+                id=node_id,
+                coord_x=coord_x,
+                coord_y=coord_y,
+                coord_z=coord_z,
+            )
+            session.add(db_node)
 
     def populate_mpcs(self, session):
         """
@@ -205,16 +268,16 @@ class Database:
         for mpc_config in MPC_CONFIG:
             if mpc_config.value not in MPC.config_2_id_2_instance:
                 continue
-            for mpc in MPC.config_2_id_2_instance[mpc_config.value].values():
-                mpc.get_part_id2force(None)
-                sub2part2force = mpc.get_subcase_id2part_id2force()
-
+            mpcs = list(MPC.config_2_id_2_instance[mpc_config.value].values())
+            # the part forces of all MPCs and subcases at once
+            part_forces = MPCPartForces(mpcs).get_subcase_id2part_id2forces()
+            for mpc, sub2part2force in zip(mpcs, part_forces):
                 if mpc_config == MPC_CONFIG.RBE2:
                     db_mpc = RBE2DBModel(
                         id=mpc.element_id,
                         config=mpc.mpc_config.name,  # Store enum as string
-                        master_node=mpc.master_node.id,
-                        nodes=",".join([str(node.id) for node in mpc.nodes]),
+                        master_node=mpc.master_node_id,
+                        nodes=",".join([str(node_id) for node_id in mpc.node_ids]),
                         part_id2nodes=mpc.part_id2node_ids,
                         subcase_id2part_id2forces=sub2part2force,
                     )
@@ -222,8 +285,8 @@ class Database:
                     db_mpc = RBE3DBModel(
                         id=mpc.element_id,
                         config=mpc.mpc_config.name,  # Store enum as string
-                        master_node=mpc.master_node.id,
-                        nodes=",".join([str(node.id) for node in mpc.nodes]),
+                        master_node=mpc.master_node_id,
+                        nodes=",".join([str(node_id) for node_id in mpc.node_ids]),
                         part_id2nodes=mpc.part_id2node_ids,
                         subcase_id2part_id2forces=sub2part2force,
                     )
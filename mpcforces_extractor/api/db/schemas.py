@@ -1,4 +1,6 @@
+from typing import List, Optional
 from sqlmodel import SQLModel
+from mpcforces_extractor.datastructure.entities import PartMode
 
 
 class RunExtractorRequest(SQLModel, table=False):
@@ -9,6 +11,14 @@ class RunExtractorRequest(SQLModel, table=False):
     fem_filename: str
     mpcf_filename: str
     spcf_filename: str
+    subcase_ids: Optional[List[int]] = None  # only these subcases, all if None
+    # the solver is still writing the force files: read the complete subcases only,
+    # the appended ones are added by /refresh-extractor
+    follow: bool = False
+    # parts by the element graph or by property id (graph free)
+    part_mode: PartMode = PartMode.GRAPH
+    # graph of the corner nodes only (the midside nodes are added to their parts)
+    corner_nodes_only: bool = False
 
 
 class DatabaseRequest(SQLModel, table=False):
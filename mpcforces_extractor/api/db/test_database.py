@@ -89,6 +89,21 @@ async def test_subcases():
     assert subcase.node_id2mpcforces["1"] == [1.0, 0, 0, 0, 0, 0]
 
 
+@pytest.mark.asyncio
+async def test_update_subcases():
+    db = await get_db()
+    subcase = Subcase(2, 2.0)
+    subcase.add_force(2, [2.0, 0, 0, 0, 0, 0], ForceType.MPCFORCE)
+    subcase.add_force(3, [2.0, 0, 0, 0, 0, 0], ForceType.MPCFORCE)
+    db.update_subcases([2])
+
+    subcases = await db.get_subcases()
+    assert [subcase.id for subcase in subcases] == [1, 2]
+    assert db.subcases[2].node_id2mpcforces["3"] == [2.0, 0, 0, 0, 0, 0]
+    rbe2 = (await db.get_rbe2s())[0]
+    assert sorted(rbe2.subcase_id2part_id2forces) == ["1", "2"]
+
+
 # remove the db.db after all test
 def test_teardown():
     db_save.close()
@@ -7,8 +7,9 @@ from mpcforces_extractor.force_extractor import (
     MPCForceExtractor,
     SPCForcesExtractor,
     FEMExtractor,
+    get_node_ids_of_interest,
 )
-from mpcforces_extractor.datastructure.entities import Node, Element1D, Element
+from mpcforces_extractor.datastructure.entities import Node, Element1D, Element, Part
 from mpcforces_extractor.datastructure.subcases import Subcase
 from mpcforces_extractor.datastructure.rigids import MPC
 from mpcforces_extractor.api.db.database import Database
@@ -47,25 +48,46 @@ async def run_extractor(request: Request, file_request: RunExtractorRequest):
         spcf_file_path = str(UPLOAD_FOLDER) + os.sep + spcf_file
 
         logger.log_header("Reading FEM File")
-        fem_file_extracter = FEMExtractor(fem_file_path, block_size)
+        fem_file_extracter = FEMExtractor(
+            fem_file_path,
+            block_size,
+            streaming=True,
+            cache_file_path=model_output_folder + f"/{model_name}_model.npz",
+            part_mode=file_request.part_mode,
+            corner_nodes_only=file_request.corner_nodes_only,
+        )
         fem_file_extracter.build_fem_data()
+        node_ids = get_node_ids_of_interest()
+        app = request.app
+        app.force_extractors = []
 
         if os.path.exists(mpcf_file_path):
             logger.log_header("Reading MPCF File")
-            mpc_force_extractor = MPCForceExtractor(mpcf_file_path)
-            mpc_force_extractor.build_subcase_data()
+            mpc_force_extractor = MPCForceExtractor(
+                mpcf_file_path,
+                streaming=True,
+                subcase_ids=file_request.subcase_ids,
+                node_ids=node_ids,
+            )
+            build_subcase_data(mpc_force_extractor, file_request.follow)
+            app.force_extractors.append(mpc_force_extractor)
 
         if os.path.exists(spcf_file_path):
             logger.log_header("Reading SPCF File")
-            spc_forces_extractor = SPCForcesExtractor(spcf_file_path)
-            spc_forces_extractor.build_subcase_data()
+            spc_forces_extractor = SPCForcesExtractor(
+                spcf_file_path,
+                streaming=True,
+                subcase_ids=file_request.subcase_ids,
+                node_ids=node_ids,
+            )
+            build_subcase_data(spc_forces_extractor, file_request.follow)
+            app.force_extractors.append(spc_forces_extractor)
             logger.log_header("Building SPC Clusters")
             SPCCluster.build_spc_cluster()
             SPCCluster.calculate_force_sum()
 
         logger.log_header("Database Operations")
         logger.start_timing("Populating Database")
-        app = request.app
         app.db = Database(model_output_folder + f"/{model_name}.db")
         app.db.populate_database()
         logger.stop_timing("Populating Database")
@@ -86,6 +108,50 @@ async def run_extractor(request: Request, file_request: RunExtractorRequest):
         raise HTTPException(status_code=500, detail=str(e)) from e
 
 
+@router.post("/refresh-extractor")
+async def refresh_extractor(request: Request):
+    """
+    Read the subcases appended to the force files since the last run / refresh
+    (run with follow while the solver is running) and add them to the open database
+    """
+    app = request.app
+    if not hasattr(app, "db") or not getattr(app, "force_extractors", None):
+        raise HTTPException(status_code=400, detail="Run the extractor first")
+
+    try:
+        logger = Logger()
+        logger.log_header("Refreshing the subcases")
+        subcase_ids = set()
+        for force_extractor in app.force_extractors:
+            subcase_ids.update(force_extractor.update_subcase_data())
+        subcase_ids = sorted(subcase_ids)
+        logger.log_info(f"New / updated subcases: {subcase_ids}")
+
+        if subcase_ids:
+            SPCCluster.calculate_force_sum()
+            logger.start_timing("Updating Database")
+            app.db.update_subcases(subcase_ids)
+            logger.stop_timing("Updating Database")
+
+        return {
+            "message": "Subcases refreshed successfully!",
+            "subcase_ids": subcase_ids,
+        }
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e)) from e
+
+
+def build_subcase_data(force_extractor, follow: bool) -> None:
+    """
+    Read the subcases of a force file, with follow only the complete ones
+    (the solver is still writing the file)
+    """
+    if follow:
+        force_extractor.update_subcase_data()
+    else:
+        force_extractor.build_subcase_data()
+
+
 def reset_instances():
     """
     Reset the instances of the data structures
@@ -95,6 +161,7 @@ def reset_instances():
     Node.reset()
     Element1D.reset()
     Element.reset_graph()
+    Part.reset()
     Subcase.reset()
     MPC.reset()
     SPCCluster.reset()
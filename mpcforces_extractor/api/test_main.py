@@ -1,7 +1,12 @@
 import os
+import tempfile
+from pathlib import Path
+from unittest.mock import patch
 from fastapi.testclient import TestClient
 from mpcforces_extractor.api.main import app
 from mpcforces_extractor.api.config import OUTPUT_FOLDER
+from mpcforces_extractor.api.routes import extractor
+from mpcforces_extractor.test_ressources.simple_model import get_simple_model_fem
 
 
 class TestRoutesFileUpload:
@@ -19,3 +24,74 @@ class TestRoutesFileUpload:
         assert response.json() == {"output_folder": str(OUTPUT_FOLDER)}
         actual_folder = os.getcwd() + "/data/output".replace("/", os.sep)
         assert response.json()["output_folder"] == actual_folder
+
+
+class TestRoutesExtractor:
+    """
+    Test the extractor routes
+    """
+
+    def test_follow_and_refresh(self):
+        """
+        Test that run-extractor with follow reads the complete subcases of a force
+        file which is still written and refresh-extractor adds the appended ones
+        """
+        table = [
+            "$SUBCASE              1\n",
+            "$TIME       1.00000000E+00\n",
+            "$MPC FORCE [REAL]\n",
+            "--------+-------------------------------------------------------------\n",
+            "  GRID #   X-FORCE      Y-FORCE      Z-FORCE      X-MOMENT     Y-MOMENT\n",
+            "--------+-------------------------------------------------------------\n",
+            "    6093  1.00000E+00  2.00000E+00\n",
+            "    6094  3.00000E+00\n",
+            "--------+-------------------------------------------------------------\n",
+            " \n",
+        ]
+        with tempfile.TemporaryDirectory() as folder:
+            with open(os.path.join(folder, "model.fem"), "w", encoding="utf-8") as file:
+                file.writelines(get_simple_model_fem())
+            mpcf_file_path = os.path.join(folder, "model.mpcf")
+            # the solver is writing the rows of the first subcase
+            with open(mpcf_file_path, "w", encoding="utf-8") as file:
+                file.writelines(table[:7])
+
+            client = TestClient(app)
+            with patch.object(extractor, "UPLOAD_FOLDER", Path(folder)), patch.object(
+                extractor, "OUTPUT_FOLDER", Path(folder) / "output"
+            ):
+                try:
+                    response = client.post(
+                        "api/v1/run-extractor",
+                        json={
+                            "fem_filename": "model.fem",
+                            "mpcf_filename": "model.mpcf",
+                            "spcf_filename": "model.spcf",
+                            "follow": True,
+                        },
+                    )
+                    assert response.status_code == 200
+                    assert app.db.subcases == {}
+                    response = client.post("api/v1/refresh-extractor")
+                    assert response.json()["subcase_ids"] == []
+
+                    with open(mpcf_file_path, "a", encoding="utf-8") as file:
+                        file.writelines(table[7:])
+                    response = client.post("api/v1/refresh-extractor")
+                    assert response.status_code == 200
+                    assert response.json()["subcase_ids"] == [1]
+
+                    assert list(app.db.subcases) == [1]
+                    assert app.db.subcases[1].node_id2mpcforces == {
+                        "6093": [1.0, 2.0, 0.0, 0.0, 0.0, 0.0],
+                        "6094": [3.0, 0.0, 0.0, 0.0, 0.0, 0.0],
+                    }
+                    assert "1" in app.db.rbe2s[9].subcase_id2part_id2forces
+                    response = client.get("api/v1/subcases")
+                    assert [subcase["id"] for subcase in response.json()] == [1]
+                finally:
+                    if hasattr(app, "db"):
+                        app.db.engine.dispose()
+                        del app.db
+                    app.force_extractors = []
+                    extractor.reset_instances()
@@ -0,0 +1,234 @@
+from typing import List
+import numpy as np
+
+
+def get_connected_components(
+    node_ids1: np.ndarray, node_ids2: np.ndarray, node_ids: np.ndarray = None
+) -> List[np.ndarray]:
+    """
+    This method returns the connected components of the graph given by the edges
+    (node_ids1[i], node_ids2[i]) as arrays of node ids (sorted). The components are
+    labelled with an array based union find: the roots of the edge ends are hooked
+    onto the smaller root and the paths are compressed until no edge joins two roots.
+    node_ids: the nodes of the graph in their order, also nodes without edges
+    (if None: the nodes of the edges in the order of their first appearance).
+    The components are ordered by their first node
+    """
+    node_ids1 = np.asarray(node_ids1, dtype=np.int64)
+    node_ids2 = np.asarray(node_ids2, dtype=np.int64)
+    # edges of a node to itself do not connect anything
+    not_loop = node_ids1 != node_ids2
+    node_ids1, node_ids2 = node_ids1[not_loop], node_ids2[not_loop]
+    if node_ids is None:
+        node_ids = np.column_stack((node_ids1, node_ids2)).reshape(-1)
+    node_ids = np.asarray(node_ids, dtype=np.int64)
+
+    unique_ids, first_index = np.unique(node_ids, return_index=True)
+    if len(unique_ids) == 0:
+        return []
+    ends1 = np.searchsorted(unique_ids, node_ids1)
+    ends2 = np.searchsorted(unique_ids, node_ids2)
+
+    parent = np.arange(len(unique_ids))
+    while True:
+        roots1, roots2 = parent[ends1], parent[ends2]
+        joining = roots1 != roots2
+        if not np.any(joining):
+            break
+        roots1, roots2 = roots1[joining], roots2[joining]
+        np.minimum.at(parent, np.maximum(roots1, roots2), np.minimum(roots1, roots2))
+        # path compression: every node points to its root again
+        while True:
+            grandparent = parent[parent]
+            if np.array_equal(grandparent, parent):
+                break
+            parent = grandparent
+
+    # order of the components: first appearance of any of their nodes
+    component_first = np.full(len(unique_ids), len(node_ids), dtype=np.int64)
+    np.minimum.at(component_first, parent, first_index)
+    order = np.lexsort((unique_ids, component_first[parent]))
+    roots = parent[order]
+    starts = np.flatnonzero(np.r_[True, roots[1:] != roots[:-1]])
+    return np.split(unique_ids[order], starts[1:])
+
+
+def flatten_node_ids(node_ids_per_element: List[List[int]]) -> tuple:
+    """
+    This method returns the node ids of all elements as one flat array and the index
+    of the element of every entry
+    """
+    lengths = np.fromiter(
+        (len(element_node_ids) for element_node_ids in node_ids_per_element),
+        dtype=np.int64,
+        count=len(node_ids_per_element),
+    )
+    flat = np.fromiter(
+        (
+            node_id
+            for element_node_ids in node_ids_per_element
+            for node_id in element_node_ids
+        ),
+        dtype=np.int64,
+        count=int(lengths.sum()),
+    )
+    return flat, np.repeat(np.arange(len(lengths)), lengths)
+
+
+def get_flat_star_edges(flat: np.ndarray, elements: np.ndarray) -> tuple:
+    """
+    This method returns the star edges (each node to the first node of its element)
+    of flat node ids, see flatten_node_ids. The entries of an element are consecutive
+    """
+    if len(flat) == 0:
+        return np.empty(0, dtype=np.int64), np.empty(0, dtype=np.int64)
+    element_start = np.r_[True, elements[1:] != elements[:-1]]
+    first_nodes = flat[element_start][np.cumsum(element_start) - 1]
+    return first_nodes, flat
+
+
+def get_star_edges(
+    node_ids_per_element: List[List[int]], node_ids: np.ndarray = None
+) -> tuple:
+    """
+    This method returns edges which connect the nodes of every element the same way
+    as a full clique (each node to the first node of the element) as two arrays.
+    node_ids: only these nodes are used, the edges connect the nodes of the element
+    which are in node_ids (connectivity of the induced subgraph)
+    """
+    flat, elements = flatten_node_ids(node_ids_per_element)
+    if node_ids is not None:
+        used = np.isin(flat, node_ids)
+        flat, elements = flat[used], elements[used]
+    return get_flat_star_edges(flat, elements)
+
+
+def get_component_labels(
+    components: List[np.ndarray], node_ids: np.ndarray
+) -> np.ndarray:
+    """
+    This method returns the index of the component of every node, -1 for nodes
+    which are in no component
+    """
+    node_ids = np.asarray(node_ids, dtype=np.int64).reshape(-1)
+    labels = np.full(len(node_ids), -1, dtype=np.int64)
+    if not components:
+        return labels
+    component_node_ids = np.concatenate(components)
+    component_labels = np.repeat(
+        np.arange(len(components)), [len(component) for component in components]
+    )
+    order = np.argsort(component_node_ids, kind="stable")
+    component_node_ids, component_labels = (
+        component_node_ids[order],
+        component_labels[order],
+    )
+    positions = np.minimum(
+        np.searchsorted(component_node_ids, node_ids), len(component_node_ids) - 1
+    )
+    found = component_node_ids[positions] == node_ids
+    labels[found] = component_labels[positions[found]]
+    return labels
+
+
+class CSRAdjacency:
+    """
+    This class stores the element -> node and the node -> element connectivity as
+    CSR index arrays (offsets + flat values), both built in one bulk pass.
+    The elements are addressed by their row (order of the given elements)
+    """
+
+    def __init__(self, element_ids, node_ids_per_element: List[List[int]]):
+        self.element_ids = np.asarray(element_ids, dtype=np.int64).reshape(-1)
+        # element -> nodes: element_node_ids[element_offsets[i]:element_offsets[i + 1]]
+        self.element_node_ids, element_rows = flatten_node_ids(node_ids_per_element)
+        self.element_offsets = np.zeros(len(self.element_ids) + 1, dtype=np.int64)
+        self.element_offsets[1:] = np.cumsum(
+            np.bincount(element_rows, minlength=len(self.element_ids))
+        )
+
+        # node -> elements: node_element_rows[node_offsets[j]:node_offsets[j + 1]]
+        # for the sorted node_ids, an element using a node twice is stored once
+        order = np.lexsort((element_rows, self.element_node_ids))
+        node_ids, element_rows = self.element_node_ids[order], element_rows[order]
+        new_pair = np.ones(len(node_ids), dtype=bool)
+        new_pair[1:] = (node_ids[1:] != node_ids[:-1]) | (
+            element_rows[1:] != element_rows[:-1]
+        )
+        node_ids, self.node_element_rows = node_ids[new_pair], element_rows[new_pair]
+        self.node_ids, counts = np.unique(node_ids, return_counts=True)
+        self.node_offsets = np.zeros(len(self.node_ids) + 1, dtype=np.int64)
+        self.node_offsets[1:] = np.cumsum(counts)
+        self.__element_order = np.argsort(self.element_ids, kind="stable")
+
+    def get_element_rows(self) -> np.ndarray:
+        """
+        This method returns the element row of every entry of element_node_ids
+        """
+        return np.repeat(
+            np.arange(len(self.element_ids)), np.diff(self.element_offsets)
+        )
+
+    def get_star_edges(self, node_ids: np.ndarray = None) -> tuple:
+        """
+        This method returns the star edges of the elements, see get_star_edges
+        """
+        flat, element_rows = self.element_node_ids, self.get_element_rows()
+        if node_ids is not None:
+            used = np.isin(flat, node_ids)
+            flat, element_rows = flat[used], element_rows[used]
+        return get_flat_star_edges(flat, element_rows)
+
+    def get_element_node_ids(self, element_id: int) -> np.ndarray:
+        """
+        This method returns the node ids of an element
+        """
+        row = self.get_element_row(element_id)
+        return self.element_node_ids[
+            self.element_offsets[row] : self.element_offsets[row + 1]
+        ]
+
+    def get_node_element_ids(self, node_id: int) -> np.ndarray:
+        """
+        This method returns the ids of the elements using a node (empty if none)
+        """
+        position = np.searchsorted(self.node_ids, node_id)
+        if position == len(self.node_ids) or self.node_ids[position] != node_id:
+            return np.empty(0, dtype=np.int64)
+        rows = self.node_element_rows[
+            self.node_offsets[position] : self.node_offsets[position + 1]
+        ]
+        return self.element_ids[rows]
+
+    def get_neighbor_element_ids(self, element_id: int) -> np.ndarray:
+        """
+        This method returns the sorted ids of the elements sharing at least one node
+        with the element (the element itself excluded)
+        """
+        positions = np.searchsorted(
+            self.node_ids, self.get_element_node_ids(element_id)
+        )
+        rows = np.concatenate(
+            [np.empty(0, dtype=np.int64)]
+            + [
+                self.node_element_rows[start:end]
+                for start, end in zip(
+                    self.node_offsets[positions], self.node_offsets[positions + 1]
+                )
+            ]
+        )
+        element_ids = np.unique(self.element_ids[rows])
+        return element_ids[element_ids != element_id]
+
+    def get_element_row(self, element_id: int) -> int:
+        """
+        This method returns the row of an element, raises a KeyError if it is unknown
+        """
+        position = np.searchsorted(
+            self.element_ids, element_id, sorter=self.__element_order
+        )
+        if position < len(self.element_ids):
+            row = self.__element_order[position]
+            if self.element_ids[row] == element_id:
+                return int(row)
+        raise KeyError(element_id)
@@ -1,34 +1,192 @@
-from typing import List, Dict
-import networkx as nx
+from typing import List, Dict, Tuple
+from enum import Enum
+import numpy as np
+from mpcforces_extractor.datastructure.connectivity import (
+    CSRAdjacency,
+    get_component_labels,
+    get_connected_components,
+    get_flat_star_edges,
+    get_star_edges,
+)
 from mpcforces_extractor.logging.logger import Logger
 
 
+class PartMode(Enum):
+    """
+    Enum to select how the parts are detected
+    """
+
+    GRAPH = "graph"  # connected nodes of the element graph
+    PROPERTY = "property"  # nodes of the same property id
+    PROPERTY_GRAPH = "property_graph"  # connected nodes of the same property id
+
+
+class NodeTable:
+    """
+    This class stores the nodes column wise: a sorted id array, a (N,3) coordinate
+    array and the lookup id -> row (binary search on the ids)
+    """
+
+    def __init__(self, node_ids=None, coords=None):
+        self.__ids = np.empty(0, dtype=np.int64)
+        self.__coords = np.empty((0, 3), dtype=np.float64)
+        self.__pending_ids: List[np.ndarray] = []
+        self.__pending_coords: List[np.ndarray] = []
+        if node_ids is not None:
+            self.extend(node_ids, coords)
+
+    def add(self, node_id: int, coords: List) -> None:
+        """
+        This method adds a single node
+        """
+        self.extend([node_id], [coords])
+
+    def extend(self, node_ids, coords) -> None:
+        """
+        This method adds many nodes at once, if an id exists already the new coords win
+        """
+        self.__pending_ids.append(np.asarray(node_ids, dtype=np.int64).reshape(-1))
+        self.__pending_coords.append(
+            np.asarray(coords, dtype=np.float64).reshape(-1, 3)
+        )
+
+    def __flush(self) -> None:
+        """
+        This method merges the added nodes into the sorted arrays
+        """
+        if not self.__pending_ids:
+            return
+        ids = np.concatenate([self.__ids] + self.__pending_ids)
+        coords = np.concatenate([self.__coords] + self.__pending_coords)
+        self.__pending_ids = []
+        self.__pending_coords = []
+
+        # stable sort: for duplicated ids the last added node is the last one of its run
+        order = np.argsort(ids, kind="stable")
+        ids = ids[order]
+        keep = np.ones(len(ids), dtype=bool)
+        keep[:-1] = ids[1:] != ids[:-1]
+        self.__ids = ids[keep]
+        self.__coords = coords[order][keep]
+
+    @property
+    def ids(self) -> np.ndarray:
+        """
+        Sorted node ids
+        """
+        self.__flush()
+        return self.__ids
+
+    @property
+    def coords(self) -> np.ndarray:
+        """
+        Coordinates (N,3), same order as the ids
+        """
+        self.__flush()
+        return self.__coords
+
+    def rows(self, node_ids) -> np.ndarray:
+        """
+        This method returns the rows of the given node ids, raises a KeyError if
+        a node does not exist
+        """
+        ids = self.ids
+        node_ids = np.asarray(node_ids, dtype=np.int64)
+        if len(ids) == 0:
+            if node_ids.size:
+                raise KeyError(int(node_ids.reshape(-1)[0]))
+            return np.zeros(node_ids.shape, dtype=np.int64)
+
+        rows = np.minimum(np.searchsorted(ids, node_ids), len(ids) - 1)
+        missing = ids[rows] != node_ids
+        if np.any(missing):
+            raise KeyError(int(node_ids[missing].reshape(-1)[0]))
+        return rows
+
+    def get_coords(self, node_id: int) -> List:
+        """
+        This method returns the coordinates of a node as a list
+        """
+        return self.coords[self.rows(node_id)].tolist()
+
+    def __contains__(self, node_id) -> bool:
+        ids = self.ids
+        row = np.searchsorted(ids, node_id)
+        return bool(row < len(ids) and ids[row] == node_id)
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+
+class NodeRegistry(dict):
+    """
+    Dict node_id -> Node. Nodes which are only stored in the node table are created on
+    first access, so Node instances only exist if someone asks for them
+    """
+
+    def __missing__(self, node_id):
+        return Node.from_table(node_id)
+
+
+def node_id_of(node) -> int:
+    """
+    This method returns the id of a node given either as a Node or as an id
+    """
+    if isinstance(node, Node):
+        return node.id
+    return int(node)
+
+
 class Node:
     """
     This class is used to store the nodes
     """
 
-    node_id2node: Dict = {}
+    __slots__ = ("id", "coords")
+
+    node_id2node: Dict = NodeRegistry()
+    table: NodeTable = NodeTable()
 
     def __init__(self, node_id: int, coords: List):
         self.id = node_id
         self.coords = coords
         Node.node_id2node[node_id] = self
-        self.connected_elements = []
+        Node.table.add(node_id, coords)
+
+    @staticmethod
+    def from_table(node_id: int) -> "Node":
+        """
+        This method creates the Node instance of a node in the node table
+        (without adding it to the table again)
+        """
+        node = Node.__new__(Node)
+        node.id = int(node_id)
+        node.coords = Node.table.get_coords(node_id)
+        Node.node_id2node[node.id] = node
+        return node
 
-    def add_element(self, element):
+    @staticmethod
+    def extend_table(node_ids, coords) -> None:
         """
-        This method adds the element to the connected elements
+        This method adds many nodes to the node table without creating Node instances
         """
-        if element not in self.connected_elements:
-            self.connected_elements.append(element)
+        Node.table.extend(node_ids, coords)
+
+        # Node instances of these ids are outdated now
+        if Node.node_id2node:
+            outdated = np.intersect1d(
+                np.fromiter(Node.node_id2node.keys(), dtype=np.int64), node_ids
+            )
+            for node_id in outdated.tolist():
+                del Node.node_id2node[node_id]
 
     @staticmethod
     def reset() -> None:
         """
-        This method resets the node_id2node dictionary
+        This method resets the node_id2node dictionary and the node table
         """
-        Node.node_id2node = {}
+        Node.node_id2node = NodeRegistry()
+        Node.table = NodeTable()
 
 
 class Element1D:
@@ -36,9 +194,11 @@ class Element1D:
     This class represents the 1D elements
     """
 
+    __slots__ = ("id", "property_id", "node1", "node2")
+
     all_elements = []
 
-    def __init__(self, element_id: int, property_id: int, node1: Node, node2: Node):
+    def __init__(self, element_id: int, property_id: int, node1: int, node2: int):
         self.id = element_id
         self.property_id = property_id
         self.node1 = node1
@@ -58,70 +218,268 @@ class Element:
     This class is used to store the 2D/3D elements
     """
 
+    __slots__ = ("id", "property_id", "keyword", "node_ids")
+
     element_id2element: Dict = {}
-    graph = nx.Graph()
     part_id2node_ids = {}
+    # element <-> node connectivity of all elements, rebuilt on first use after
+    # elements were added
+    adjacency: CSRAdjacency = CSRAdjacency([], [])
+    adjacency_outdated: bool = True
+    # centroids of the adjacency rows and the node coordinates they were computed of
+    centroids: np.ndarray = np.zeros((0, 3), dtype=np.float64)
+    centroid_coords: np.ndarray = np.zeros((0, 3), dtype=np.float64)
+    centroids_outdated: bool = True
+    # keyword: number of corner nodes, the other nodes of the card are midside nodes
+    keyword2corner_nodes: Dict[str, int] = {
+        "CTRIA3": 3,
+        "CTRIA6": 3,
+        "CQUAD4": 4,
+        "CQUAD8": 4,
+        "CHEXA": 8,
+        "CPENTA": 6,
+        "CTETRA": 4,
+    }
 
     @staticmethod
     def reset_graph():
         """
-        This method is used to reset the graph (very important for testing)
+        This method is used to reset the elements (very important for testing)
         """
-        Element.graph = nx.Graph()
         Element.element_id2element = {}
         Element.part_id2node_ids = {}
+        Element.adjacency = CSRAdjacency([], [])
+        Element.adjacency_outdated = True
+        Element.centroids_outdated = True
 
-    def __init__(self, element_id: int, property_id: int, nodes: list):
+    def __init__(
+        self, element_id: int, property_id: int, nodes: list, keyword: str = None
+    ):
+        """
+        nodes: Node instances or node ids
+        keyword: card name (e.g. CHEXA), without keyword all nodes are corner nodes
+        """
         self.id = element_id
         self.property_id = property_id
-        self.nodes = nodes
-        for node in nodes:
-            node.add_element(self)
-
-        # Graph - careful: Careless implementation regarding nodes:
-        # every node is connected to every other node.
-        # Real implementation should be done depending on element keyword
-        for node in nodes:
-            for node2 in nodes:
-                if node.id != node2.id:
-                    # add the edge to the graph if it does not exist
-                    if not Element.graph.has_edge(node, node2):
-                        Element.graph.add_edge(node, node2)
-
-        self.centroid = self.__calculate_centroid()
-        self.neighbors = []
+        self.keyword = keyword
+        self.node_ids = [node_id_of(node) for node in nodes]
         self.element_id2element[self.id] = self
         Element.part_id2node_ids = {}
+        Element.adjacency_outdated = True
+        Element.centroids_outdated = True
+
+    @property
+    def nodes(self) -> List[Node]:
+        """
+        The Node instances of the element (created from the node table if needed)
+        """
+        return [Node.node_id2node[node_id] for node_id in self.node_ids]
+
+    @property
+    def centroid(self) -> List[float]:
+        """
+        The centroid of the element (see get_centroids)
+        """
+        row = Element.get_adjacency().get_element_row(self.id)
+        return Element.get_centroids()[row].tolist()
+
+    @staticmethod
+    def get_centroids() -> np.ndarray:
+        """
+        This method returns the centroids (N,3) of all elements in the order of the
+        adjacency rows. They are computed on first use, in one vectorized pass per
+        number of element nodes, and again after elements or nodes changed
+        """
+        if (
+            Element.centroids_outdated
+            or Node.table.coords is not Element.centroid_coords
+        ):
+            adjacency = Element.get_adjacency()
+            counts = np.diff(adjacency.element_offsets)
+            centroids = np.zeros((len(counts), 3), dtype=np.float64)
+            for count in np.unique(counts[counts > 0]).tolist():
+                element_rows = np.flatnonzero(counts == count)
+                entries = adjacency.element_offsets[element_rows, None] + np.arange(
+                    count
+                )
+                rows = Node.table.rows(adjacency.element_node_ids[entries])
+                centroids[element_rows] = Node.table.coords[rows].mean(axis=1)
+            Element.centroids = centroids
+            Element.centroid_coords = Node.table.coords
+            Element.centroids_outdated = False
+        return Element.centroids
+
+    def get_corner_node_ids(self) -> List[int]:
+        """
+        This method returns the corner nodes of the element (the midside nodes of
+        higher order elements are left out)
+        """
+        n_corners = Element.keyword2corner_nodes.get(self.keyword, len(self.node_ids))
+        return self.node_ids[:n_corners]
+
+    @staticmethod
+    def get_adjacency() -> CSRAdjacency:
+        """
+        This method returns the CSR connectivity of all elements (built on first use)
+        """
+        if Element.adjacency_outdated:
+            elements = Element.element_id2element.values()
+            Element.adjacency = CSRAdjacency(
+                [element.id for element in elements],
+                [element.node_ids for element in elements],
+            )
+            Element.adjacency_outdated = False
+        return Element.adjacency
+
+    @staticmethod
+    def get_edges(node_ids=None, corner_nodes_only: bool = False) -> tuple:
+        """
+        This method returns the edges of the element graph as two node id arrays, every
+        element connects all of its nodes. node_ids: only the edges between these nodes
+        (the induced subgraph)
+        corner_nodes_only: the midside nodes are left out of the graph
+        """
+        if corner_nodes_only:
+            return get_star_edges(
+                [
+                    element.get_corner_node_ids()
+                    for element in Element.element_id2element.values()
+                ],
+                node_ids,
+            )
+        return Element.get_adjacency().get_star_edges(node_ids)
 
-    def __calculate_centroid(self):
+    @staticmethod
+    def add_midside_nodes(components: List[np.ndarray]) -> List[np.ndarray]:
         """
-        This method calculates the centroid of the element
+        This method adds the midside nodes to the components of the corner node graph,
+        a midside node belongs to the component of the first node of its element.
+        Nodes which are in a component already keep it.
+        The parts are the same as the ones of the full graph for conforming meshes only:
+        if a midside node is the corner node of another element (non conforming mesh)
+        it does not join the components of both elements
         """
-        centroid = [0, 0, 0]
-        for node in self.nodes:
-            for i in range(3):
-                centroid[i] += node.coords[i]
-        for i in range(3):
-            centroid[i] /= len(self.nodes)
-        return centroid
+        first_node_ids, node_ids = get_star_edges(
+            [
+                element.node_ids[:1]
+                + element.node_ids[len(element.get_corner_node_ids()) :]
+                for element in Element.element_id2element.values()
+            ]
+        )
+        labels = get_component_labels(components, first_node_ids)
+        new = (labels >= 0) & (get_component_labels(components, node_ids) < 0)
+        node_ids, first_index = np.unique(node_ids[new], return_index=True)
+        labels = labels[new][first_index]
+        if len(node_ids) == 0:
+            return components
+
+        order = np.argsort(labels, kind="stable")
+        new_node_ids = np.split(
+            node_ids[order], np.cumsum(np.bincount(labels, minlength=len(components)))
+        )
+        return [
+            np.union1d(component, component_new_node_ids)
+            for component, component_new_node_ids in zip(components, new_node_ids)
+        ]
 
     @staticmethod
-    def get_part_id2node_ids_graph(force_update: bool = False) -> Dict:
+    def get_part_id2node_ids_graph(
+        force_update: bool = False, corner_nodes_only: bool = False
+    ) -> Dict:
         """
         This method is used to get the part_id2node_ids using the graph
+        corner_nodes_only: the graph is built of the corner nodes only, the midside
+        nodes are added to the part of their element afterwards
         """
         if force_update or not Part.part_id2node_ids:
             logger = Logger()
             logger.start_timing("Building the part_id2node_ids using the graph")
-            connected_components = list(nx.connected_components(Element.graph.copy()))
+            connected_components = get_connected_components(
+                *Element.get_edges(corner_nodes_only=corner_nodes_only)
+            )
+            if corner_nodes_only:
+                connected_components = Element.add_midside_nodes(connected_components)
             logger.stop_timing("Building the part_id2node_ids using the graph")
 
-            for _, connected_component in enumerate(connected_components):
-                Part(connected_component)
+            for connected_component in connected_components:
+                Part(connected_component.tolist())
 
             return Part.part_id2node_ids
         return Part.part_id2node_ids
 
+    @staticmethod
+    def get_part_id2node_ids_property(
+        force_update: bool = False, connectivity: bool = False
+    ) -> Dict:
+        """
+        This method is used to get the part_id2node_ids from the property ids of the
+        elements, no graph is built. A node belongs to the property of the last element
+        using it (as the node2property of the FemFileReader), the parts are ordered by
+        the first element of their property
+        connectivity: the nodes of a property are split into their connected pieces
+        """
+        if force_update or not Part.part_id2node_ids:
+            logger = Logger()
+            logger.start_timing("Building the part_id2node_ids using the properties")
+            elements = list(Element.element_id2element.values())
+            adjacency = Element.get_adjacency()
+            flat, element_index = (
+                adjacency.element_node_ids,
+                adjacency.get_element_rows(),
+            )
+            entry_property_ids = np.fromiter(
+                (element.property_id for element in elements),
+                dtype=np.int64,
+                count=len(elements),
+            )[element_index]
+
+            # last element wins: first appearance in the reversed entries
+            node_ids, last_index = np.unique(flat[::-1], return_index=True)
+            node_property_ids = entry_property_ids[::-1][last_index]
+
+            if connectivity:
+                used = (
+                    node_property_ids[np.searchsorted(node_ids, flat)]
+                    == entry_property_ids
+                )
+                flat, element_index = flat[used], element_index[used]
+                parts = get_connected_components(
+                    *get_flat_star_edges(flat, element_index), flat
+                )
+            else:
+                property_ids, first_index = np.unique(
+                    entry_property_ids, return_index=True
+                )
+                ranks = np.empty(len(property_ids), dtype=np.int64)
+                ranks[np.argsort(first_index)] = np.arange(len(property_ids))
+                node_ranks = ranks[np.searchsorted(property_ids, node_property_ids)]
+                parts = np.split(
+                    node_ids[np.argsort(node_ranks, kind="stable")],
+                    np.cumsum(np.bincount(node_ranks, minlength=len(property_ids)))[
+                        :-1
+                    ],
+                )
+            logger.stop_timing("Building the part_id2node_ids using the properties")
+
+            for part_node_ids in parts:
+                if len(part_node_ids) > 0:
+                    Part(part_node_ids.tolist())
+        return Part.part_id2node_ids
+
+    @staticmethod
+    def get_part_id2node_ids(force_update: bool = False) -> Dict:
+        """
+        This method is used to get the part_id2node_ids with the selected Part.mode
+        (and Part.corner_nodes_only for the graph)
+        """
+        if Part.mode == PartMode.GRAPH:
+            return Element.get_part_id2node_ids_graph(
+                force_update, corner_nodes_only=Part.corner_nodes_only
+            )
+        return Element.get_part_id2node_ids_property(
+            force_update, connectivity=Part.mode == PartMode.PROPERTY_GRAPH
+        )
+
 
 class Part:
     """
@@ -131,14 +489,62 @@ class Part:
 
     total_parts = 0
     part_id2node_ids = {}
+    mode: PartMode = PartMode.GRAPH
+    # PartMode.GRAPH: the graph of the corner nodes only, see get_part_id2node_ids_graph
+    corner_nodes_only: bool = False
+    # node -> part lookup: sorted node ids and their part ids, rebuilt on first use
+    # after the parts changed
+    label_node_ids: np.ndarray = np.empty(0, dtype=np.int64)
+    labels: np.ndarray = np.empty(0, dtype=np.int64)
+    labels_outdated: bool = True
 
-    def __init__(self, nodes: List[Node]):
+    def __init__(self, node_ids: List[int]):
         self.id = Part.total_parts + 1
         Part.total_parts += 1
-        self.node_id2Node = {}
-        for node in nodes:
-            self.node_id2Node[node.id] = node
-        self.part_id2node_ids[self.id] = [node.id for node in nodes]
+        self.node_ids = node_ids
+        self.part_id2node_ids[self.id] = node_ids
+        Part.labels_outdated = True
+
+    @staticmethod
+    def get_labels() -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This method returns the node -> part lookup: the sorted node ids of all parts
+        and their part ids (built on first use)
+        """
+        if Part.labels_outdated:
+            node_ids_per_part = [
+                np.asarray(part_node_ids, dtype=np.int64)
+                for part_node_ids in Part.part_id2node_ids.values()
+            ]
+            all_node_ids = np.concatenate(
+                [np.empty(0, dtype=np.int64)] + node_ids_per_part
+            )
+            part_ids = np.repeat(
+                np.fromiter(Part.part_id2node_ids.keys(), dtype=np.int64),
+                [len(part_node_ids) for part_node_ids in node_ids_per_part],
+            )
+            order = np.argsort(all_node_ids, kind="stable")
+            Part.label_node_ids = all_node_ids[order]
+            Part.labels = part_ids[order]
+            Part.labels_outdated = False
+        return Part.label_node_ids, Part.labels
+
+    @staticmethod
+    def get_part_ids(node_ids) -> np.ndarray:
+        """
+        This method returns the part id of every node, 0 for nodes without a part
+        """
+        label_node_ids, labels = Part.get_labels()
+        node_ids = np.asarray(node_ids, dtype=np.int64).reshape(-1)
+        part_ids = np.zeros(len(node_ids), dtype=np.int64)
+        if len(label_node_ids) == 0:
+            return part_ids
+        positions = np.minimum(
+            np.searchsorted(label_node_ids, node_ids), len(label_node_ids) - 1
+        )
+        found = label_node_ids[positions] == node_ids
+        part_ids[found] = labels[positions[found]]
+        return part_ids
 
     @staticmethod
     def reset():
@@ -147,3 +553,4 @@ class Part:
         """
         Part.total_parts = 0
         Part.part_id2node_ids = {}
+        Part.labels_outdated = True
@@ -1,7 +1,8 @@
 from typing import List, Dict
-import networkx as nx
-from mpcforces_extractor.datastructure.entities import Node, Element
-from mpcforces_extractor.datastructure.subcases import Subcase
+import numpy as np
+from mpcforces_extractor.datastructure.connectivity import get_connected_components
+from mpcforces_extractor.datastructure.entities import Element
+from mpcforces_extractor.datastructure.subcases import ForceType, Subcase
 from mpcforces_extractor.logging.logger import Logger
 
 
@@ -10,6 +11,8 @@ class Moment:
     Simple representation of a moment from the .fem file
     """
 
+    __slots__ = ("id", "node_id", "system_id", "compenents")
+
     def __init__(
         self,
         *,
@@ -32,6 +35,8 @@ class Force:
     Simple representation of a force from the .fem file
     """
 
+    __slots__ = ("id", "node_id", "system_id", "compenents")
+
     def __init__(
         self,
         *,
@@ -54,6 +59,8 @@ class SPC:
     Simple representation of a SPC from the .fem file (Single Point Constraint)
     """
 
+    __slots__ = ("node_id", "system_id", "dofs", "subcase_id2force")
+
     node_id_2_instance = {}
 
     def __init__(
@@ -77,6 +84,13 @@ class SPC:
         """
         SPC.node_id_2_instance = {}
 
+    @staticmethod
+    def get_node_ids() -> np.ndarray:
+        """
+        This method returns the sorted ids of all SPC nodes
+        """
+        return np.unique(np.array(list(SPC.node_id_2_instance.keys()), dtype=np.int64))
+
 
 class SPCCluster:
     """
@@ -105,23 +119,21 @@ class SPCCluster:
 
         logger = Logger()
         logger.start_timing("Building SPC Clusters")
-        graph: nx.Graph = Element.graph.copy()
-
-        # add the SPC nodes to the graph if they are not already in the graph
-        for node_id, _ in SPC.node_id_2_instance.items():
-            node = Node.node_id2node[node_id]
-            if node not in graph:
-                graph.add_node(Node.node_id2node[node_id])
-
-        all_spc_nodes = set()
-        for node_id, _ in SPC.node_id_2_instance.items():
-            all_spc_nodes.add(Node.node_id2node[node_id])
-        spc_graph = graph.subgraph(all_spc_nodes)
-        connected_components = list(nx.connected_components(spc_graph))
+
+        # graph of the SPC nodes (also the ones without any element): the
+        # elements only connect their SPC nodes
+        spc_node_ids = np.fromiter(
+            SPC.node_id_2_instance.keys(),
+            dtype=np.int64,
+            count=len(SPC.node_id_2_instance),
+        )
+        connected_components = get_connected_components(
+            *Element.get_edges(spc_node_ids), spc_node_ids
+        )
         for connected_component in connected_components:
             spcs = []
-            for node in connected_component:
-                spcs.append(SPC.node_id_2_instance[node.id])
+            for node_id in connected_component.tolist():
+                spcs.append(SPC.node_id_2_instance[node_id])
             SPCCluster(spcs)
 
         # user info
@@ -144,10 +156,12 @@ class SPCCluster:
         # Calculate the sum of the forces for each spc cluster
         logger = Logger()
         logger.start_timing("Calculating the sum of the forces for each SPC Cluster")
-        for _, spc_cluster in SPCCluster.id_2_instances.items():
-            subcase_id2summed_force = {}
-            for subcase in Subcase.subcases:
-                node_id2forces = subcase.node_id2spcforces
+        for spc_cluster in SPCCluster.id_2_instances.values():
+            spc_cluster.subcase_id2summed_force = {}
+        for subcase in Subcase.subcases:
+            # the dict of the forces is built once per subcase
+            node_id2forces = subcase.get_node_id2forces(ForceType.SPCFORCE)
+            for spc_cluster in SPCCluster.id_2_instances.values():
                 sum_forces = [0, 0, 0, 0, 0, 0]
                 for spc in spc_cluster.spcs:
                     if spc.node_id not in node_id2forces:
@@ -159,8 +173,7 @@ class SPCCluster:
                     spc.subcase_id2force[subcase.subcase_id] = force_vector
 
                     sum_forces = [sf + f for sf, f in zip(sum_forces, force_vector)]
-                subcase_id2summed_force[subcase.subcase_id] = sum_forces
-            spc_cluster.subcase_id2summed_force = subcase_id2summed_force
+                spc_cluster.subcase_id2summed_force[subcase.subcase_id] = sum_forces
         logger.stop_timing("Calculating the sum of the forces for each SPC Cluster")
 
     @staticmethod
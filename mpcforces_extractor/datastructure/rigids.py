@@ -1,6 +1,12 @@
 from typing import Dict, List
 from enum import Enum
-from mpcforces_extractor.datastructure.entities import Node, Element
+import numpy as np
+from mpcforces_extractor.datastructure.entities import (
+    Node,
+    Element,
+    Part,
+    node_id_of,
+)
 from mpcforces_extractor.datastructure.subcases import Subcase, ForceType
 from mpcforces_extractor.logging.logger import Logger
 
@@ -19,6 +25,15 @@ class MPC:
     This class is a Multiple Point Constraint (MPC) class that is used to store the nodes and the dofs
     """
 
+    __slots__ = (
+        "element_id",
+        "mpc_config",
+        "master_node_id",
+        "node_ids",
+        "dofs",
+        "part_id2node_ids",
+    )
+
     config_2_id_2_instance: Dict[int, "MPC"] = {}
 
     def __init__(
@@ -30,12 +45,17 @@ class MPC:
         nodes: List,
         dofs: str,
     ):
+        """
+        master_node / nodes: Node instances or node ids
+        """
         self.element_id: int = element_id
         self.mpc_config: MPC_CONFIG = mpc_config
+        self.master_node_id: int = None
         if master_node is None:
             Logger().log_warn("Master_node2coords is None for element_id", element_id)
-        self.master_node = master_node
-        self.nodes: List = nodes
+        else:
+            self.master_node_id = node_id_of(master_node)
+        self.node_ids: List[int] = [node_id_of(node) for node in nodes]
         self.dofs: int = dofs
         self.part_id2node_ids = {}
 
@@ -49,6 +69,22 @@ class MPC:
             )
         MPC.config_2_id_2_instance[mpc_config.value][element_id] = self
 
+    @property
+    def master_node(self) -> Node:
+        """
+        The Node instance of the master node (created from the node table if needed)
+        """
+        if self.master_node_id is None:
+            return None
+        return Node.node_id2node[self.master_node_id]
+
+    @property
+    def nodes(self) -> List[Node]:
+        """
+        The Node instances of the slave nodes (created from the node table if needed)
+        """
+        return [Node.node_id2node[node_id] for node_id in self.node_ids]
+
     @staticmethod
     def reset():
         """
@@ -56,40 +92,128 @@ class MPC:
         """
         MPC.config_2_id_2_instance = {}
 
-    def get_part_id2force(self, subcase: Subcase) -> Dict:
+    @staticmethod
+    def get_node_ids() -> np.ndarray:
         """
-        This method is used to get the forces for each part of the MPC (connected slave nodes)
+        This method returns the sorted ids of all master and slave nodes of all MPCs
+        """
+        node_ids = []
+        for id_2_instance in MPC.config_2_id_2_instance.values():
+            for mpc in id_2_instance.values():
+                node_ids += mpc.node_ids
+                if mpc.master_node_id is not None:
+                    node_ids.append(mpc.master_node_id)
+        return np.unique(np.array(node_ids, dtype=np.int64))
+
+    def get_part_id2node_ids(self) -> Dict:
+        """
+        This method returns the nodes of the MPC (slaves and master) grouped by the
+        connected parts, only the parts the MPC touches. Built on first use
         """
-
         if not self.part_id2node_ids:
-            # Connected groups of nodes - get then the intersection with the slave nodes
-            part_id2connected_node_ids = Element.get_part_id2node_ids_graph()
+            # the connected parts have to exist for the node -> part lookup
+            Element.get_part_id2node_ids()
+            mpc_node_ids = list(dict.fromkeys(self.node_ids))
+            if (
+                self.master_node_id is not None
+                and self.master_node_id not in mpc_node_ids
+            ):
+                mpc_node_ids.append(self.master_node_id)
+
             part_id2node_ids = {}
-            mpc_node_ids = [node.id for node in self.nodes]
-            mpc_node_ids.append(self.master_node.id)
-            for part_id, node_ids in part_id2connected_node_ids.items():
-                part_id2node_ids[part_id] = list(
-                    set(node_ids).intersection(mpc_node_ids)
-                )
+            part_ids = Part.get_part_ids(mpc_node_ids).tolist()
+            for part_id, node_id in sorted(
+                zip(part_ids, mpc_node_ids), key=lambda x: x[0]
+            ):
+                if part_id:
+                    part_id2node_ids.setdefault(part_id, []).append(node_id)
 
             self.part_id2node_ids = part_id2node_ids
+        return self.part_id2node_ids
 
-        # Calculate the summed forces for each part
-        part_id2forces = {}
-        for part_id, node_ids in self.part_id2node_ids.items():
-            sum_forces = [0, 0, 0]
-            if subcase is not None:
-                sum_forces = subcase.get_sum_forces(node_ids, ForceType.MPCFORCE)
-            part_id2forces[part_id] = sum_forces
-        return part_id2forces
+    def get_part_id2force(self, subcase: Subcase) -> Dict:
+        """
+        This method is used to get the forces for each part of the MPC (connected slave nodes)
+        """
+        if subcase is None:
+            return {part_id: [0, 0, 0] for part_id in self.get_part_id2node_ids()}
+        return MPCPartForces([self]).get_subcase_id2part_id2forces([subcase])[0][
+            subcase.subcase_id
+        ]
 
     def get_subcase_id2part_id2force(self) -> Dict:
         """
         This method is used to get the forces for each part of the MPC (connected slave nodes)
         """
+        return MPCPartForces([self]).get_subcase_id2part_id2forces()[0]
+
 
-        subcase_id2part_id2forces = {}
-        for subcase in Subcase.subcases:
-            part_id2forces = self.get_part_id2force(subcase)
-            subcase_id2part_id2forces[subcase.subcase_id] = part_id2forces
-        return subcase_id2part_id2forces
+class MPCPartForces:
+    """
+    This class sums the MPC forces of the parts of many MPCs for all subcases at once.
+    Every (MPC, part) pair is a row of a sparse incidence (pair x node), stored as the
+    pair and the node id of every entry. The part forces of a subcase are the product
+    of the incidence with the force array of the subcase
+    """
+
+    def __init__(self, mpcs: List[MPC]):
+        self.mpcs = mpcs
+        # (index of the MPC, part_id) of the rows
+        self.pairs = []
+        pair_rows = []
+        node_ids = []
+        for mpc_index, mpc in enumerate(mpcs):
+            for part_id, part_node_ids in mpc.get_part_id2node_ids().items():
+                pair_rows += [len(self.pairs)] * len(part_node_ids)
+                node_ids += part_node_ids
+                self.pairs.append((mpc_index, part_id))
+        self.pair_rows = np.array(pair_rows, dtype=np.int64)
+        self.node_ids = np.array(node_ids, dtype=np.int64)
+        # rows of the node ids in the node index, the index and its size they are for
+        self.rows = np.empty(0, dtype=np.int64)
+        self.rows_index = None
+        self.rows_index_size = -1
+
+    def get_rows(self) -> np.ndarray:
+        """
+        This method returns the rows of the node ids in the shared node index of the
+        subcases, they are only looked up again after the index changed
+        """
+        node_index = Subcase.node_index
+        if node_index is not self.rows_index or len(node_index) != self.rows_index_size:
+            self.rows = node_index.rows(self.node_ids)
+            self.rows_index = node_index
+            self.rows_index_size = len(node_index)
+        return self.rows
+
+    def get_part_forces(self, subcase: Subcase) -> np.ndarray:
+        """
+        This method returns the summed MPC forces (n_pairs, 6) of the pairs for a
+        subcase, nodes without forces count as 0
+        """
+        forces = subcase.forces[ForceType.MPCFORCE]
+        rows = self.get_rows()
+        found = (rows >= 0) & (rows < len(forces))
+        # one bincount over all columns: bin pair_row * 6 + column
+        bins = (self.pair_rows[found] * 6)[:, None] + np.arange(6)
+        return np.bincount(
+            bins.reshape(-1),
+            weights=forces[rows[found]].reshape(-1),
+            minlength=len(self.pairs) * 6,
+        ).reshape(-1, 6)
+
+    def get_subcase_id2part_id2forces(self, subcases: List[Subcase] = None) -> List:
+        """
+        This method returns the subcase_id2part_id2forces dict of every MPC (same order
+        as the MPCs) for the given subcases (all if None)
+        """
+        if subcases is None:
+            subcases = Subcase.subcases
+        results = [{} for _ in self.mpcs]
+        for subcase in subcases:
+            for result in results:
+                result[subcase.subcase_id] = {}
+            part_forces = self.get_part_forces(subcase).tolist()
+            for (mpc_index, part_id), forces in zip(self.pairs, part_forces):
+                results[mpc_index][subcase.subcase_id][part_id] = forces
+        return results
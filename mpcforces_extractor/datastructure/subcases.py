@@ -1,5 +1,7 @@
-from typing import List
+from collections.abc import Mapping
+from typing import Dict, Iterator, List, Tuple
 from enum import Enum
+import numpy as np
 
 
 class ForceType(Enum):
@@ -11,14 +13,133 @@ class ForceType(Enum):
     SPCFORCE = 2
 
 
+class NodeIndex:
+    """
+    This class maps node ids to rows of the force arrays. The rows are given in the
+    order the nodes are added, the index is shared by all subcases.
+    The ids are kept in a buffer which grows geometrically, new ids are merged into
+    the sorted ids instead of sorting all of them again
+    """
+
+    def __init__(self):
+        self.__buffer = np.empty(0, dtype=np.int64)
+        self.__size = 0
+        self.__order = np.empty(0, dtype=np.int64)
+        self.__sorted_ids = np.empty(0, dtype=np.int64)
+
+    @property
+    def ids(self) -> np.ndarray:
+        """
+        The node ids in the order of their rows
+        """
+        return self.__buffer[: self.__size]
+
+    def rows(self, node_ids) -> np.ndarray:
+        """
+        This method returns the rows of the node ids, -1 for unknown ids
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int64).reshape(-1)
+        rows = np.full(len(node_ids), -1, dtype=np.int64)
+        if self.__size == 0:
+            return rows
+        # sorted queries keep the binary searches cache friendly
+        query_order = np.argsort(node_ids, kind="stable")
+        sorted_node_ids = node_ids[query_order]
+        positions = np.minimum(
+            np.searchsorted(self.__sorted_ids, sorted_node_ids), self.__size - 1
+        )
+        found = self.__sorted_ids[positions] == sorted_node_ids
+        rows[query_order[found]] = self.__order[positions[found]]
+        return rows
+
+    def add(self, node_ids) -> np.ndarray:
+        """
+        This method returns the rows of the node ids, unknown ids get new rows
+        """
+        node_ids = np.asarray(node_ids, dtype=np.int64).reshape(-1)
+        rows = self.rows(node_ids)
+        missing = rows < 0
+        if np.any(missing):
+            # new_ids are sorted, their rows follow the order of appearance
+            new_ids, first = np.unique(node_ids[missing], return_index=True)
+            appearance = np.argsort(first)
+            new_rows = np.empty(len(new_ids), dtype=np.int64)
+            new_rows[appearance] = self.__size + np.arange(len(new_ids))
+
+            size = self.__size + len(new_ids)
+            if size > len(self.__buffer):
+                buffer = np.empty(max(size, 2 * len(self.__buffer)), dtype=np.int64)
+                buffer[: self.__size] = self.ids
+                self.__buffer = buffer
+            self.__buffer[self.__size : size] = new_ids[appearance]
+            self.__size = size
+
+            positions = np.searchsorted(self.__sorted_ids, new_ids)
+            self.__sorted_ids = np.insert(self.__sorted_ids, positions, new_ids)
+            self.__order = np.insert(self.__order, positions, new_rows)
+            rows[missing] = new_rows[np.searchsorted(new_ids, node_ids[missing])]
+        return rows
+
+    def __len__(self) -> int:
+        return self.__size
+
+
+class ForcesView(Mapping):
+    """
+    This class is a read only view node_id -> forces of one force type of a subcase.
+    Lookups go through the rows of the node index, nothing is copied. The forces
+    of a node are returned as a new list, so the view can not be changed through
+    them; use Subcase.add_forces to change the forces
+    """
+
+    def __init__(self, subcase: "Subcase", force_type: ForceType):
+        self.subcase = subcase
+        self.force_type = force_type
+        # the rows of the forces belong to the index of the time they were added
+        self.node_index = Subcase.node_index
+
+    def __getitem__(self, node_id: int) -> List[float]:
+        row = int(self.node_index.rows([node_id])[0])
+        has_forces = self.subcase.has_forces[self.force_type]
+        if row < 0 or row >= len(has_forces) or not has_forces[row]:
+            raise KeyError(node_id)
+        return self.subcase.forces[self.force_type][row].tolist()
+
+    def __iter__(self) -> Iterator[int]:
+        rows = np.flatnonzero(self.subcase.has_forces[self.force_type])
+        return iter(self.node_index.ids[rows].tolist())
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.subcase.has_forces[self.force_type]))
+
+    def items(self):
+        """
+        The (node_id, forces) pairs, decoded in one pass
+        """
+        rows = np.flatnonzero(self.subcase.has_forces[self.force_type])
+        return dict(
+            zip(
+                self.node_index.ids[rows].tolist(),
+                self.subcase.forces[self.force_type][rows].tolist(),
+            )
+        ).items()
+
+    def __repr__(self) -> str:
+        return repr(dict(self.items()))
+
+
 class Subcase:
     """
     This class is used to store the subcase information
     The purpose of this class is to make multiple subcases available
-    in the mpcforces_extractor
+    in the mpcforces_extractor.
+    The forces are stored per force type as a (n_nodes, 6) array with the rows of the
+    shared node_index and a mask of the rows which have forces. The arrays may have
+    more rows than the index (they grow geometrically), these rows have no forces
     """
 
     subcases = []
+    node_index: NodeIndex = NodeIndex()
 
     def __init__(self, subcase_id: int, time: float):
         """
@@ -26,41 +147,111 @@ class Subcase:
         """
         self.subcase_id = subcase_id
         self.time = time
-        self.node_id2mpcforces = {}
-        self.node_id2spcforces = {}
+        self.forces: Dict[ForceType, np.ndarray] = {}
+        self.has_forces: Dict[ForceType, np.ndarray] = {}
+        for force_type in ForceType:
+            self.__clear_forces(force_type)
         Subcase.subcases.append(self)
 
+    def __clear_forces(self, force_type: ForceType) -> None:
+        """
+        This method removes all forces of a force type
+        """
+        self.forces[force_type] = np.zeros((0, 6), dtype=np.float64)
+        self.has_forces[force_type] = np.zeros(0, dtype=bool)
+
     def add_force(self, node_id: int, forces: List, force_type: ForceType) -> None:
         """
         This method is used to add the forces for a node
         """
-        if force_type == ForceType.MPCFORCE:
-            self.node_id2mpcforces[node_id] = forces
-        elif force_type == ForceType.SPCFORCE:
-            self.node_id2spcforces[node_id] = forces
+        self.add_forces([node_id], [forces], force_type)
+
+    def add_forces(self, node_ids, forces, force_type: ForceType) -> np.ndarray:
+        """
+        This method adds the forces (n, 6) of many nodes at once and returns the rows
+        of the nodes in the node_index
+        """
+        rows = Subcase.node_index.add(node_ids)
+        n_rows = len(Subcase.node_index)
+        capacity = len(self.has_forces[force_type])
+        if capacity < n_rows:
+            capacity = max(n_rows, 2 * capacity)
+            grown_forces = np.zeros((capacity, 6), dtype=np.float64)
+            grown_has_forces = np.zeros(capacity, dtype=bool)
+            grown_forces[: len(self.forces[force_type])] = self.forces[force_type]
+            grown_has_forces[: len(self.has_forces[force_type])] = self.has_forces[
+                force_type
+            ]
+            self.forces[force_type] = grown_forces
+            self.has_forces[force_type] = grown_has_forces
+        self.forces[force_type][rows] = np.asarray(forces, dtype=np.float64).reshape(
+            -1, 6
+        )
+        self.has_forces[force_type][rows] = True
+        return rows
+
+    def get_forces(self, force_type: ForceType) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This method returns the node ids and the (n, 6) forces of the nodes with forces
+        """
+        rows = np.flatnonzero(self.has_forces[force_type])
+        return Subcase.node_index.ids[rows], self.forces[force_type][rows]
+
+    def get_node_id2forces(self, force_type: ForceType) -> Dict[int, List[float]]:
+        """
+        This method returns the forces as a dict node_id -> forces (a copy)
+        """
+        node_ids, forces = self.get_forces(force_type)
+        return dict(zip(node_ids.tolist(), forces.tolist()))
+
+    def set_node_id2forces(self, node_id2forces: Dict, force_type: ForceType) -> None:
+        """
+        This method replaces the forces of a force type by the ones of the dict
+        """
+        self.__clear_forces(force_type)
+        if node_id2forces:
+            self.add_forces(
+                list(node_id2forces.keys()), list(node_id2forces.values()), force_type
+            )
+
+    @property
+    def node_id2mpcforces(self) -> ForcesView:
+        """
+        The MPC forces as read only view node_id -> forces
+        """
+        return ForcesView(self, ForceType.MPCFORCE)
+
+    @node_id2mpcforces.setter
+    def node_id2mpcforces(self, node_id2forces: Dict) -> None:
+        self.set_node_id2forces(node_id2forces, ForceType.MPCFORCE)
+
+    @property
+    def node_id2spcforces(self) -> ForcesView:
+        """
+        The SPC forces as read only view node_id -> forces
+        """
+        return ForcesView(self, ForceType.SPCFORCE)
+
+    @node_id2spcforces.setter
+    def node_id2spcforces(self, node_id2forces: Dict) -> None:
+        self.set_node_id2forces(node_id2forces, ForceType.SPCFORCE)
 
     def get_sum_forces(
         self,
         node_ids: List,
         force_type: ForceType,
-    ) -> None:
+    ) -> List[float]:
         """
         This method is used to sum the forces for all nodes
         """
-        forces = {}
-        if force_type == ForceType.MPCFORCE:
-            forces = self.node_id2mpcforces
-        elif force_type == ForceType.SPCFORCE:
-            forces = self.node_id2spcforces
-
-        sum_forces = [0, 0, 0, 0, 0, 0]
-        for node_id in node_ids:
-            if node_id not in forces:
-                print(f"Node {node_id} not found in mpcf, setting to 0.")
-                continue
-            force_vector = forces[node_id]
-            sum_forces = [sf + f for sf, f in zip(sum_forces, force_vector)]
-        return sum_forces
+        node_ids = np.fromiter(node_ids, dtype=np.int64)
+        rows = Subcase.node_index.rows(node_ids)
+        has_forces = self.has_forces[force_type]
+        found = (rows >= 0) & (rows < len(has_forces))
+        found[found] = has_forces[rows[found]]
+        for node_id in node_ids[~found].tolist():
+            print(f"Node {node_id} not found in mpcf, setting to 0.")
+        return self.forces[force_type][rows[found]].sum(axis=0).tolist()
 
     @staticmethod
     def get_subcase_by_id(subcase_id: int):
@@ -78,3 +269,4 @@ class Subcase:
         This method is used to reset the subcases list
         """
         Subcase.subcases = []
+        Subcase.node_index = NodeIndex()
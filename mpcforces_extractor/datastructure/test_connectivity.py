@@ -0,0 +1,73 @@
+import unittest
+import numpy as np
+from mpcforces_extractor.datastructure.connectivity import (
+    CSRAdjacency,
+    get_connected_components,
+    get_star_edges,
+)
+
+
+class TestConnectivity(unittest.TestCase):
+    def test_star_edges(self):
+        """
+        Test that every element connects its nodes to its first node, also for the
+        nodes of the induced subgraph
+        """
+        node_ids1, node_ids2 = get_star_edges([[1, 2, 3], [4], [5, 6]])
+        self.assertEqual(node_ids1.tolist(), [1, 1, 1, 4, 5, 5])
+        self.assertEqual(node_ids2.tolist(), [1, 2, 3, 4, 5, 6])
+
+        node_ids1, node_ids2 = get_star_edges([[1, 2, 3], [4, 5]], np.array([2, 3, 4]))
+        self.assertEqual(node_ids1.tolist(), [2, 2, 4])
+        self.assertEqual(node_ids2.tolist(), [2, 3, 4])
+        self.assertEqual(len(get_star_edges([])[0]), 0)
+
+    def test_connected_components(self):
+        """
+        Test the components of a chain, ordered by the first appearance of their nodes.
+        Loops do not add nodes, given nodes without edges are components of their own
+        """
+        node_ids1 = [9, 8, 7, 6, 20, 30, 5]
+        node_ids2 = [8, 7, 6, 1, 21, 30, 5]
+        components = get_connected_components(node_ids1, node_ids2)
+        self.assertEqual(
+            [component.tolist() for component in components],
+            [[1, 6, 7, 8, 9], [20, 21]],
+        )
+
+        components = get_connected_components([1], [2], [3, 2, 1])
+        self.assertEqual(
+            [component.tolist() for component in components], [[3], [1, 2]]
+        )
+        self.assertEqual(get_connected_components([], []), [])
+
+
+class TestCSRAdjacency(unittest.TestCase):
+    def test_adjacency(self):
+        """
+        Test the element -> node and node -> element lookups and the neighbors,
+        an element using a node twice is stored once for the node
+        """
+        adjacency = CSRAdjacency([30, 10, 20], [[1, 2, 3], [3, 4, 4], [5]])
+        self.assertEqual(adjacency.element_offsets.tolist(), [0, 3, 6, 7])
+        self.assertEqual(adjacency.get_element_node_ids(10).tolist(), [3, 4, 4])
+        self.assertEqual(adjacency.node_ids.tolist(), [1, 2, 3, 4, 5])
+        self.assertEqual(adjacency.get_node_element_ids(3).tolist(), [30, 10])
+        self.assertEqual(adjacency.get_node_element_ids(4).tolist(), [10])
+        self.assertEqual(len(adjacency.get_node_element_ids(9)), 0)
+        self.assertEqual(adjacency.get_neighbor_element_ids(30).tolist(), [10])
+        self.assertEqual(len(adjacency.get_neighbor_element_ids(20)), 0)
+        self.assertEqual(
+            [edges.tolist() for edges in adjacency.get_star_edges()],
+            [[1, 1, 1, 3, 3, 3, 5], [1, 2, 3, 3, 4, 4, 5]],
+        )
+        with self.assertRaises(KeyError):
+            adjacency.get_element_node_ids(40)
+
+        adjacency = CSRAdjacency([], [])
+        self.assertEqual(len(adjacency.get_node_element_ids(1)), 0)
+        self.assertEqual(len(adjacency.get_star_edges()[0]), 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
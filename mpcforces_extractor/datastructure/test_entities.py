@@ -1,5 +1,12 @@
 import unittest
-from mpcforces_extractor.datastructure.entities import Element1D, Node, Element
+from mpcforces_extractor.datastructure.entities import (
+    Element1D,
+    Node,
+    NodeTable,
+    Element,
+    Part,
+    PartMode,
+)
 
 
 class TestElement1D(unittest.TestCase):
@@ -35,24 +42,18 @@ class TestNode(unittest.TestCase):
         self.assertEqual(node.id, 1)
         self.assertEqual(node.coords, [0, 0, 0])
 
-    def test_add_Element(self):
+    def test_slots(self):
         """
-        Test the add_element method. Make sure the element is added to the connected elements
+        Test that the entities have no instance dict, only the slots
         """
-
-        # Test the add_element method
-        node = Node(
-            node_id=1,
-            coords=[0, 0, 0],
-        )
-        element = Element1D(
-            element_id=1,
-            property_id=1,
-            node1=0,
-            node2=1,
-        )
-        node.add_element(element)
-        self.assertEqual(node.connected_elements, [element])
+        node = Node(node_id=1, coords=[0, 0, 0])
+        element_1d = Element1D(element_id=1, property_id=1, node1=0, node2=1)
+        element = Element(element_id=1, property_id=1, nodes=[node])
+        for entity in [node, element_1d, element]:
+            self.assertFalse(hasattr(entity, "__dict__"))
+            with self.assertRaises(AttributeError):
+                entity.centroid = [0, 0, 0]
+        Element.reset_graph()
 
 
 class TestElement(unittest.TestCase):
@@ -89,3 +90,147 @@ class TestElement(unittest.TestCase):
         self.assertEqual(element.id, 1)
         self.assertEqual(element.property_id, 1)
         self.assertEqual(element.nodes, nodes)
+
+    def test_corner_nodes_only(self):
+        """
+        Test that the parts of the corner node graph with the midside nodes added
+        are the same as the parts of the full graph
+        """
+        Element.reset_graph()
+        Node.reset()
+        Node.extend_table(list(range(1, 18)), [[0, 0, 0]] * 17)
+        # two CTRIA6 sharing the edge 2-3 (midside node 5), a CQUAD8 on its own
+        Element(1, 1, [1, 2, 3, 4, 5, 6], "CTRIA6")
+        Element(2, 1, [3, 2, 7, 5, 8, 9], "CTRIA6")
+        Element(3, 2, [10, 11, 12, 13, 14, 15, 16, 17], "CQUAD8")
+        self.assertEqual(
+            Element.element_id2element[3].get_corner_node_ids(), [10, 11, 12, 13]
+        )
+        # one (star) edge per corner node, 20 with the midside nodes
+        self.assertEqual(len(Element.get_edges(corner_nodes_only=True)[0]), 10)
+        self.assertEqual(len(Element.get_edges()[0]), 20)
+
+        part_id2node_ids = {}
+        for corner_nodes_only in [False, True]:
+            Part.reset()
+            Part.corner_nodes_only = corner_nodes_only
+            part_id2node_ids[corner_nodes_only] = dict(Element.get_part_id2node_ids())
+        self.assertEqual(part_id2node_ids[True], part_id2node_ids[False])
+        self.assertEqual(part_id2node_ids[True][1], [1, 2, 3, 4, 5, 6, 7, 8, 9])
+        Part.corner_nodes_only = False
+        Element.reset_graph()
+        Part.reset()
+
+    def test_adjacency(self):
+        """
+        Test that the connectivity is rebuilt after an element was added
+        """
+        Element.reset_graph()
+        Element(1, 1, [1, 2, 3])
+        self.assertEqual(Element.get_adjacency().get_node_element_ids(3).tolist(), [1])
+        Element(2, 1, [3, 4])
+        self.assertEqual(
+            Element.get_adjacency().get_node_element_ids(3).tolist(), [1, 2]
+        )
+        Element.reset_graph()
+
+    def test_centroids(self):
+        """
+        Test the centroids of elements with different numbers of nodes, they follow
+        new elements and changed node coordinates
+        """
+        Element.reset_graph()
+        Node.reset()
+        Node.extend_table([1, 2, 3, 4], [[0, 0, 0], [3, 0, 0], [3, 3, 0], [0, 3, 3]])
+        Element(1, 1, [1, 2, 3], "CTRIA3")
+        Element(2, 1, [1, 2, 3, 4], "CQUAD4")
+        self.assertEqual(
+            Element.get_centroids().tolist(), [[2, 1, 0], [1.5, 1.5, 0.75]]
+        )
+
+        Element(3, 1, [2, 4], "CQUAD4")
+        self.assertEqual(Element.element_id2element[3].centroid, [1.5, 1.5, 1.5])
+        Node.extend_table([4], [[0, 3, 7]])
+        self.assertEqual(Element.element_id2element[3].centroid, [1.5, 1.5, 3.5])
+        Element.reset_graph()
+        Node.reset()
+
+    def test_part_modes(self):
+        """
+        Test the parts by property id (a shared node belongs to the property of the
+        last element) and by property id and connectivity
+        """
+        Element.reset_graph()
+        Node.reset()
+        Node.extend_table(list(range(1, 9)), [[0, 0, 0]] * 8)
+        Element(1, 1, [1, 2, 3])
+        Element(2, 2, [3, 4, 5])
+        Element(3, 1, [6, 7])
+        Element(4, 2, [5, 8])
+
+        expected = {
+            PartMode.GRAPH: {1: [1, 2, 3, 4, 5, 8], 2: [6, 7]},
+            PartMode.PROPERTY: {1: [1, 2, 6, 7], 2: [3, 4, 5, 8]},
+            PartMode.PROPERTY_GRAPH: {1: [1, 2], 2: [3, 4, 5, 8], 3: [6, 7]},
+        }
+        for mode, part_id2node_ids in expected.items():
+            Part.reset()
+            Part.mode = mode
+            self.assertEqual(Element.get_part_id2node_ids(), part_id2node_ids)
+        Part.mode = PartMode.GRAPH
+        Element.reset_graph()
+        Part.reset()
+
+
+class TestNodeTable(unittest.TestCase):
+    """
+    Test the NodeTable class
+    """
+
+    def test_rows(self):
+        """
+        Test the lookup id -> row. Ids are sorted, the last added coords win
+        """
+        table = NodeTable([30, 10, 20], [[3, 3, 3], [1, 1, 1], [2, 2, 2]])
+        table.add(10, [4, 4, 4])
+
+        self.assertEqual(len(table), 3)
+        self.assertEqual(table.ids.tolist(), [10, 20, 30])
+        self.assertEqual(table.rows([30, 10]).tolist(), [2, 0])
+        self.assertEqual(table.get_coords(10), [4.0, 4.0, 4.0])
+        self.assertTrue(20 in table)
+        self.assertFalse(25 in table)
+        with self.assertRaises(KeyError):
+            table.rows([20, 25])
+
+    def test_nodes_on_demand(self):
+        """
+        Test that nodes of the table are only created when they are accessed
+        """
+        Node.reset()
+        Node.extend_table([1, 2], [[0, 0, 0], [1, 2, 3]])
+        self.assertEqual(len(Node.node_id2node), 0)
+
+        node = Node.node_id2node[2]
+        self.assertEqual(node.id, 2)
+        self.assertEqual(node.coords, [1.0, 2.0, 3.0])
+        self.assertTrue(Node.node_id2node[2] is node)
+        self.assertEqual(len(Node.node_id2node), 1)
+        self.assertEqual(len(Node.table), 2)
+
+
+class TestPart(unittest.TestCase):
+    def test_get_part_ids(self):
+        """
+        Test the node -> part lookup, it follows new parts
+        """
+        Part.reset()
+        Part([5, 1, 3])
+        Part([2, 4])
+        self.assertEqual(
+            Part.get_part_ids([1, 2, 3, 4, 5, 6]).tolist(), [1, 2, 1, 2, 1, 0]
+        )
+        Part([6])
+        self.assertEqual(Part.get_part_ids([6, 7]).tolist(), [3, 0])
+        Part.reset()
+        self.assertEqual(Part.get_part_ids([1]).tolist(), [0])
@@ -1,7 +1,8 @@
 import unittest
-from mpcforces_extractor.datastructure.rigids import MPC, MPC_CONFIG
+from unittest.mock import patch
+from mpcforces_extractor.datastructure.rigids import MPC, MPC_CONFIG, MPCPartForces
 from mpcforces_extractor.datastructure.entities import Node, Element, Part
-from mpcforces_extractor.datastructure.subcases import Subcase
+from mpcforces_extractor.datastructure.subcases import Subcase, ForceType
 
 
 class TestRigids(unittest.TestCase):
@@ -32,6 +33,30 @@ class TestRigids(unittest.TestCase):
         self.assertEqual(mpc.nodes, [node2])
         self.assertEqual(mpc.master_node, node1)
         self.assertEqual(mpc.dofs, "123")
+        self.assertFalse(hasattr(mpc, "__dict__"))
+
+    def test_get_node_ids(self):
+        """
+        Test the sorted unique node ids of all MPCs
+        """
+        MPC.reset()
+        MPC(
+            element_id=1,
+            mpc_config=MPC_CONFIG.RBE2,
+            master_node=5,
+            nodes=[3, 1],
+            dofs="123",
+        )
+        MPC(
+            element_id=2,
+            mpc_config=MPC_CONFIG.RBE3,
+            master_node=None,
+            nodes=[3, 7],
+            dofs="123",
+        )
+        self.assertEqual(MPC.get_node_ids().tolist(), [1, 3, 5, 7])
+        MPC.reset()
+        self.assertEqual(len(MPC.get_node_ids()), 0)
 
     def test_sum_forces_by_connected_parts(self):
         node_id2mpcforce = {
@@ -77,6 +102,75 @@ class TestRigids(unittest.TestCase):
         forces = mpc.get_part_id2force(subcase)
         self.assertTrue(forces[1] == [3, 3, 3, 0, 0, 0])
 
+    def test_mpc_part_forces(self):
+        """
+        Test the batched part forces of several MPCs and subcases against the
+        sum of the node forces
+        """
+        Node.reset()
+        for node_id in range(1, 9):
+            Node(node_id=node_id, coords=[0, 0, 0])
+        Element.reset_graph()
+        Part.reset()
+        MPC.reset()
+        Subcase.reset()
+        Element(1, 1, [1, 2, 3])
+        Element(2, 2, [4, 5, 6])
+        mpcs = [
+            MPC(
+                element_id=1,
+                mpc_config=MPC_CONFIG.RBE2,
+                master_node=7,
+                nodes=[1, 4, 5],
+                dofs="123",
+            ),
+            MPC(
+                element_id=2,
+                mpc_config=MPC_CONFIG.RBE2,
+                master_node=8,
+                nodes=[2, 3, 6],
+                dofs="123",
+            ),
+        ]
+        for subcase_id in [1, 2]:
+            subcase = Subcase(subcase_id, float(subcase_id))
+            # node 6 has no force
+            for node_id in range(1, 6):
+                subcase.add_force(
+                    node_id, [subcase_id * node_id, 0, 0, 0, 0, 1], ForceType.MPCFORCE
+                )
+
+        # only the touched parts, the master nodes have no part
+        self.assertEqual(mpcs[0].get_part_id2node_ids(), {1: [1], 2: [4, 5]})
+        self.assertEqual(mpcs[1].get_part_id2node_ids(), {1: [2, 3], 2: [6]})
+
+        results = MPCPartForces(mpcs).get_subcase_id2part_id2forces()
+        self.assertEqual(len(results), 2)
+        self.assertEqual(results[0][1][1], [1.0, 0, 0, 0, 0, 1.0])
+        self.assertEqual(results[0][2][2], [18.0, 0, 0, 0, 0, 2.0])
+        self.assertEqual(results[1][2][1], [10.0, 0, 0, 0, 0, 2.0])
+        self.assertEqual(results[1][1][2], [0.0] * 6)
+        for mpc, result in zip(mpcs, results):
+            for subcase in Subcase.subcases:
+                for part_id, node_ids in mpc.get_part_id2node_ids().items():
+                    self.assertEqual(
+                        result[subcase.subcase_id][part_id],
+                        subcase.get_sum_forces(node_ids, ForceType.MPCFORCE),
+                    )
+
+        # the rows are looked up once, again after the index got new nodes
+        part_forces = MPCPartForces(mpcs)
+        with patch.object(
+            Subcase.node_index, "rows", wraps=Subcase.node_index.rows
+        ) as mock_rows:
+            part_forces.get_subcase_id2part_id2forces()
+            self.assertEqual(mock_rows.call_count, 1)
+            Subcase.subcases[0].add_force(6, [1, 0, 0, 0, 0, 0], ForceType.MPCFORCE)
+            self.assertEqual(
+                part_forces.get_part_forces(Subcase.subcases[0])[3].tolist(),
+                [1.0, 0, 0, 0, 0, 0],
+            )
+
 
 if __name__ == "__main__":
     unittest.main()
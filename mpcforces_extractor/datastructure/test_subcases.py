@@ -0,0 +1,113 @@
+import unittest
+import numpy as np
+from mpcforces_extractor.datastructure.subcases import NodeIndex, Subcase, ForceType
+
+
+class TestSubcases(unittest.TestCase):
+    def setUp(self):
+        Subcase.reset()
+
+    def test_node_index(self):
+        """
+        Test that the rows are given in the order the nodes are added
+        """
+        index = NodeIndex()
+        self.assertEqual(index.rows([1]).tolist(), [-1])
+        self.assertEqual(index.add([30, 10, 30]).tolist(), [0, 1, 0])
+        self.assertEqual(index.add([20, 10]).tolist(), [2, 1])
+        self.assertEqual(index.rows([10, 20, 30, 40]).tolist(), [1, 2, 0, -1])
+        self.assertEqual(len(index), 3)
+
+        # many blocks: the merged sorted ids give the same rows as a dict
+        rng = np.random.default_rng(0)
+        index = NodeIndex()
+        node_id2row = {}
+        for _ in range(20):
+            block = rng.integers(0, 500, 40)
+            for node_id in block.tolist():
+                node_id2row.setdefault(node_id, len(node_id2row))
+            self.assertEqual(
+                index.add(block).tolist(), [node_id2row[i] for i in block.tolist()]
+            )
+        self.assertEqual(index.ids.tolist(), list(node_id2row))
+        self.assertEqual(len(index), len(node_id2row))
+
+    def test_forces(self):
+        """
+        Test the force arrays of two subcases with the shared node index and the
+        dict view of them
+        """
+        subcase1 = Subcase(1, 1.0)
+        subcase2 = Subcase(2, 2.0)
+        subcase1.add_forces(
+            [5, 3], [[1, 0, 0, 0, 0, 0], [2, 0, 0, 0, 0, 1]], ForceType.MPCFORCE
+        )
+        subcase2.add_force(7, [0, 3, 0, 0, 0, 0], ForceType.MPCFORCE)
+        subcase2.add_force(3, [0, 4, 0, 0, 0, 0], ForceType.SPCFORCE)
+
+        self.assertEqual(Subcase.node_index.ids.tolist(), [5, 3, 7])
+        self.assertEqual(
+            subcase1.node_id2mpcforces,
+            {5: [1.0, 0.0, 0.0, 0.0, 0.0, 0.0], 3: [2.0, 0.0, 0.0, 0.0, 0.0, 1.0]},
+        )
+        self.assertEqual(subcase1.node_id2spcforces, {})
+        self.assertEqual(
+            subcase2.node_id2mpcforces, {7: [0.0, 3.0, 0.0, 0.0, 0.0, 0.0]}
+        )
+        node_ids, forces = subcase2.get_forces(ForceType.SPCFORCE)
+        self.assertEqual(node_ids.tolist(), [3])
+        self.assertEqual(forces.tolist(), [[0.0, 4.0, 0.0, 0.0, 0.0, 0.0]])
+
+        # the last force of a node wins
+        subcase1.add_force(5, [9, 0, 0, 0, 0, 0], ForceType.MPCFORCE)
+        self.assertEqual(subcase1.node_id2mpcforces[5], [9.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+
+        subcase2.node_id2mpcforces = {1: [1, 1, 1, 0, 0, 0]}
+        self.assertEqual(
+            subcase2.node_id2mpcforces, {1: [1.0, 1.0, 1.0, 0.0, 0.0, 0.0]}
+        )
+
+    def test_forces_view(self):
+        """
+        Test that the forces view follows the added forces and can not be written
+        """
+        subcase1 = Subcase(1, 1.0)
+        subcase2 = Subcase(2, 2.0)
+        node_id2mpcforces = subcase1.node_id2mpcforces
+        subcase1.add_forces([5, 3], [[1, 0, 0, 0, 0, 0]] * 2, ForceType.MPCFORCE)
+        subcase2.add_force(7, [0, 3, 0, 0, 0, 0], ForceType.MPCFORCE)
+
+        self.assertEqual(len(node_id2mpcforces), 2)
+        self.assertEqual(list(node_id2mpcforces), [5, 3])
+        self.assertTrue(3 in node_id2mpcforces)
+        # 7 has a row in the shared index, but no forces in this subcase
+        self.assertFalse(7 in node_id2mpcforces)
+        with self.assertRaises(KeyError):
+            node_id2mpcforces[7]  # pylint: disable=pointless-statement
+        with self.assertRaises(TypeError):
+            node_id2mpcforces[5] = [0, 0, 0, 0, 0, 0]
+        node_id2mpcforces[5][0] = 4.0
+        self.assertEqual(node_id2mpcforces[5], [1.0, 0.0, 0.0, 0.0, 0.0, 0.0])
+
+    def test_get_sum_forces(self):
+        """
+        Test the sum of the forces of a node set, unknown nodes and nodes without
+        forces count as 0
+        """
+        subcase1 = Subcase(1, 1.0)
+        subcase2 = Subcase(2, 2.0)
+        subcase1.add_forces(
+            [1, 2], [[1, 2, 3, 0, 0, 0], [1, 2, 3, 1, 0, 0]], ForceType.MPCFORCE
+        )
+        subcase2.add_force(4, [5, 0, 0, 0, 0, 0], ForceType.MPCFORCE)
+
+        self.assertEqual(
+            subcase1.get_sum_forces([1, 2, 4, 99], ForceType.MPCFORCE),
+            [2.0, 4.0, 6.0, 1.0, 0.0, 0.0],
+        )
+        self.assertEqual(subcase1.get_sum_forces({2}, ForceType.SPCFORCE), [0.0] * 6)
+        self.assertEqual(subcase1.get_sum_forces([], ForceType.MPCFORCE), [0.0] * 6)
+
+
+if __name__ == "__main__":
+    unittest.main()
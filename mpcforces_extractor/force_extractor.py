@@ -1,18 +1,66 @@
 import os
+from typing import List
+import numpy as np
 from mpcforces_extractor.reader.modelreaders import FemFileReader
 from mpcforces_extractor.reader.forces_reader import ForcesReader
+from mpcforces_extractor.reader.op2_reader import OP2Reader, is_op2
+from mpcforces_extractor.reader.model_cache import ModelCache
+from mpcforces_extractor.datastructure.entities import Element, Part, PartMode
+from mpcforces_extractor.datastructure.rigids import MPC
+from mpcforces_extractor.datastructure.loads import SPC
 from mpcforces_extractor.datastructure.subcases import Subcase, ForceType
 from mpcforces_extractor.logging.logger import Logger
 
 
+def get_node_ids_of_interest() -> np.ndarray:
+    """
+    This method returns the sorted ids of the nodes whose forces are used:
+    the nodes of the RBE2/RBE3 elements and the SPC nodes
+    """
+    return np.union1d(MPC.get_node_ids(), SPC.get_node_ids())
+
+
+def get_forces_reader(
+    file_path: str, *, streaming: bool = False, workers: int = 1, node_ids=None
+):
+    """
+    This method returns the reader of a forces file: an OP2Reader for an OP2 result
+    file, a ForcesReader for a .mpcf / .spcf file
+    """
+    if is_op2(file_path):
+        return OP2Reader(file_path, node_ids=node_ids)
+    return ForcesReader(
+        file_path, streaming=streaming, workers=workers, node_ids=node_ids
+    )
+
+
 class MPCForceExtractor:
     """
     This class is used to extract the forces from the MPC forces file
     and calculate the forces for each rigid element by property
     """
 
-    def __init__(self, mpcf_file_path) -> None:
+    def __init__(
+        self,
+        mpcf_file_path,
+        streaming: bool = False,
+        subcase_ids: List[int] = None,
+        workers: int = 1,
+        *,
+        node_ids=None,
+    ) -> None:
+        """
+        streaming: read the forces file block by block instead of keeping all its lines
+        subcase_ids: only read these subcases (all if None)
+        workers: number of processes parsing the subcases in parallel
+        node_ids: only keep the forces of these nodes (all if None),
+        see get_node_ids_of_interest
+        """
         self.mpcf_file_path: str = mpcf_file_path
+        self.streaming: bool = streaming
+        self.subcase_ids: List[int] = subcase_ids
+        self.workers: int = workers
+        self.node_ids = node_ids
         self.mpc_forces_reader = None
         self.subcases = []
 
@@ -22,10 +70,36 @@ class MPCForceExtractor:
         in a dictory with the rigid element as the key and the property2forces dict as the value
         """
         if self.__mpcf_file_exists():
-            self.mpc_forces_reader = ForcesReader(self.mpcf_file_path)
-            self.mpc_forces_reader.build_subcases(force_type=ForceType.MPCFORCE)
+            self.mpc_forces_reader = get_forces_reader(
+                self.mpcf_file_path,
+                streaming=self.streaming,
+                workers=self.workers,
+                node_ids=self.node_ids,
+            )
+            self.mpc_forces_reader.build_subcases(
+                force_type=ForceType.MPCFORCE, subcase_ids=self.subcase_ids
+            )
             self.subcases = Subcase.subcases
 
+    def update_subcase_data(self) -> List[int]:
+        """
+        This method reads the subcases appended to the MPCF file since the last call
+        (the solver may still be writing it) and returns the ids of the updated subcases
+        """
+        if not self.__mpcf_file_exists():
+            return []
+        if is_op2(self.mpcf_file_path):
+            raise ValueError("The tail mode needs a .mpcf file, not an OP2 file")
+        if self.mpc_forces_reader is None:
+            self.mpc_forces_reader = ForcesReader(
+                self.mpcf_file_path, streaming=True, node_ids=self.node_ids
+            )
+        subcase_ids = self.mpc_forces_reader.update_subcases(
+            force_type=ForceType.MPCFORCE, subcase_ids=self.subcase_ids
+        )
+        self.subcases = Subcase.subcases
+        return subcase_ids
+
     def __mpcf_file_exists(self) -> bool:
         """
         This method checks if the MPC forces file exists
@@ -41,8 +115,27 @@ class SPCForcesExtractor:
     and calculate the forces for each rigid element by property
     """
 
-    def __init__(self, spcf_file_path: str) -> None:
+    def __init__(
+        self,
+        spcf_file_path: str,
+        streaming: bool = False,
+        subcase_ids: List[int] = None,
+        workers: int = 1,
+        *,
+        node_ids=None,
+    ) -> None:
+        """
+        streaming: read the forces file block by block instead of keeping all its lines
+        subcase_ids: only read these subcases (all if None)
+        workers: number of processes parsing the subcases in parallel
+        node_ids: only keep the forces of these nodes (all if None),
+        see get_node_ids_of_interest
+        """
         self.spcf_file_path: str = spcf_file_path
+        self.streaming: bool = streaming
+        self.subcase_ids: List[int] = subcase_ids
+        self.workers: int = workers
+        self.node_ids = node_ids
         self.spc_forces_reader = None
         self.subcases = []
 
@@ -51,12 +144,38 @@ class SPCForcesExtractor:
         This method reads the FEM File and the SPCF file and extracts the forces
         """
         if self.__spcf_file_exists():
-            self.spc_forces_reader = ForcesReader(self.spcf_file_path)
-            self.spc_forces_reader.build_subcases(force_type=ForceType.SPCFORCE)
+            self.spc_forces_reader = get_forces_reader(
+                self.spcf_file_path,
+                streaming=self.streaming,
+                workers=self.workers,
+                node_ids=self.node_ids,
+            )
+            self.spc_forces_reader.build_subcases(
+                force_type=ForceType.SPCFORCE, subcase_ids=self.subcase_ids
+            )
             self.subcases = Subcase.subcases
         else:
             Logger().log_warn("SPC Forces file does not exist")
 
+    def update_subcase_data(self) -> List[int]:
+        """
+        This method reads the subcases appended to the SPCF file since the last call
+        (the solver may still be writing it) and returns the ids of the updated subcases
+        """
+        if not self.__spcf_file_exists():
+            return []
+        if is_op2(self.spcf_file_path):
+            raise ValueError("The tail mode needs a .spcf file, not an OP2 file")
+        if self.spc_forces_reader is None:
+            self.spc_forces_reader = ForcesReader(
+                self.spcf_file_path, streaming=True, node_ids=self.node_ids
+            )
+        subcase_ids = self.spc_forces_reader.update_subcases(
+            force_type=ForceType.SPCFORCE, subcase_ids=self.subcase_ids
+        )
+        self.subcases = Subcase.subcases
+        return subcase_ids
+
     def __spcf_file_exists(self) -> bool:
         """
         This method checks if the SPC forces file exists
@@ -71,21 +190,77 @@ class FEMExtractor:
     This class is used to extract the data from the .fem file
     """
 
-    def __init__(self, fem_file_path: str, block_size: int) -> None:
+    def __init__(
+        self,
+        fem_file_path: str,
+        block_size: int,
+        streaming: bool = False,
+        workers: int = 1,
+        cache_file_path: str = None,
+        *,
+        part_mode: PartMode = PartMode.GRAPH,
+        corner_nodes_only: bool = False,
+    ) -> None:
+        """
+        cache_file_path: binary snapshot of the parsed model, used instead of parsing
+        the .fem file as long as it did not change (no caching if None)
+        part_mode: how the parts are detected, by the element graph or by property id
+        corner_nodes_only: the element graph is built of the corner nodes only
+        (the midside nodes are added afterwards), see Element.get_part_id2node_ids_graph
+        """
         self.fem_file_path: str = fem_file_path
         self.reader: FemFileReader = None
         self.block_size: int = block_size
+        self.streaming: bool = streaming
+        self.workers: int = workers
+        self.part_mode: PartMode = part_mode
+        self.corner_nodes_only: bool = corner_nodes_only
+        self.cache: ModelCache = None
+        if cache_file_path and fem_file_path and os.path.isfile(fem_file_path):
+            self.cache = ModelCache(cache_file_path, block_size)
 
     def build_fem_data(self):
         """
         Builds the main entities from the FEM file
         """
         logger = Logger()
-        self.reader = FemFileReader(self.fem_file_path, self.block_size)
         logger.start_timing("Reading the FEM file")
+        snapshot = self.cache.load(self.fem_file_path) if self.cache else None
+        if snapshot is not None:
+            logger.log_info(f"Using the model cache {self.cache.cache_file_path}")
+        self.reader = FemFileReader(
+            self.fem_file_path,
+            self.block_size,
+            streaming=self.streaming,
+            workers=self.workers,
+            bulk_data=snapshot.bulk_data if snapshot else None,
+        )
         self.reader.create_entities()
         logger.stop_timing("Reading the FEM file")
 
+        Part.mode = self.part_mode
+        Part.corner_nodes_only = self.corner_nodes_only
+        if self.cache is not None:
+            Part.reset()
+            if (
+                snapshot is not None
+                and snapshot.part_mode == self.part_mode.value
+                and snapshot.corner_nodes_only == self.corner_nodes_only
+            ):
+                for node_ids in snapshot.part_id2node_ids.values():
+                    Part(node_ids)
+            else:
+                # a snapshot of other part settings gets the parts of these settings
+                logger.start_timing("Writing the model cache")
+                self.cache.save(
+                    snapshot.source_paths if snapshot else self.reader.source_paths,
+                    self.reader.bulk_data,
+                    Element.get_part_id2node_ids(),
+                    self.part_mode.value,
+                    self.corner_nodes_only,
+                )
+                logger.stop_timing("Writing the model cache")
+
         logger.start_timing("Building the rigid elements")
         self.reader.get_rigid_elements()
         logger.stop_timing("Building the rigid elements")
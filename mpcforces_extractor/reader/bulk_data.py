@@ -0,0 +1,555 @@
+import mmap
+import os
+import re
+from typing import Callable, Dict, Iterable, Iterator, List, Tuple
+import numpy as np
+from mpcforces_extractor.logging.logger import Logger
+from mpcforces_extractor.reader.fixed_width import (
+    decode_float_matrix,
+    decode_floats,
+    decode_ints,
+    lines_to_char_matrix,
+)
+from mpcforces_extractor.reader.line_reader import is_compressed, iter_file_lines
+
+
+def parse_nastran_float(field: str) -> float:
+    """
+    This method is used to parse a real number from a .fem file field.
+    Handles the exponential notation without the E in it (1.234-3) and blank fields
+    """
+    field = field.strip().upper().replace("D", "E")
+    if not field:
+        return 0.0
+    try:
+        return float(field)
+    except ValueError:
+        pass
+
+    # the last sign which is not the leading one is the start of the exponent
+    for i in range(len(field) - 1, 0, -1):
+        if field[i] in "+-":
+            return float(field[:i] + "E" + field[i:])
+    raise ValueError(f"Could not convert field '{field}' to float")
+
+
+class CardTokenizer:
+    """
+    This class is used to group the lines of a .fem file into cards (a line plus
+    its continuation lines) and to split them into fields.
+    The format is detected for every line, so small field (8 chars), large field
+    (16 chars, keyword with *) and free field (comma separated) cards can be mixed
+    """
+
+    fields_per_line: int = 8
+    large_fields_per_line: int = 4
+    large_field_size: int = 16
+    continuation_chars: str = "+*,"
+
+    def __init__(self, block_size: int, line_keywords: Iterable[str] = ()):
+        self.blocksize = block_size
+        # small field cards of these keywords are not split, see iter_cards
+        self.line_keywords = set(line_keywords)
+
+    @staticmethod
+    def is_card_start(line: str) -> bool:
+        """
+        This method checks if a line starts a new card (no continuation, comment or empty line)
+        """
+        return (
+            line.strip() != ""
+            and line[0] not in CardTokenizer.continuation_chars
+            and not line.startswith("$")
+        )
+
+    def split_line(self, line: str) -> List:
+        """
+        This method is used to split a line into blocks of blocksize, and
+        remove the newline character and strip the content of the block
+        """
+        line_content = [
+            line[j : j + self.blocksize] for j in range(0, len(line), self.blocksize)
+        ]
+
+        if "\n" in line_content:
+            line_content.remove("\n")
+
+        line_content = [line.strip() for line in line_content]
+        return line_content
+
+    def split_card_line(self, line: str) -> List:
+        """
+        This method splits one line of a card in any of the formats into its
+        first field (keyword or continuation marker) and its data fields
+        """
+        if "," in line:
+            line_content = [field.strip() for field in line.split(",")]
+            large_field = "*" in line_content[0]
+        else:
+            large_field = "*" in line[: self.blocksize]
+            if not large_field:
+                return self.split_line(line)[: self.fields_per_line + 1]
+            line_content = [line[: self.blocksize].strip()] + [
+                line[j : j + self.large_field_size].strip()
+                for j in range(
+                    self.blocksize,
+                    self.blocksize + self.large_fields_per_line * self.large_field_size,
+                    self.large_field_size,
+                )
+            ]
+
+        if large_field:
+            return line_content[: self.large_fields_per_line + 1]
+        return line_content[: self.fields_per_line + 1]
+
+    @staticmethod
+    def get_include_name(text: str) -> str:
+        """
+        This method returns the file name of an INCLUDE statement (the text after the
+        keyword), None if a quoted name is continued on the next line
+        """
+        text = text.strip()
+        if text[:1] in ("'", '"'):
+            end = text.find(text[0], 1)
+            return None if end == -1 else text[1:end]
+        return text.split()[0] if text else ""
+
+    def get_line_card(self, line: str) -> Tuple[str, str]:
+        """
+        This method returns (keyword, line) if the line is a small field line of
+        one of the line_keywords, None otherwise
+        """
+        if line[0] in self.continuation_chars or "," in line:
+            return None
+        keyword = line[: self.blocksize].strip().upper()
+        return (keyword, line) if keyword in self.line_keywords else None
+
+    def iter_card_lines(self, lines: Iterable[str]) -> Iterator:
+        """
+        This method skips comments and empty lines and yields the card lines.
+        An INCLUDE statement is yielded as ["INCLUDE", file name]
+        """
+        include_text = None  # quoted INCLUDE file name continued on the next lines
+        for line in lines:
+            if include_text is not None:
+                include_text += line.strip()
+                name = self.get_include_name(include_text)
+                if name is not None:
+                    include_text = None
+                    yield ["INCLUDE", name]
+                continue
+            if line.startswith("$") or not line.strip():
+                continue
+
+            if line.lstrip()[:7].upper() == "INCLUDE":
+                text = line.lstrip()[7:]
+                name = self.get_include_name(text)
+                if name is None:
+                    include_text = text.strip()
+                else:
+                    yield ["INCLUDE", name]
+                continue
+            yield line
+
+    def iter_cards(self, lines: Iterable[str]) -> Iterator[List[str]]:
+        """
+        This method walks the lines once and yields every card as a list of fields.
+        The first field is the keyword, the data fields of the continuation lines
+        are appended in order (the continuation markers are dropped). A large field
+        card has the same fields as its small field version.
+        An INCLUDE statement is yielded as ["INCLUDE", file name], a small field
+        line of one of the line_keywords is yielded unsplit as (keyword, line) and
+        its continuation lines are skipped
+        """
+        card = None
+        for line in self.iter_card_lines(lines):
+            complete = line if isinstance(line, list) else self.get_line_card(line)
+            if complete is not None:
+                if card is not None:
+                    yield card
+                card = None
+                yield complete
+                continue
+
+            line_content = self.split_card_line(line.rstrip("\r\n"))
+            if line[0] in self.continuation_chars:
+                if card is not None:
+                    card += line_content[1:]
+                continue
+
+            if card is not None:
+                yield card
+            line_content[0] = line_content[0].rstrip("*").upper()
+            card = line_content
+
+        if card is not None:
+            yield card
+
+
+class BulkData:
+    """
+    This class holds the decoded cards of a .fem file as plain tables.
+    It does not create any entities, so it can be built anywhere and merged later
+    """
+
+    def __init__(self):
+        self.grid_ids: np.ndarray = np.zeros(0, dtype=np.int64)
+        self.grid_coords: np.ndarray = np.zeros((0, 3), dtype=np.float64)
+        self.elements: List = []  # (keyword, element_id, property_id, node_ids)
+        self.rigids: List = []  # (keyword, element_id, master_node_id, dofs, node_ids)
+        self.loads: List = (
+            []
+        )  # (keyword, load_id, node_id, system_id, scale_factor, components)
+        self.spcs: List = []  # (system_id, node_id, dof_ids, dof_value)
+
+    def extend(self, other: "BulkData") -> None:
+        """
+        This method appends the tables of another BulkData instance (keeps the order)
+        """
+        self.grid_ids = np.concatenate([self.grid_ids, other.grid_ids])
+        self.grid_coords = np.concatenate([self.grid_coords, other.grid_coords])
+        self.elements += other.elements
+        self.rigids += other.rigids
+        self.loads += other.loads
+        self.spcs += other.spcs
+
+
+class BulkDataParser:
+    """
+    This class is used to read all the supported cards of a .fem file in a single pass.
+    Every card is dispatched by its keyword to a handler which decodes it into the BulkData
+    """
+
+    # keyword: max number of grid fields after the property id
+    element_keywords: Dict[str, int] = {
+        "CTRIA3": 3,
+        "CQUAD4": 4,
+        "CTRIA6": 6,
+        "CQUAD8": 8,
+        "CHEXA": 20,
+        "CPENTA": 15,
+        "CTETRA": 10,
+        "CROD": 2,
+        "CTUBE": 2,
+        "CBEAM": 2,
+        "CBAR": 2,
+    }
+
+    rbe3_end_keywords: List[str] = ["UM", "ALPHA", "TREF"]
+
+    # number of GRID cards which are decoded together
+    grid_block_size: int = 65536
+
+    def __init__(self, block_size: int):
+        self.tokenizer = CardTokenizer(block_size, line_keywords=["GRID"])
+        self.bulk_data = BulkData()
+        self.__grid_lines: List[str] = []
+        self.__grid_id_fields: List[str] = []
+        self.__grid_coord_fields: List[str] = []
+        self.__grid_id_blocks: List[np.ndarray] = []
+        self.__grid_coord_blocks: List[np.ndarray] = []
+        self.card_handlers: Dict[str, Callable] = {
+            "GRID": self.__read_grid,
+            "RBE2": self.__read_rbe2,
+            "RBE3": self.__read_rbe3,
+            "FORCE": self.__read_load,
+            "MOMENT": self.__read_load,
+            "SPC": self.__read_spc,
+            "INCLUDE": self.__read_include,
+        }
+        for keyword in self.element_keywords:
+            self.card_handlers[keyword] = self.__read_element
+        # the files being parsed (innermost last) and all parsed files in deck order
+        self.__file_paths: List[str] = []
+        self.source_paths: List[str] = []
+
+    def parse(self, lines: Iterable[str], file_path: str = None) -> BulkData:
+        """
+        This method tokenizes the lines and decodes all supported cards
+        file_path: the file of the lines, its INCLUDE statements are resolved relative
+        to it and parsed in place (they are skipped without file_path)
+        """
+        self.__parse_lines(lines, file_path)
+
+        self.__decode_grids()
+        self.bulk_data.grid_ids = np.concatenate(
+            [self.bulk_data.grid_ids] + self.__grid_id_blocks
+        )
+        self.bulk_data.grid_coords = np.concatenate(
+            [self.bulk_data.grid_coords] + self.__grid_coord_blocks
+        )
+        self.__grid_id_blocks = []
+        self.__grid_coord_blocks = []
+        return self.bulk_data
+
+    def __parse_lines(self, lines: Iterable[str], file_path: str = None) -> None:
+        """
+        This method decodes the cards of the lines of one file
+        """
+        if file_path:
+            self.__file_paths.append(os.path.abspath(file_path))
+            self.source_paths.append(os.path.abspath(file_path))
+        for card in self.tokenizer.iter_cards(lines):
+            if isinstance(card, tuple):
+                self.__read_grid_line(card[1])
+                continue
+            handler = self.card_handlers.get(card[0])
+            if handler is not None:
+                handler(card)
+        if file_path:
+            self.__file_paths.pop()
+
+    def __read_include(self, card: List[str]) -> None:
+        """
+        INCLUDE 'file name', relative to the including file. The cards of the file
+        are decoded at the position of the statement
+        """
+        if not self.__file_paths:
+            return
+        include_path = os.path.abspath(
+            os.path.join(os.path.dirname(self.__file_paths[-1]), card[1])
+        )
+        if include_path in self.__file_paths:
+            Logger().log_err(f"INCLUDE of {include_path} is circular, ignoring")
+        elif not os.path.isfile(include_path):
+            Logger().log_err(f"Included file {include_path} not found")
+        else:
+            self.__parse_lines(iter_file_lines(include_path), include_path)
+
+    @staticmethod
+    def __pad(card: List[str], length: int) -> List[str]:
+        """
+        Short lines do not contain the trailing blank fields, add them
+        """
+        if len(card) < length:
+            card += [""] * (length - len(card))
+        return card
+
+    def __read_grid(self, card: List[str]) -> None:
+        """
+        GRID ID CP X1 X2 X3
+        Large and free field cards: the fields are only collected here, they are
+        decoded block wise
+        """
+        if self.__grid_lines:
+            self.__decode_grids()
+        card = self.__pad(card, 6)
+        self.__grid_id_fields.append(card[1])
+        self.__grid_coord_fields += card[3:6]
+        if len(self.__grid_id_fields) >= self.grid_block_size:
+            self.__decode_grids()
+
+    def __read_grid_line(self, line: str) -> None:
+        """
+        Small field GRID line: the line is only collected here, the fields are
+        sliced from the lines block wise
+        """
+        if self.__grid_id_fields:
+            self.__decode_grids()
+        self.__grid_lines.append(line)
+        if len(self.__grid_lines) >= self.grid_block_size:
+            self.__decode_grids()
+
+    def __decode_grids(self) -> None:
+        """
+        This method decodes the collected GRID lines or fields in one vectorized pass
+        (only one of them is collected at a time, so the deck order is kept)
+        """
+        if self.__grid_lines:
+            size = self.tokenizer.blocksize
+            chars = lines_to_char_matrix(self.__grid_lines, 6 * size)
+            self.__grid_id_blocks.append(
+                decode_ints(
+                    np.ascontiguousarray(chars[:, size : 2 * size])
+                    .view(f"S{size}")
+                    .reshape(-1)
+                )
+            )
+            self.__grid_coord_blocks.append(
+                decode_float_matrix(chars[:, 3 * size :].reshape(-1, size)).reshape(
+                    -1, 3
+                )
+            )
+            self.__grid_lines = []
+        if self.__grid_id_fields:
+            self.__grid_id_blocks.append(decode_ints(self.__grid_id_fields))
+            self.__grid_coord_blocks.append(
+                decode_floats(self.__grid_coord_fields).reshape(-1, 3)
+            )
+            self.__grid_id_fields = []
+            self.__grid_coord_fields = []
+
+    def __read_element(self, card: List[str]) -> None:
+        """
+        CXXXX EID PID G1 G2 ... (blank grid fields are skipped)
+        """
+        keyword = card[0]
+        node_fields = card[3 : 3 + self.element_keywords[keyword]]
+        node_ids = [int(node_id) for node_id in node_fields if node_id != ""]
+        self.bulk_data.elements.append((keyword, int(card[1]), int(card[2]), node_ids))
+
+    def __read_rbe2(self, card: List[str]) -> None:
+        """
+        RBE2 EID GN CM GM1 GM2 ... [ALPHA]
+        """
+        # anything with a . is not a node (alpha)
+        node_ids = [
+            int(node_id) for node_id in card[4:] if node_id and "." not in node_id
+        ]
+        self.bulk_data.rigids.append(
+            ("RBE2", int(card[1]), int(card[2]), int(card[3]), node_ids)
+        )
+
+    def __read_rbe3(self, card: List[str]) -> None:
+        """
+        RBE3 EID blank REFGRID REFC WT1 C1 G1,1 G1,2 ... WT2 C2 G2,1 ...
+        """
+        node_ids = []
+        component_follows = False
+        for field in card[5:]:
+            if field == "":
+                continue
+            if field in self.rbe3_end_keywords:
+                break
+            # a weight, the next field is the component of this group
+            if "." in field:
+                component_follows = True
+                continue
+            if component_follows:
+                component_follows = False
+                continue
+            node_ids.append(int(field))
+        self.bulk_data.rigids.append(
+            ("RBE3", int(card[1]), int(card[3]), int(card[4]), node_ids)
+        )
+
+    def __read_load(self, card: List[str]) -> None:
+        """
+        FORCE/MOMENT SID G CID F N1 N2 N3
+        """
+        card = self.__pad(card, 8)
+        self.bulk_data.loads.append(
+            (
+                card[0],
+                int(card[1]),
+                int(card[2]),
+                int(card[3] or 0),
+                parse_nastran_float(card[4]),
+                [parse_nastran_float(component) for component in card[5:8]],
+            )
+        )
+
+    def __read_spc(self, card: List[str]) -> None:
+        """
+        SPC SID G1 C1 D1 [G2 C2 D2]
+        """
+        card = self.__pad(card, 8)
+        for i in (2, 5):
+            if card[i] == "":
+                continue
+            self.bulk_data.spcs.append(
+                (
+                    int(card[1]),
+                    int(card[i]),
+                    card[i + 1],
+                    parse_nastran_float(card[i + 2]),
+                )
+            )
+
+
+INCLUDE_PATTERN = re.compile(
+    rb"^[ \t]*INCLUDE[ \t]*(?:'([^']*)'|\"([^\"]*)\"|(\S+))[^\n]*(?:\n|$)",
+    re.IGNORECASE | re.MULTILINE,
+)
+
+
+def find_include_segments(
+    file_path: str, parents: Tuple[str, ...] = ()
+) -> List[Tuple[str, int, int]]:
+    """
+    This method splits a deck at its INCLUDE statements into byte ranges
+    (file_path, start, end) in deck order. Included files are resolved relative to
+    the including file and expanded recursively, the INCLUDE statements themselves
+    are not part of any range. A quoted file name may be continued on the next lines
+    """
+    file_path = os.path.abspath(file_path)
+    if file_path in parents:
+        Logger().log_err(f"INCLUDE of {file_path} is circular, ignoring")
+        return []
+    if not os.path.isfile(file_path):
+        Logger().log_err(f"Included file {file_path} not found")
+        return []
+
+    # a compressed file can not be mapped and its INCLUDEs are not searched, the
+    # reader parses a deck with a compressed file serially
+    if is_compressed(file_path):
+        return [(file_path, 0, os.path.getsize(file_path))]
+
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        if size == 0:
+            return []
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            matches = [
+                (
+                    match.start(),
+                    match.end(),
+                    next(name for name in match.groups() if name),
+                )
+                for match in INCLUDE_PATTERN.finditer(mapped)
+            ]
+
+    segments = []
+    position = 0
+    for start, end, name in matches:
+        if start > position:
+            segments.append((file_path, position, start))
+        name = re.sub(rb"\s*\n\s*", b"", name).strip().decode("utf-8")
+        include_path = os.path.join(os.path.dirname(file_path), name)
+        segments += find_include_segments(include_path, parents + (file_path,))
+        position = end
+    if position < size:
+        segments.append((file_path, position, size))
+    return segments
+
+
+def find_card_boundaries(
+    file_path: str, n_chunks: int, start: int = 0, end: int = None
+) -> List[int]:
+    """
+    This method splits a file (or the byte range start:end of it) into n_chunks byte
+    ranges of about the same size. Every boundary is moved forward to the next line
+    which starts a card, so no card is split between two ranges.
+    Returns the sorted offsets including start and end (default: the file size)
+    """
+    with open(file_path, "rb") as file:
+        size = os.fstat(file.fileno()).st_size
+        end = size if end is None else end
+        if size == 0:
+            return [0, 0]
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            boundaries = [start]
+            for i in range(1, n_chunks):
+                offset = max(start + (end - start) * i // n_chunks, boundaries[-1])
+                # go to the beginning of the next line
+                line_end = mapped.find(b"\n", offset, end)
+                offset = end if line_end == -1 else line_end + 1
+
+                mapped.seek(offset)
+                while offset < end:
+                    line = mapped.readline()
+                    if CardTokenizer.is_card_start(line.decode("utf-8")):
+                        break
+                    offset += len(line)
+                boundaries.append(min(offset, end))
+            boundaries.append(end)
+    return boundaries
+
+
+def parse_byte_range(file_path: str, block_size: int, start: int, end: int) -> BulkData:
+    """
+    This method parses the cards of a byte range of a file (worker of the parallel reading).
+    INCLUDE statements are not resolved here, the ranges of the include files are
+    parsed separately
+    """
+    return BulkDataParser(block_size).parse(iter_file_lines(file_path, start, end))
@@ -0,0 +1,126 @@
+import numpy as np
+
+SPACE = ord(" ")
+DOT = ord(".")
+PLUS = ord("+")
+MINUS = ord("-")
+EXPONENT = ord("E")
+
+
+def to_char_matrix(fields) -> np.ndarray:
+    """
+    This method converts a sequence of string fields into an (n, width) uint8 matrix,
+    short fields are padded with zeros
+    """
+    fields = np.ascontiguousarray(fields, dtype="S").reshape(-1)
+    return fields.view(np.uint8).reshape(fields.size, fields.itemsize)
+
+
+def decode_float_matrix(chars: np.ndarray) -> np.ndarray:
+    """
+    This method decodes an (n, width) uint8 matrix of fixed width real fields in one pass.
+    Handles the exponent without the E (1.234-3, 1.2+5), the D exponent and blank fields (= 0.0)
+    """
+    n_rows, width = chars.shape
+    if n_rows == 0:
+        return np.zeros(0, dtype=np.float64)
+
+    # D / d / e exponents -> E
+    chars = np.where(np.isin(chars, (ord("D"), ord("d"), ord("e"))), EXPONENT, chars)
+
+    # a sign after a digit or a dot is the start of an exponent without the E
+    previous = np.zeros_like(chars)
+    previous[:, 1:] = chars[:, :-1]
+    implicit_exponent = ((chars == PLUS) | (chars == MINUS)) & (
+        ((previous >= ord("0")) & (previous <= ord("9"))) | (previous == DOT)
+    )
+    has_exponent = implicit_exponent.any(axis=1)
+    position = np.where(has_exponent, implicit_exponent.argmax(axis=1), width + 1)
+
+    # insert the E by shifting everything from the sign one column to the right
+    columns = np.arange(width + 1)
+    source = columns - (columns > position[:, None])
+    normalized = np.take_along_axis(chars, np.minimum(source, width - 1), axis=1)
+    normalized[columns == position[:, None]] = EXPONENT
+    normalized[:, width] = np.where(has_exponent, normalized[:, width], 0)
+
+    # blank fields
+    blank = ((normalized == 0) | (normalized == SPACE)).all(axis=1)
+    normalized[blank, 0] = ord("0")
+
+    normalized = np.ascontiguousarray(normalized)
+    return normalized.view(f"S{width + 1}").reshape(n_rows).astype(np.float64)
+
+
+def decode_floats(fields) -> np.ndarray:
+    """
+    This method decodes a sequence of real fields of a .fem file (any of the
+    Nastran formats) into a float array of the same length
+    """
+    return decode_float_matrix(to_char_matrix(fields))
+
+
+def decode_ints(fields) -> np.ndarray:
+    """
+    This method decodes a sequence of integer fields into an int64 array
+    """
+    if len(fields) == 0:
+        return np.zeros(0, dtype=np.int64)
+    return np.asarray(fields, dtype="S").astype(np.int64)
+
+
+def lines_to_char_matrix(lines, width: int, count: int = -1) -> np.ndarray:
+    """
+    This method converts text lines into an (n, width) uint8 matrix, longer lines are
+    cut and shorter lines are padded with zeros (the line ends are removed).
+    count: number of lines if known, the matrix is then allocated once and the lines
+    can be a generator
+    """
+    rows = np.fromiter(
+        (line.rstrip("\r\n") for line in lines), dtype=f"S{width}", count=count
+    )
+    return rows.view(np.uint8).reshape(len(rows), width)
+
+
+def decode_force_rows(
+    lines,
+    first_column_length: int,
+    column_size: int = 13,
+    n_columns: int = 6,
+    *,
+    node_filter: np.ndarray = None,
+    count: int = -1,
+):
+    """
+    This method decodes the rows of a MPC / SPC force table in one pass. Returns the
+    node ids (int array) and the (n, n_columns) forces, blank columns are 0.
+    Rows without a node id in the first column (e.g. separator lines) are skipped.
+    node_filter: only the rows of these node ids are kept (the forces of the other
+    rows are not decoded at all)
+    count: number of lines if known (see lines_to_char_matrix)
+    """
+    width = first_column_length + n_columns * column_size
+    chars = lines_to_char_matrix(lines, width, count)
+
+    # a node id consists only of digits and blanks
+    id_chars = chars[:, :first_column_length]
+    is_digit = (id_chars >= ord("0")) & (id_chars <= ord("9"))
+    valid = ((is_digit | (id_chars == SPACE) | (id_chars == 0)).all(axis=1)) & (
+        is_digit.any(axis=1)
+    )
+    chars = chars[valid]
+
+    node_ids = decode_ints(
+        np.ascontiguousarray(chars[:, :first_column_length])
+        .view(f"S{first_column_length}")
+        .reshape(-1)
+    )
+    if node_filter is not None:
+        keep = np.isin(node_ids, node_filter)
+        node_ids = node_ids[keep]
+        chars = chars[keep]
+
+    forces = decode_float_matrix(
+        chars[:, first_column_length:].reshape(-1, column_size)
+    ).reshape(-1, n_columns)
+    return node_ids, forces
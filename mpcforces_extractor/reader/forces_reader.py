@@ -1,6 +1,93 @@
-from typing import List
+import mmap
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
 from mpcforces_extractor.datastructure.subcases import Subcase, ForceType
 from mpcforces_extractor.logging.logger import Logger
+from mpcforces_extractor.reader.fixed_width import decode_force_rows
+from mpcforces_extractor.reader.line_reader import (
+    is_compressed,
+    iter_file_lines,
+    iter_mapped_lines,
+    open_text,
+)
+from mpcforces_extractor.reader.subcase_index import SubcaseIndex
+
+
+# state of the pool workers, set once per process by init_worker
+worker_state: Dict = {}
+
+
+def init_worker(node_filter: np.ndarray) -> None:
+    """
+    This method stores the node filter in a pool worker, so it is not sent with every table
+    """
+    worker_state["node_filter"] = node_filter
+
+
+def read_force_table(
+    file_path: str, entry: Dict, column_size: int
+) -> Tuple[int, float, np.ndarray, np.ndarray]:
+    """
+    This method reads one force table of the subcase index (worker of the parallel
+    reading). Returns (subcase_id, time, node_ids, forces) as compact arrays.
+    The rows are decoded straight from the lines, the row count of the index sizes
+    the decode matrix
+    """
+    if entry["rows"] > 0:
+        rows = (
+            line
+            for line in iter_mapped_lines(file_path, entry["start"], entry["end"])
+            if line.strip() != "" and not line.startswith("-")
+        )
+        node_ids, forces = decode_force_rows(
+            rows,
+            entry["first_column_length"],
+            column_size,
+            node_filter=worker_state.get("node_filter"),
+            count=entry["rows"],
+        )
+    else:
+        node_ids = np.zeros(0, dtype=np.int64)
+        forces = np.zeros((0, 6), dtype=np.float64)
+    return entry["subcase_id"], entry["time"], node_ids, forces
+
+
+def add_force_blocks(
+    blocks: Iterator[Tuple[int, float, np.ndarray, np.ndarray]],
+    force_type: ForceType,
+) -> Tuple[List[int], np.ndarray]:
+    """
+    This method adds the forces of the blocks to the subcases, they are created if
+    needed. Returns the ids of the subcases in the order of the blocks and the sorted
+    ids of the nodes with forces
+    """
+    subcase_ids = []
+    # rows of the shared node index which got forces
+    has_forces = np.zeros(0, dtype=bool)
+    for subcase_id, subcase_time, node_ids, forces in blocks:
+        subcase = Subcase.get_subcase_by_id(subcase_id)
+        if subcase is None:
+            subcase = Subcase(subcase_id, subcase_time)
+        if subcase_id not in subcase_ids:
+            subcase_ids.append(subcase_id)
+
+        rows = subcase.add_forces(node_ids, forces, force_type)
+        if len(has_forces) < len(Subcase.node_index):
+            has_forces = np.concatenate(
+                [
+                    has_forces,
+                    np.zeros(
+                        max(len(Subcase.node_index), 2 * len(has_forces))
+                        - len(has_forces),
+                        dtype=bool,
+                    ),
+                ]
+            )
+        has_forces[rows] = True
+    rows = np.flatnonzero(has_forces)
+    return subcase_ids, np.sort(Subcase.node_index.ids[rows])
 
 
 class ForcesReader:
@@ -11,91 +98,310 @@ class ForcesReader:
     file_path: str = None
     file_content: str = None
 
-    def __init__(self, file_path):
+    # width of the force columns
+    column_size: int = 13
+    # max number of rows of a yielded force block
+    block_rows: int = 65536
+
+    def __init__(
+        self,
+        file_path,
+        streaming: bool = False,
+        workers: int = 1,
+        node_ids=None,
+    ):
+        """
+        streaming: do not read the lines into file_content, the file is read
+        line by line while the force blocks are built
+        workers: number of processes, if > 1 the subcase tables are parsed in
+        parallel (implies streaming, plain files only)
+        node_ids: ids of the nodes of interest, the rows of all other nodes are
+        skipped while decoding (all nodes if None)
+        """
         self.file_path = file_path
-        Logger().start_timing("Reading forces file: " + file_path)
-        self.file_content = self.__read_lines()
-        Logger().stop_timing("Reading forces file: " + file_path)
-        self.node_ids = []
+        self.streaming = streaming
+        self.workers = workers
+        self.node_filter = None
+        if node_ids is not None:
+            self.node_filter = np.unique(np.fromiter(node_ids, dtype=np.int64))
+        self.file_content = None
+        # tail mode: byte offset up to which the file is parsed and the
+        # (subcase_id, time) of the file at this offset
+        self.offset: int = 0
+        self.tail_state: Tuple[int, float] = (0, 0)
+        if not streaming and workers <= 1:
+            Logger().start_timing("Reading forces file: " + file_path)
+            self.file_content = self.__read_lines()
+            Logger().stop_timing("Reading forces file: " + file_path)
+        # sorted ids of the nodes with forces
+        self.node_ids = np.empty(0, dtype=np.int64)
 
     def __read_lines(self) -> List[str]:
         """
-        This method reads the lines of the MPC forces file
+        This method reads the lines of the MPC forces file (gzip, bz2 and xz
+        compressed files are decompressed on the fly)
         """
-        with open(self.file_path, "r", encoding="utf-8") as file:
+        with open_text(self.file_path) as file:
             return file.readlines()
         return []
 
-    def build_subcases(self, force_type: ForceType) -> None:
+    def __iter_lines(self) -> Iterator[str]:
         """
-        This method is used to extract the forces from the MPC forces file
-        and build the subcases
+        This method yields the lines of the forces file, either from file_content
+        or streamed from the file
         """
-        subcase_id = 0
-        subcase_time = 0
-        subcase = None
+        if self.file_content is not None:
+            yield from self.file_content
+        else:
+            yield from iter_file_lines(self.file_path)
 
-        logger = Logger()
-        logger.start_timing("Building subcases data from " + force_type.name)
-        for i, _ in enumerate(self.file_content):
-            line = self.file_content[i].strip()
-
-            if line.startswith("$SUBCASE"):
-                subcase_id = int(line[0:23].replace("$SUBCASE", "").strip())
-            if line.startswith("$TIME"):
-                subcase_time = float(line.replace("$TIME", "").strip())
-                if Subcase.get_subcase_by_id(subcase_id):
-                    subcase = Subcase.get_subcase_by_id(subcase_id)
-                else:
-                    subcase = Subcase(subcase_id, subcase_time)
-
-            if "X-FORCE" in line:
-                i += 1
-                line = self.file_content[i].strip()
+    def __decode_rows(
+        self, lines: List[str], first_column_length: int
+    ) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        This method decodes the rows of a force table into the node ids and the
+        (n, 6) forces. Blank columns are 0, rows without a node id are skipped
+        """
+        if not lines:
+            return np.zeros(0, dtype=np.int64), np.zeros((0, 6), dtype=np.float64)
+        return decode_force_rows(
+            lines, first_column_length, self.column_size, node_filter=self.node_filter
+        )
+
+    def iter_force_blocks(
+        self, subcase_ids: List[int] = None
+    ) -> Iterator[Tuple[int, float, np.ndarray, np.ndarray]]:
+        """
+        This method yields the force tables as blocks (subcase_id, time, node_ids, forces)
+        with at most block_rows rows. Every $TIME header yields at least one (maybe empty)
+        block. subcase_ids: only these subcases (all if None), for a plain file the
+        subcase index is used to seek to their tables directly.
+        With workers > 1 every table is parsed as one block in a process pool
+        """
+        if (
+            (subcase_ids is not None or self.workers > 1)
+            and self.file_content is None
+            and not is_compressed(self.file_path)
+        ):
+            entries = SubcaseIndex.open(self.file_path).select(subcase_ids)
+            if self.workers > 1:
+                yield from self.__iter_parallel_blocks(entries)
+            else:
+                for entry in entries:
+                    yield from self.__iter_indexed_blocks(entry)
+        else:
+            selected = None if subcase_ids is None else set(subcase_ids)
+            yield from self.__scan_force_blocks(self.__iter_lines(), selected)
+
+    def iter_new_force_blocks(
+        self, subcase_ids: List[int] = None
+    ) -> Iterator[Tuple[int, float, np.ndarray, np.ndarray]]:
+        """
+        This method yields the blocks appended to the file since the last call (tail mode
+        for a file the solver is still writing). Only complete blocks are read, the end of
+        the parsed part is remembered in offset
+        """
+        if is_compressed(self.file_path):
+            raise ValueError(f"Tail mode needs an uncompressed file: {self.file_path}")
+        if os.path.getsize(self.file_path) < self.offset:
+            Logger().log_warn(f"{self.file_path} got shorter, it is read again")
+            self.offset, self.tail_state = 0, (0, 0)
+
+        end, end_state = self.__find_complete_end()
+        if end == self.offset:
+            return
+        selected = None if subcase_ids is None else set(subcase_ids)
+        yield from self.__scan_force_blocks(
+            iter_mapped_lines(self.file_path, self.offset, end),
+            selected,
+            self.tail_state,
+        )
+        self.offset, self.tail_state = end, end_state
+
+    def __find_complete_end(self) -> Tuple[int, Tuple[int, float]]:
+        """
+        This method returns the end of the complete blocks after offset and the
+        (subcase_id, time) at this end. Everything before a $SUBCASE / $TIME line is
+        complete, a table is complete once the separator line after its rows is written
+        """
+        complete_end, complete_state = self.offset, self.tail_state
+        subcase_id, subcase_time = self.tail_state
+        in_table = False
+        header_follows = False
+        with open(self.file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size <= self.offset:
+                return complete_end, complete_state
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                mapped.seek(self.offset)
+                while True:
+                    line_start = mapped.tell()
+                    line = mapped.readline()
+                    # a line without a line break is still being written
+                    if not line.endswith(b"\n"):
+                        break
+                    stripped = line.strip()
+                    if stripped.startswith((b"$SUBCASE", b"$TIME")):
+                        complete_end = line_start
+                        complete_state = (subcase_id, subcase_time)
+                        if stripped.startswith(b"$SUBCASE"):
+                            subcase_id = int(
+                                stripped[0:23].replace(b"$SUBCASE", b"").strip()
+                            )
+                        else:
+                            subcase_time = float(
+                                stripped.replace(b"$TIME", b"").strip()
+                            )
+                    if stripped.startswith(b"$"):
+                        in_table = False
+                    elif b"X-FORCE" in stripped:
+                        header_follows = True
+                    elif header_follows:
+                        header_follows = False
+                        in_table = True
+                    elif in_table and stripped.startswith(b"-"):
+                        in_table = False
+                        complete_end = mapped.tell()
+                        complete_state = (subcase_id, subcase_time)
+        return complete_end, complete_state
+
+    def __scan_force_blocks(
+        self, lines: Iterator[str], selected: set, state: Tuple[int, float] = (0, 0)
+    ) -> Iterator[Tuple[int, float, np.ndarray, np.ndarray]]:
+        """
+        This method goes through the lines once and yields the blocks of the selected
+        subcases (all if None). state: (subcase_id, time) before the first line
+        """
+        subcase_id, subcase_time = state
+        first_column_length = None
+        in_table = False
+        header_follows = False
+        announce = False
+        rows = []
+
+        for line in lines:
+            stripped = line.strip()
+
+            # a $ line ends the current table, a new subcase header also announces
+            # the previous subcase if it had no rows
+            # (the header lines are always parsed, only rows of selected subcases are kept)
+            if stripped.startswith("$"):
+                new_subcase = stripped.startswith(("$SUBCASE", "$TIME"))
+                if rows or (announce and new_subcase):
+                    yield (subcase_id, subcase_time) + self.__decode_rows(
+                        rows, first_column_length
+                    )
+                    rows = []
+                    announce = False
+                in_table = False
+
+                if stripped.startswith("$SUBCASE"):
+                    subcase_id = int(stripped[0:23].replace("$SUBCASE", "").strip())
+                if stripped.startswith("$TIME"):
+                    subcase_time = float(stripped.replace("$TIME", "").strip())
+                    announce = selected is None or subcase_id in selected
+                continue
+
+            if "X-FORCE" in stripped:
+                header_follows = True
+                continue
+
+            if header_follows:
                 # first index of + in line
-                first_column_length = line.find("+")
-
-                i += 1
-                line = self.file_content[i].strip()
-                while i < len(self.file_content):
-
-                    line = self.file_content[i]
-                    if line.strip() == "":
-                        i += 1
-                        continue
-
-                    # take the first_column_length characters as the node id
-                    try:
-                        node_id = int(line[:first_column_length].strip())
-                    except ValueError:
-                        i += 1
-                        continue
-
-                    # take the next 13 characters as the force values
-                    n = 13
-                    line_content = [
-                        line[j : j + n]
-                        for j in range(first_column_length, len(line), n)
-                    ]
-                    line_content = line_content[:-1]
-                    for j, _ in enumerate(line_content):
-                        line_content[j] = line_content[j].strip()
-
-                    if len(line_content) < 6:
-                        line_content += [""] * (6 - len(line_content))
-
-                    force_x = float(line_content[0]) if line_content[0] != "" else 0
-                    force_y = float(line_content[1]) if line_content[1] != "" else 0
-                    force_z = float(line_content[2]) if line_content[2] != "" else 0
-                    moment_x = float(line_content[3]) if line_content[3] != "" else 0
-                    moment_y = float(line_content[4]) if line_content[4] != "" else 0
-                    moment_z = float(line_content[5]) if line_content[5] != "" else 0
-
-                    force = [force_x, force_y, force_z, moment_x, moment_y, moment_z]
-
-                    subcase.add_force(node_id, force, force_type)
-                    self.node_ids.append(node_id)
-
-                    i += 1
+                first_column_length = stripped.find("+")
+                header_follows = False
+                in_table = True
+                continue
+
+            if not in_table or stripped == "":
+                continue
 
+            if selected is None or subcase_id in selected:
+                rows.append(line)
+            if len(rows) >= self.block_rows:
+                yield (subcase_id, subcase_time) + self.__decode_rows(
+                    rows, first_column_length
+                )
+                rows = []
+                announce = False
+
+        if rows or announce:
+            yield (subcase_id, subcase_time) + self.__decode_rows(
+                rows, first_column_length
+            )
+
+    def __iter_indexed_blocks(
+        self, entry: Dict
+    ) -> Iterator[Tuple[int, float, np.ndarray, np.ndarray]]:
+        """
+        This method yields the blocks of one table of the subcase index, only its
+        byte range of the file is read
+        """
+        rows = []
+        announce = True
+        for line in iter_mapped_lines(self.file_path, entry["start"], entry["end"]):
+            if line.strip() == "":
+                continue
+            rows.append(line)
+            if len(rows) >= self.block_rows:
+                yield (entry["subcase_id"], entry["time"]) + self.__decode_rows(
+                    rows, entry["first_column_length"]
+                )
+                rows = []
+                announce = False
+        if rows or announce:
+            yield (entry["subcase_id"], entry["time"]) + self.__decode_rows(
+                rows, entry["first_column_length"]
+            )
+
+    def __iter_parallel_blocks(
+        self, entries: List[Dict]
+    ) -> Iterator[Tuple[int, float, np.ndarray, np.ndarray]]:
+        """
+        This method parses the tables of the subcase index in a process pool,
+        the results are yielded in file order
+        """
+        if not entries:
+            return
+        chunksize = max(1, len(entries) // (4 * self.workers))
+        with ProcessPoolExecutor(
+            max_workers=self.workers,
+            initializer=init_worker,
+            initargs=(self.node_filter,),
+        ) as executor:
+            yield from executor.map(
+                read_force_table,
+                [self.file_path] * len(entries),
+                entries,
+                [self.column_size] * len(entries),
+                chunksize=chunksize,
+            )
+
+    def build_subcases(
+        self, force_type: ForceType, subcase_ids: List[int] = None
+    ) -> None:
+        """
+        This method is used to extract the forces from the MPC forces file
+        and build the subcases (only the given subcase_ids, all if None)
+        """
+        logger = Logger()
+        logger.start_timing("Building subcases data from " + force_type.name)
+        _, node_ids = add_force_blocks(self.iter_force_blocks(subcase_ids), force_type)
+        self.node_ids = np.union1d(self.node_ids, node_ids)
         logger.stop_timing("Building subcases data from " + force_type.name)
+
+    def update_subcases(
+        self, force_type: ForceType, subcase_ids: List[int] = None
+    ) -> List[int]:
+        """
+        This method adds the complete blocks appended to the file since the last call
+        to the subcases (only the given subcase_ids, all if None) and returns the ids
+        of the subcases which got forces
+        """
+        logger = Logger()
+        logger.start_timing("Updating subcases data from " + force_type.name)
+        updated_subcase_ids, node_ids = add_force_blocks(
+            self.iter_new_force_blocks(subcase_ids), force_type
+        )
+        self.node_ids = np.union1d(self.node_ids, node_ids)
+        logger.stop_timing("Updating subcases data from " + force_type.name)
+        return updated_subcase_ids
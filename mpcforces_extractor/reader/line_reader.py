@@ -0,0 +1,123 @@
+import bz2
+import gzip
+import lzma
+import mmap
+import os
+import queue
+import threading
+from typing import Callable, Iterator, TextIO
+
+# magic bytes at the beginning of a file: opener of the compression format
+COMPRESSION_OPENERS = {
+    b"\x1f\x8b": gzip.open,
+    b"BZh": bz2.open,
+    b"\xfd7zXZ\x00": lzma.open,
+}
+
+
+def get_compression_opener(file_path: str) -> Callable:
+    """
+    This method returns the opener (gzip/bz2/lzma.open) of a compressed file,
+    None if the file is not compressed. The format is detected by the magic bytes
+    """
+    with open(file_path, "rb") as file:
+        header = file.read(6)
+    for magic, opener in COMPRESSION_OPENERS.items():
+        if header.startswith(magic):
+            return opener
+    return None
+
+
+def is_compressed(file_path: str) -> bool:
+    """
+    This method checks if a file is gzip, bz2 or xz compressed
+    """
+    return get_compression_opener(file_path) is not None
+
+
+def open_text(file_path: str) -> TextIO:
+    """
+    This method opens a (possibly compressed) file for reading text, compressed
+    files are decompressed on the fly
+    """
+    opener = get_compression_opener(file_path)
+    if opener is None:
+        return open(file_path, "r", encoding="utf-8")
+    return opener(file_path, "rt", encoding="utf-8")
+
+
+def iter_mapped_lines(file_path: str, start: int = 0, end: int = None) -> Iterator[str]:
+    """
+    This method yields the lines of a file through a memory map. The lines are decoded
+    one at a time, so the file content is never held in memory as a whole.
+    start / end: byte range to read, start has to be the beginning of a line
+    """
+    with open(file_path, "rb") as file:
+        # an empty file can not be mapped
+        if os.fstat(file.fileno()).st_size == 0:
+            return
+        with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+            end = len(mapped) if end is None else end
+            mapped.seek(start)
+            while mapped.tell() < end:
+                yield mapped.readline().decode("utf-8")
+
+
+def iter_decompressed_lines(
+    file_path: str, queue_size: int = 8, batch_size: int = 1 << 20
+) -> Iterator[str]:
+    """
+    This method yields the lines of a compressed file. The decompression runs in a
+    background thread which hands over batches of lines (about batch_size chars)
+    through a bounded queue, so it overlaps with the processing of the lines and
+    only queue_size batches are held in memory
+    """
+    batches = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+
+    def put(item) -> None:
+        while not stop.is_set():
+            try:
+                batches.put(item, timeout=0.1)
+                return
+            except queue.Full:
+                continue
+
+    def decompress() -> None:
+        try:
+            with open_text(file_path) as file:
+                while not stop.is_set():
+                    batch = file.readlines(batch_size)
+                    if not batch:
+                        break
+                    put(batch)
+        except (OSError, EOFError, ValueError, lzma.LZMAError) as error:
+            put(error)
+        finally:
+            put(None)
+
+    thread = threading.Thread(target=decompress, daemon=True)
+    thread.start()
+    try:
+        while True:
+            batch = batches.get()
+            if batch is None:
+                return
+            if isinstance(batch, Exception):
+                raise batch
+            yield from batch
+    finally:
+        stop.set()
+        thread.join()
+
+
+def iter_file_lines(file_path: str, start: int = 0, end: int = None) -> Iterator[str]:
+    """
+    This method yields the lines of a file, compressed files are decompressed in a
+    background thread, plain files are read through a memory map.
+    start / end: byte range of a plain file, a compressed file is always read as a whole
+    """
+    if is_compressed(file_path):
+        yield from iter_decompressed_lines(file_path)
+    else:
+        yield from iter_mapped_lines(file_path, start, end)
@@ -0,0 +1,295 @@
+import hashlib
+import json
+import os
+from typing import Dict, List, Tuple
+import numpy as np
+from mpcforces_extractor.logging.logger import Logger
+from mpcforces_extractor.reader.bulk_data import BulkData, BulkDataParser
+
+
+def pack_lists(lists: List[List[int]]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    This method stores a list of int lists as one flat array plus the offsets
+    (list i is flat[offsets[i]:offsets[i + 1]])
+    """
+    offsets = np.zeros(len(lists) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum([len(values) for values in lists], dtype=np.int64)
+    flat = np.fromiter(
+        (value for values in lists for value in values),
+        dtype=np.int64,
+        count=int(offsets[-1]),
+    )
+    return flat, offsets
+
+
+def unpack_lists(flat: np.ndarray, offsets: np.ndarray) -> List[List[int]]:
+    """
+    This method is the inverse of pack_lists
+    """
+    values = flat.tolist()
+    bounds = offsets.tolist()
+    return [values[start:end] for start, end in zip(bounds[:-1], bounds[1:])]
+
+
+class ModelSnapshot:
+    """
+    This class holds what is restored from the cache: the decoded cards and the part labels
+    (detected with part_mode, see PartMode, and corner_nodes_only) and the source files
+    the cards were read from (the .fem file first)
+    """
+
+    def __init__(
+        self,
+        bulk_data: BulkData,
+        part_id2node_ids: Dict,
+        part_mode: str = "graph",
+        corner_nodes_only: bool = False,
+        source_paths: List[str] = None,
+    ):
+        self.bulk_data = bulk_data
+        self.part_id2node_ids = part_id2node_ids
+        self.part_mode = part_mode
+        self.corner_nodes_only = corner_nodes_only
+        self.source_paths = source_paths or []
+
+
+class ModelCache:
+    """
+    This class stores the parsed model (the tables of the BulkData and the part labels)
+    as a binary snapshot (.npz, no pickle). The snapshot remembers size, mtime and
+    content hash of the source files and the settings of the reader, it is only used
+    as long as none of them changed
+    """
+
+    version: int = 1
+    hash_block_size: int = 1 << 20
+
+    def __init__(self, cache_file_path: str, block_size: int = 8):
+        self.cache_file_path = cache_file_path
+        self.reader_settings = self.get_reader_settings(block_size)
+
+    @staticmethod
+    def get_reader_settings(block_size: int) -> Dict:
+        """
+        This method returns the settings of the reader the cards are decoded with:
+        the field width and the supported cards
+        """
+        return {
+            "block_size": block_size,
+            "cards": sorted(BulkDataParser(block_size).card_handlers),
+            "element_keywords": dict(BulkDataParser.element_keywords),
+        }
+
+    @staticmethod
+    def file_hash(file_path: str) -> str:
+        """
+        This method returns the sha256 of the content of a file
+        """
+        digest = hashlib.sha256()
+        with open(file_path, "rb") as file:
+            for block in iter(lambda: file.read(ModelCache.hash_block_size), b""):
+                digest.update(block)
+        return digest.hexdigest()
+
+    @staticmethod
+    def file_key(file_path: str) -> Dict:
+        """
+        This method returns the key of a source file
+        """
+        stat = os.stat(file_path)
+        return {
+            "path": os.path.abspath(file_path),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+            "hash": ModelCache.file_hash(file_path),
+        }
+
+    @staticmethod
+    def is_unchanged(key: Dict) -> bool:
+        """
+        This method checks if a source file still matches its key. The hash is only
+        computed if the mtime changed (e.g. the file was copied or touched)
+        """
+        if not os.path.isfile(key["path"]):
+            return False
+        stat = os.stat(key["path"])
+        if stat.st_size != key["size"]:
+            return False
+        if stat.st_mtime_ns == key["mtime"]:
+            return True
+        return ModelCache.file_hash(key["path"]) == key["hash"]
+
+    def load(self, file_path: str) -> ModelSnapshot:
+        """
+        This method returns the snapshot of the given .fem file, None if there is
+        no snapshot or if any of its source files changed
+        """
+        if not self.cache_file_path or not os.path.isfile(self.cache_file_path):
+            return None
+
+        try:
+            with np.load(self.cache_file_path, allow_pickle=False) as data:
+                meta = json.loads(str(data["meta"]))
+                if (meta["version"], meta.get("reader")) != (
+                    self.version,
+                    self.reader_settings,
+                ):
+                    return None
+                sources = meta["sources"]
+                if not sources or sources[0]["path"] != os.path.abspath(file_path):
+                    return None
+                if not all(self.is_unchanged(key) for key in sources):
+                    return None
+                return ModelSnapshot(
+                    self.__read_bulk_data(data),
+                    dict(
+                        zip(
+                            data["part_ids"].tolist(),
+                            unpack_lists(data["part_node_ids"], data["part_offsets"]),
+                        )
+                    ),
+                    meta.get("part_mode", "graph"),
+                    meta.get("corner_nodes_only", False),
+                    [key["path"] for key in sources],
+                )
+        except (OSError, ValueError, KeyError) as error:
+            Logger().log_warn(
+                f"Model cache {self.cache_file_path} is not valid: {error}"
+            )
+            return None
+
+    def save(
+        self,
+        source_paths: List[str],
+        bulk_data: BulkData,
+        part_id2node_ids: Dict,
+        part_mode: str = "graph",
+        corner_nodes_only: bool = False,
+    ) -> None:
+        """
+        This method writes the snapshot, the first source path is the .fem file itself
+        part_mode: how the parts were detected (value of PartMode)
+        corner_nodes_only: the parts were detected with the corner node graph
+        """
+        meta = {
+            "version": self.version,
+            "reader": self.reader_settings,
+            "sources": [self.file_key(file_path) for file_path in source_paths],
+            "part_mode": part_mode,
+            "corner_nodes_only": corner_nodes_only,
+        }
+        part_node_ids, part_offsets = pack_lists(list(part_id2node_ids.values()))
+
+        folder = os.path.dirname(self.cache_file_path)
+        if folder and not os.path.exists(folder):
+            os.makedirs(folder)
+
+        # write to a temporary file first, a crash never leaves a broken snapshot
+        temp_file_path = self.cache_file_path + ".tmp"
+        with open(temp_file_path, "wb") as file:
+            np.savez(
+                file,
+                meta=np.array(json.dumps(meta)),
+                part_ids=np.array(list(part_id2node_ids.keys()), dtype=np.int64),
+                part_node_ids=part_node_ids,
+                part_offsets=part_offsets,
+                **self.__write_bulk_data(bulk_data),
+            )
+        os.replace(temp_file_path, self.cache_file_path)
+
+    @staticmethod
+    def __write_bulk_data(bulk_data: BulkData) -> Dict[str, np.ndarray]:
+        """
+        This method converts the tables of the BulkData into arrays
+        """
+        element_node_ids, element_offsets = pack_lists(
+            [element[3] for element in bulk_data.elements]
+        )
+        rigid_node_ids, rigid_offsets = pack_lists(
+            [rigid[4] for rigid in bulk_data.rigids]
+        )
+        return {
+            "grid_ids": bulk_data.grid_ids,
+            "grid_coords": bulk_data.grid_coords,
+            "element_keywords": np.array(
+                [element[0] for element in bulk_data.elements], dtype=str
+            ),
+            "element_ids": np.array(
+                [element[1:3] for element in bulk_data.elements], dtype=np.int64
+            ).reshape(-1, 2),
+            "element_node_ids": element_node_ids,
+            "element_offsets": element_offsets,
+            "rigid_keywords": np.array(
+                [rigid[0] for rigid in bulk_data.rigids], dtype=str
+            ),
+            "rigid_ids": np.array(
+                [rigid[1:4] for rigid in bulk_data.rigids], dtype=np.int64
+            ).reshape(-1, 3),
+            "rigid_node_ids": rigid_node_ids,
+            "rigid_offsets": rigid_offsets,
+            "load_keywords": np.array([load[0] for load in bulk_data.loads], dtype=str),
+            "load_ids": np.array(
+                [load[1:4] for load in bulk_data.loads], dtype=np.int64
+            ).reshape(-1, 3),
+            "load_values": np.array(
+                [[load[4]] + list(load[5]) for load in bulk_data.loads],
+                dtype=np.float64,
+            ).reshape(-1, 4),
+            "spc_ids": np.array(
+                [spc[:2] for spc in bulk_data.spcs], dtype=np.int64
+            ).reshape(-1, 2),
+            "spc_dofs": np.array([spc[2] for spc in bulk_data.spcs], dtype=str),
+            "spc_values": np.array(
+                [spc[3] for spc in bulk_data.spcs], dtype=np.float64
+            ),
+        }
+
+    @staticmethod
+    def __read_bulk_data(data) -> BulkData:
+        """
+        This method rebuilds the BulkData from the arrays of the snapshot
+        """
+        bulk_data = BulkData()
+        bulk_data.grid_ids = data["grid_ids"]
+        bulk_data.grid_coords = data["grid_coords"]
+
+        element_node_ids = unpack_lists(
+            data["element_node_ids"], data["element_offsets"]
+        )
+        bulk_data.elements = [
+            (keyword, element_id, property_id, node_ids)
+            for keyword, (element_id, property_id), node_ids in zip(
+                data["element_keywords"].tolist(),
+                data["element_ids"].tolist(),
+                element_node_ids,
+            )
+        ]
+
+        rigid_node_ids = unpack_lists(data["rigid_node_ids"], data["rigid_offsets"])
+        bulk_data.rigids = [
+            (keyword, element_id, master_node_id, dofs, node_ids)
+            for keyword, (element_id, master_node_id, dofs), node_ids in zip(
+                data["rigid_keywords"].tolist(),
+                data["rigid_ids"].tolist(),
+                rigid_node_ids,
+            )
+        ]
+
+        bulk_data.loads = [
+            (keyword, load_id, node_id, system_id, values[0], values[1:])
+            for keyword, (load_id, node_id, system_id), values in zip(
+                data["load_keywords"].tolist(),
+                data["load_ids"].tolist(),
+                data["load_values"].tolist(),
+            )
+        ]
+
+        bulk_data.spcs = [
+            (system_id, node_id, dof_ids, dof_value)
+            for (system_id, node_id), dof_ids, dof_value in zip(
+                data["spc_ids"].tolist(),
+                data["spc_dofs"].tolist(),
+                data["spc_values"].tolist(),
+            )
+        ]
+        return bulk_data
@@ -1,8 +1,28 @@
-from typing import List, Dict
+import os
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, Iterator, List, Tuple
 from mpcforces_extractor.datastructure.rigids import MPC, MPC_CONFIG
-from mpcforces_extractor.datastructure.entities import Element1D, Element, Node
+from mpcforces_extractor.datastructure.entities import (
+    Element1D,
+    Element,
+    Node,
+    NodeTable,
+)
 from mpcforces_extractor.datastructure.loads import Moment, Force, SPC
+from mpcforces_extractor.datastructure.connectivity import flatten_node_ids
 from mpcforces_extractor.logging.logger import Logger
+from mpcforces_extractor.reader.bulk_data import (
+    BulkData,
+    BulkDataParser,
+    find_card_boundaries,
+    find_include_segments,
+    parse_byte_range,
+)
+from mpcforces_extractor.reader.line_reader import (
+    is_compressed,
+    iter_file_lines,
+    open_text,
+)
 
 
 class FemFileReader:
@@ -10,230 +30,204 @@ class FemFileReader:
     This class is used to read the .fem file and extract the nodes and the rigid elements
     """
 
-    element_keywords: List = [
-        "CTRIA3",
-        "CQUAD4",
-        "CTRIA6",
-        "CQUAD8",
-        "CHEXA",
-        "CPENTA",
-        "CTETRA",
-        "CROD",
-        "CTUBE",
-        "CBEAM",
-        "CBAR",
-    ]
-
     file_path: str = None
     file_content: str = None
-    nodes_id2node: Dict = {}
+    node_table: NodeTable = None
     rigid_elements: List[MPC] = []
     node2property = {}
     load_id2load: Dict = {}
     node_id2spc: Dict = {}
     blocksize: int = None
-
-    def __init__(self, file_path, block_size: int):
+    bulk_data: BulkData = None
+
+    def __init__(
+        self,
+        file_path,
+        block_size: int,
+        streaming: bool = False,
+        workers: int = 1,
+        *,
+        bulk_data: BulkData = None,
+    ):
+        """
+        streaming: read the file through a memory map card by card instead of
+        keeping all the lines in file_content
+        workers: number of processes, if > 1 the file is split into chunks
+        which are parsed in parallel (implies streaming)
+        INCLUDE statements are resolved (relative to the including file, nested) while
+        the cards are read. The include files are only loaded concurrently with
+        workers > 1: the deck and its include files are split into byte ranges first,
+        parsed in the process pool and merged in deck order. With workers = 1 they
+        are read one after the other in the single pass
+        bulk_data: already decoded cards (e.g. from the model cache), the file is not read
+        """
         self.file_path = file_path
         self.blocksize = block_size
-        self.nodes_id2node = {}
+        self.streaming = streaming
+        self.workers = workers
+        self.node_table = None
         self.rigid_elements = []
         self.node2property = {}
-        self.file_content = self.__read_lines()
-        self.__read_nodes()
         self.elements_1D = []
         self.elements_3D = []
-        self.endGridLine = None
-        self.endElementLine = None
+        parser = BulkDataParser(block_size)
+        self.tokenizer = parser.tokenizer
+        self.source_paths = [file_path] if file_path else []
+        segments = []
+        if (
+            bulk_data is None
+            and workers > 1
+            and file_path
+            and os.path.isfile(file_path)
+        ):
+            segments = find_include_segments(file_path)
+            # the deck itself first, then the include files
+            self.source_paths = list(
+                dict.fromkeys(
+                    [os.path.abspath(file_path)] + [path for path, _, _ in segments]
+                )
+            )
+            # the INCLUDEs of a compressed file are only found while it is read
+            if any(is_compressed(path) for path, _, _ in segments):
+                Logger().log_info(
+                    "Compressed file in the deck, reading it without workers"
+                )
+                segments = []
+
+        if bulk_data is not None:
+            self.file_content = []
+            self.bulk_data = bulk_data
+        elif segments:
+            self.file_content = []
+            self.bulk_data = self.__parse_segments(segments)
+        elif streaming or workers > 1:
+            self.file_content = []
+            self.bulk_data = parser.parse(self.__iter_lines(), file_path)
+        else:
+            self.file_content = self.__read_lines()
+            self.bulk_data = parser.parse(self.file_content, file_path)
+        if parser.source_paths:
+            # the deck itself first, then the include files
+            self.source_paths = list(dict.fromkeys(parser.source_paths))
+        self.__read_nodes()
 
     def __read_lines(self) -> List:
         """
-        This method reads the lines of the .fem file
+        This method reads the lines of the .fem file (gzip, bz2 and xz compressed
+        files are decompressed on the fly)
         """
         # check if the file exists
         try:
-            with open(self.file_path, "r", encoding="utf-8") as file:
+            with open_text(self.file_path) as file:
                 return file.readlines()
         except FileNotFoundError:
             Logger().log_err(f"File {self.file_path} not found")
             return []
 
-    def __read_nodes(self):
+    def __iter_lines(self) -> Iterator[str]:
         """
-        This method is used to read the nodes from the .fem file
+        This method yields the lines of the .fem file from a memory map, a compressed
+        file is decompressed in a background thread while the lines are parsed
         """
-        grids_found = False
-        for i, line in enumerate(self.file_content):
-            if line.startswith("GRID"):
-                grids_found = True
-                line_content = self.split_line(line)
-                node_id = int(line_content[1])
-                x = self.__node_coord_parser(line_content[3])
-                y = self.__node_coord_parser(line_content[4])
-                z = self.__node_coord_parser(line_content[5])
-                node = Node(node_id, [x, y, z])
-                self.nodes_id2node[node.id] = node
-            if grids_found and not line.startswith("GRID"):
-                self.endGridLine = i
-                break
+        if not self.file_path or not os.path.isfile(self.file_path):
+            Logger().log_err(f"File {self.file_path} not found")
+            return
+        yield from iter_file_lines(self.file_path)
 
-    def __node_coord_parser(self, coord_str: str) -> float:
+    def __parse_segments(self, segments: List[Tuple[str, int, int]]) -> BulkData:
         """
-        This method is used to parse the node coordinates
+        This method parses the byte ranges of the deck and its include files in a
+        process pool of self.workers processes and merges the tables in deck order.
+        The ranges are split further into chunks at card boundaries
         """
-        # Problem is the expenential notation without the E in it
-        before_dot = coord_str.split(".")[0]
-        after_dot = coord_str.split(".")[1]
-        if "-" in after_dot:
-            return float(before_dot + "." + after_dot.replace("-", "e-"))
-        if "+" in after_dot:
-            return float(before_dot + "." + after_dot.replace("+", "e+"))
+        total_size = sum(end - start for _, start, end in segments)
+        ranges = []
+        for file_path, start, end in segments:
+            n_chunks = max(1, round(self.workers * (end - start) / total_size))
+            boundaries = find_card_boundaries(file_path, n_chunks, start, end)
+            ranges += [
+                (file_path, chunk_start, chunk_end)
+                for chunk_start, chunk_end in zip(boundaries[:-1], boundaries[1:])
+                if chunk_start < chunk_end
+            ]
 
-        return float(coord_str)
+        bulk_data = BulkData()
+        if len(ranges) == 1:
+            file_path, start, end = ranges[0]
+            bulk_data.extend(parse_byte_range(file_path, self.blocksize, start, end))
+            return bulk_data
+
+        with ProcessPoolExecutor(max_workers=self.workers) as executor:
+            for chunk_data in executor.map(
+                parse_byte_range,
+                [file_path for file_path, _, _ in ranges],
+                [self.blocksize] * len(ranges),
+                [start for _, start, _ in ranges],
+                [end for _, _, end in ranges],
+            ):
+                bulk_data.extend(chunk_data)
+        return bulk_data
+
+    def __read_nodes(self):
+        """
+        This method is used to add the nodes of the GRID cards to the node table
+        (no Node instances are created)
+        """
+        Node.extend_table(self.bulk_data.grid_ids, self.bulk_data.grid_coords)
+        self.node_table = Node.table
 
     def split_line(self, line: str) -> List:
         """
         This method is used to split a line into blocks of blocksize, and
         remove the newline character and strip the content of the block
         """
-        line_content = [
-            line[j : j + self.blocksize] for j in range(0, len(line), self.blocksize)
-        ]
-
-        if "\n" in line_content:
-            line_content.remove("\n")
-
-        line_content = [line.strip() for line in line_content]
-        return line_content
+        return self.tokenizer.split_line(line)
 
     def create_entities(self):
         """
         This method is used to build the node2property dictionary.
         Its the main info needed for getting the forces by property
         """
-        elements_found = False
-        for i, _ in enumerate(self.file_content[self.endGridLine :]):
-            line = self.file_content[i]
-
-            if line.strip().startswith("+") and elements_found:
-                continue
-
-            line_content = self.split_line(line)
-            if len(line_content) < 2:
-                continue
-            line_content = self.split_line(line)
-            element_keyword = line_content[0]
-
-            if element_keyword not in self.element_keywords:
-                continue
-
-            elements_found = True
-
-            property_id = int(line_content[2])
-
-            if element_keyword in ["CBEAM", "CBAR", "CTUBE", "CROD"]:
-                element_id = int(line_content[1])
-                node1 = Node.node_id2node[int(line_content[3])]
-                node2 = Node.node_id2node[int(line_content[4])]
+        # all nodes have to exist
+        self.node_table.rows(
+            flatten_node_ids([element[3] for element in self.bulk_data.elements])[0]
+        )
+        for keyword, element_id, property_id, node_ids in self.bulk_data.elements:
+            if keyword in ["CBEAM", "CBAR", "CTUBE", "CROD"]:
                 element = Element1D(
                     element_id,
                     property_id,
-                    node1,
-                    node2,
+                    node_ids[0],
+                    node_ids[1],
                 )
                 self.elements_1D.append(element)
-                nodes = [node1, node2]
-
             else:
-                node_ids = line_content[3:]
-                element_id = int(line_content[1])
-
-                if i < len(self.file_content) - 1:
-                    i += 1
-                    line2 = self.file_content[i]
-                    while line2.startswith("+"):
-                        line_content = self.split_line(line2)
-                        node_ids += self.split_line(line2)[1:]
-                        i += 1
-                        line2 = self.file_content[i]
-
-                # remove any + from each node_id if its there
-                node_ids = [
-                    node_id.replace("+", "")
-                    for node_id in node_ids
-                    if node_id.replace("+", "").strip() != ""
-                ]
-
-                nodes = [self.nodes_id2node[int(node_id)] for node_id in node_ids]
-                self.elements_3D.append(Element(element_id, property_id, nodes))
+                self.elements_3D.append(
+                    Element(element_id, property_id, node_ids, keyword)
+                )
 
-            for node in nodes:
-                self.node2property[node.id] = property_id
+            for node_id in node_ids:
+                self.node2property[node_id] = property_id
 
     def get_rigid_elements(self):
         """
         This method is used to extract the rigid elements from the .fem file
         Currently: only RBE2 / RBE3 is supported
         """
-
-        element_keywords = ["RBE2", "RBE3"]
-
-        for i, _ in enumerate(self.file_content[self.endGridLine :]):
-            line = self.file_content[i]
-
-            if line.split(" ")[0] not in element_keywords:
-                continue
-
-            line_content = self.split_line(line)
-            element_id: int = int(line_content[1])
-            dofs: int = None
-            node_ids: List = []
-            master_node = None
-            mpc_config = None
-
-            if line.startswith("RBE3"):
-                mpc_config = MPC_CONFIG.RBE3
-                master_node_id = int(line_content[3])
-                master_node = self.nodes_id2node[master_node_id]
-                dofs = int(line_content[4])
-                node_ids = line_content[7:]
-
-            elif line.startswith("RBE2"):
-                mpc_config = MPC_CONFIG.RBE2
-                master_node_id = int(line_content[2])
-                master_node = self.nodes_id2node[master_node_id]
-                dofs = int(line_content[3])
-                node_ids = line_content[4:]
-            if i < len(self.file_content) - 1:
-                i += 1
-                line2 = self.file_content[i]
-                while line2.startswith("+"):
-                    line_content = self.split_line(line2)
-                    for j, _ in enumerate(line_content):
-                        if j == 0:
-                            continue
-                        if "." in line_content[j]:
-                            j += 1
-                            continue
-                        node_ids.append(line_content[j])
-
-                    i += 1
-                    if i == len(self.file_content) - 1:
-                        break
-                    line2 = self.file_content[i]
-
-            # remove anything with a . in nodes, those are the weights
-            node_ids = [
-                int(node) for node in node_ids if "." not in node and node != ""
-            ]
-            # cast to int
-            nodes = [self.nodes_id2node[id] for id in node_ids]
+        for (
+            keyword,
+            element_id,
+            master_node_id,
+            dofs,
+            node_ids,
+        ) in self.bulk_data.rigids:
+            self.node_table.rows([master_node_id] + node_ids)  # all nodes have to exist
             self.rigid_elements.append(
                 MPC(
                     element_id=element_id,
-                    mpc_config=mpc_config,
-                    master_node=master_node,
-                    nodes=nodes,
+                    mpc_config=MPC_CONFIG[keyword],
+                    master_node=master_node_id,
+                    nodes=node_ids,
                     dofs=dofs,
                 )
             )
@@ -242,42 +236,26 @@ class FemFileReader:
         """
         This method is used to extract the loads from the .fem file (currently forces and moments)
         """
-        for i, _ in enumerate(self.file_content[self.endElementLine :]):
-            line = self.file_content[i]
-
-            if line.startswith("FORCE"):
-                line_content = self.split_line(line)
-                force_id = int(line_content[1])
-                node_id = int(line_content[2])
-                system_id = int(line_content[3])
-                scale_factor = float(line_content[4])
-                components_from_file = line_content[5:8]
+        for load in self.bulk_data.loads:
+            keyword, load_id, node_id, system_id, scale_factor, components = load
 
-                force = Force(
-                    force_id=force_id,
+            if keyword == "FORCE":
+                FemFileReader.load_id2load[load_id] = Force(
+                    force_id=load_id,
                     node_id=node_id,
                     system_id=system_id,
                     scale_factor=scale_factor,
-                    compenents_from_file=components_from_file,
+                    compenents_from_file=components,
                 )
-                FemFileReader.load_id2load[force_id] = force
-
-            if line.startswith("MOMENT"):
-                line_content = self.split_line(line)
-                moment_id = int(line_content[1])
-                node_id = int(line_content[2])
-                system_id = int(line_content[3])
-                scale_factor = float(line_content[4])
-                components_from_file = line_content[5:8]
 
-                moment = Moment(
-                    moment_id=moment_id,
+            if keyword == "MOMENT":
+                FemFileReader.load_id2load[load_id] = Moment(
+                    moment_id=load_id,
                     node_id=node_id,
                     system_id=system_id,
                     scale_factor=scale_factor,
-                    compenents_from_file=components_from_file,
+                    compenents_from_file=components,
                 )
-                FemFileReader.load_id2load[moment_id] = moment
 
     def get_spcs(self):
         """
@@ -287,34 +265,15 @@ class FemFileReader:
         spc_id2system_id = {}
         spc_id_2dof_id2dof_value = {}
 
-        for i, _ in enumerate(self.file_content[self.endElementLine :]):
-            line = self.file_content[i]
-
-            line_content = self.split_line(line)
-            if len(line_content) < 2:
+        for system_id, node_id, dof_ids, dof_value in self.bulk_data.spcs:
+            if node_id in spc_id2system_id:
+                Logger().log_warn(f"Duplicate SPC found, ignoring. Node id: {node_id}")
                 continue
 
-            if line_content[0].strip() == "SPC":
-                line_content = self.split_line(line)
-                system_id = int(line_content[1])
-                node_id = int(line_content[2])
-                dof_ids = line_content[3]
-                dof_value = float(line_content[4])
-
-                if node_id not in spc_id2system_id:
-                    spc_id2system_id[node_id] = system_id
-                    spc_id_2dof_id2dof_value[node_id] = {}
-                    if len(dof_ids) > 1:
-                        for i, _ in enumerate(dof_ids):
-                            spc_id_2dof_id2dof_value[node_id][
-                                int(dof_ids[i])
-                            ] = dof_value
-                    else:
-                        spc_id_2dof_id2dof_value[node_id][int(dof_ids)] = dof_value
-                else:
-                    Logger().log_warn(
-                        "Duplicate SPC found, ignoring. Node id: ", node_id
-                    )
+            spc_id2system_id[node_id] = system_id
+            spc_id_2dof_id2dof_value[node_id] = {
+                int(dof_id): dof_value for dof_id in dof_ids
+            }
 
         for node_id, system_id in spc_id2system_id.items():
             spc = SPC(node_id, system_id, spc_id_2dof_id2dof_value[node_id])
@@ -0,0 +1,246 @@
+import mmap
+import os
+from typing import Dict, Iterator, List, Tuple
+import numpy as np
+from mpcforces_extractor.datastructure.subcases import ForceType
+from mpcforces_extractor.logging.logger import Logger
+from mpcforces_extractor.reader.forces_reader import add_force_blocks
+
+
+def get_op2_endian(file_path: str) -> str:
+    """
+    This method returns the byte order ("<" or ">") of an OP2 file, None if the file
+    is not an (existing) OP2 file. An OP2 file starts with the Fortran record marker of a 4 byte
+    record
+    """
+    if not os.path.isfile(file_path):
+        return None
+    with open(file_path, "rb") as file:
+        marker = file.read(4)
+    if marker == b"\x04\x00\x00\x00":
+        return "<"
+    if marker == b"\x00\x00\x00\x04":
+        return ">"
+    return None
+
+
+def is_op2(file_path: str) -> bool:
+    """
+    This method checks if a file is an OP2 (binary result) file
+    """
+    return get_op2_endian(file_path) is not None
+
+
+class OP2Reader:
+    """
+    Class to read the MPC / SPC forces from the OQMG / OQG tables of an OP2 file
+    (32 bit, real results). The file is a sequence of Fortran records: every table has
+    a header and pairs of an ident record (table 3, subcase, time, format) and a data
+    record (table 4, 8 words per node: node id * 10 + device code, grid type, 6 forces)
+    """
+
+    # names of the tables of the force types start with these
+    table_prefixes: Dict[ForceType, Tuple[str, ...]] = {
+        ForceType.MPCFORCE: ("OQMG",),
+        ForceType.SPCFORCE: ("OQG",),
+    }
+    # analysis codes whose 5th ident word is the time / load step (transient, nonlinear)
+    time_analysis_codes: Tuple[int, ...] = (6, 10)
+    # number of words per node of a real force table
+    num_wide: int = 8
+
+    def __init__(self, file_path: str, node_ids=None):
+        """
+        node_ids: ids of the nodes of interest, the forces of all other nodes
+        are skipped (all nodes if None)
+        """
+        self.file_path = file_path
+        self.endian = get_op2_endian(file_path)
+        if self.endian is None:
+            raise ValueError(f"{file_path} is not an OP2 file")
+        self.node_filter = None
+        if node_ids is not None:
+            self.node_filter = np.unique(np.fromiter(node_ids, dtype=np.int64))
+        # sorted ids of the nodes with forces
+        self.node_ids = np.empty(0, dtype=np.int64)
+        self.mapped: mmap.mmap = None
+        self.position: int = 0
+
+    def __read_block(self, skip: bool = False) -> bytes:
+        """
+        This method reads one Fortran record: length, data, length
+        (skip: only move behind it, returns None)
+        """
+        length = self.__read_int(self.position)
+        start = self.position + 4
+        end = start + length
+        if end + 4 > len(self.mapped) or self.__read_int(end) != length:
+            raise ValueError(f"Corrupt OP2 record at byte {self.position}")
+        self.position = end + 4
+        return None if skip else self.mapped[start:end]
+
+    def __read_int(self, position: int) -> int:
+        """
+        This method decodes the int at the given byte position
+        """
+        return int(np.frombuffer(self.mapped, self.endian + "i4", 1, position)[0])
+
+    def __peek_marker(self) -> int:
+        """
+        This method returns the next marker (record of one int) without reading it,
+        0 at the end of the file
+        """
+        if self.position + 12 > len(self.mapped):
+            return 0
+        return self.__read_int(self.position + 4)
+
+    def __read_markers(self, markers: List[int]) -> None:
+        """
+        This method reads markers and checks their values
+        """
+        for marker in markers:
+            position = self.position
+            value = int(np.frombuffer(self.__read_block(), self.endian + "i4")[0])
+            if value != marker:
+                raise ValueError(
+                    f"Expected the OP2 marker {marker} at byte {position}, got {value}"
+                )
+
+    def __read_record(self, skip: bool = False) -> bytes:
+        """
+        This method reads a data record: a marker with the number of words and the
+        block, a long record is continued in blocks with a positive marker
+        (skip: only move behind it, returns None)
+        """
+        self.__read_block()
+        blocks = [self.__read_block(skip)]
+        while self.__peek_marker() > 0:
+            self.__read_block()
+            blocks.append(self.__read_block(skip))
+        return None if skip else b"".join(blocks)
+
+    def __read_file_header(self) -> None:
+        """
+        This method skips the file header (date, tape code and label) if there is one
+        """
+        if self.__peek_marker() != 3:
+            return
+        for marker in [3, 7, 2]:
+            self.__read_markers([marker])
+            self.__read_block()
+        self.__read_markers([-1, 0])
+
+    def __read_table_name(self) -> str:
+        """
+        This method reads the name and the header records of a table
+        """
+        self.__read_markers([2])
+        name = self.__read_block().decode("latin-1").strip()
+        self.__read_markers([-1, 7])
+        self.__read_block()
+        self.__read_markers([-2, 1, 0])
+        self.__read_record()
+        self.__read_markers([-3, 1, 0])
+        return name
+
+    def __iter_subtables(self, skip: bool = False) -> Iterator[Tuple[bytes, bytes]]:
+        """
+        This method yields the (ident, data) record pairs of a table until its end marker
+        (skip: the records are not read, nothing is yielded)
+        """
+        subtable = -3
+        while self.__peek_marker() != 0:
+            ident = self.__read_record(skip)
+            subtable -= 1
+            self.__read_markers([subtable, 1, 0])
+            data = self.__read_record(skip)
+            subtable -= 1
+            self.__read_markers([subtable, 1, 0])
+            if not skip:
+                yield ident, data
+        self.__read_markers([0])
+
+    def __decode_subtable(
+        self, ident: bytes, data: bytes
+    ) -> Tuple[int, float, np.ndarray, np.ndarray]:
+        """
+        This method decodes an ident / data pair into (subcase_id, time, node_ids, forces),
+        None for results which are not real
+        """
+        words = np.frombuffer(ident, self.endian + "i4", 10)
+        analysis_code = int(words[0]) // 10
+        subcase_id = int(words[3])
+        format_code = int(words[8])
+        num_wide = int(words[9])
+        if format_code != 1 or num_wide != self.num_wide:
+            Logger().log_warn(
+                f"OP2 subcase {subcase_id}: only real forces are read "
+                f"(format code {format_code}, {num_wide} words per node)"
+            )
+            return None
+
+        subcase_time = 0.0
+        if analysis_code in self.time_analysis_codes:
+            subcase_time = float(np.frombuffer(ident, self.endian + "f4", 1, 16)[0])
+
+        rows = np.frombuffer(
+            data,
+            np.dtype(
+                [
+                    ("ekey", self.endian + "i4"),
+                    ("grid_type", self.endian + "i4"),
+                    ("forces", self.endian + "f4", (6,)),
+                ]
+            ),
+        )
+        # the node id is stored with the device code as last digit
+        node_ids = rows["ekey"].astype(np.int64) // 10
+        forces = rows["forces"].astype(np.float64)
+        if self.node_filter is not None:
+            keep = np.isin(node_ids, self.node_filter)
+            node_ids, forces = node_ids[keep], forces[keep]
+        return subcase_id, subcase_time, node_ids, forces
+
+    def iter_force_blocks(
+        self, force_type: ForceType, subcase_ids: List[int] = None
+    ) -> Iterator[Tuple[int, float, np.ndarray, np.ndarray]]:
+        """
+        This method yields the force tables of the force type as blocks
+        (subcase_id, time, node_ids, forces), one per ident / data pair in file order.
+        subcase_ids: only these subcases (all if None)
+        """
+        selected = None if subcase_ids is None else set(subcase_ids)
+        with open(self.file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                self.mapped = mapped
+                self.position = 0
+                try:
+                    self.__read_file_header()
+                    while self.__peek_marker() != 0:
+                        name = self.__read_table_name()
+                        skip = not name.startswith(self.table_prefixes[force_type])
+                        for ident, data in self.__iter_subtables(skip):
+                            block = self.__decode_subtable(ident, data)
+                            if block is not None and (
+                                selected is None or block[0] in selected
+                            ):
+                                yield block
+                finally:
+                    self.mapped = None
+
+    def build_subcases(
+        self, force_type: ForceType, subcase_ids: List[int] = None
+    ) -> None:
+        """
+        This method is used to extract the forces from the OP2 file
+        and build the subcases (only the given subcase_ids, all if None)
+        """
+        logger = Logger()
+        logger.start_timing("Building subcases data from OP2 " + force_type.name)
+        _, node_ids = add_force_blocks(
+            self.iter_force_blocks(force_type, subcase_ids), force_type
+        )
+        self.node_ids = np.union1d(self.node_ids, node_ids)
+        logger.stop_timing("Building subcases data from OP2 " + force_type.name)
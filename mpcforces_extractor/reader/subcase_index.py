@@ -0,0 +1,196 @@
+import json
+import mmap
+import os
+import re
+from typing import Dict, List
+import numpy as np
+from mpcforces_extractor.logging.logger import Logger
+
+# lines whose first non blank character is a $ (headers of the subcases and tables)
+HEADER_PATTERN = re.compile(rb"^[ \t]*\$[^\n]*", re.MULTILINE)
+BLANK_CHARS = np.frombuffer(b" \t\r\n", dtype=np.uint8)
+
+
+def count_rows(mapped: mmap.mmap, start: int, end: int) -> int:
+    """
+    This method counts the non blank lines in the byte range [start, end) of a memory
+    map without copying it, the range is scanned in chunks
+    """
+    count = 0
+    line = 0  # number of the line at the start of the chunk
+    last_counted = -1
+    chunk_size = SubcaseIndex.count_chunk_size
+    for chunk_start in range(start, end, chunk_size):
+        chunk = np.frombuffer(
+            mapped,
+            dtype=np.uint8,
+            count=min(chunk_size, end - chunk_start),
+            offset=chunk_start,
+        )
+        newline = chunk == ord("\n")
+        # line numbers of the non blank characters, a line is counted once
+        line_numbers = (line + np.cumsum(newline))[~np.isin(chunk, BLANK_CHARS)]
+        if len(line_numbers) > 0:
+            count += int(np.count_nonzero(np.diff(line_numbers)))
+            count += int(line_numbers[0] != last_counted)
+            last_counted = line_numbers[-1]
+        line += int(np.count_nonzero(newline))
+        # the map can only be closed if no view of it is left
+        del chunk
+    return count
+
+
+class SubcaseIndex:
+    """
+    This class is a byte offset index of the force tables of a .mpcf / .spcf file.
+    Every entry holds subcase id, time, the byte range of the rows of the table
+    [start, end), the number of data rows in it and the width of the node id column.
+    The index is saved as a sidecar file (<file>.idx) and reused as long as size and
+    mtime of the forces file did not change
+    """
+
+    version: int = 2
+    # bytes scanned at once when counting the rows of a table
+    count_chunk_size: int = 1 << 22
+
+    def __init__(self, file_path: str):
+        self.file_path = file_path
+        self.index_file_path = file_path + ".idx"
+        self.entries: List[Dict] = []
+
+    @staticmethod
+    def open(file_path: str) -> "SubcaseIndex":
+        """
+        This method returns the index of a forces file, it is loaded from the sidecar
+        file if it is up to date, otherwise it is built and saved
+        """
+        index = SubcaseIndex(file_path)
+        if not index.load():
+            index.build()
+            index.save()
+        return index
+
+    def __file_key(self) -> Dict:
+        """
+        This method returns size and mtime of the forces file
+        """
+        stat = os.stat(self.file_path)
+        return {"size": stat.st_size, "mtime": stat.st_mtime_ns}
+
+    def load(self) -> bool:
+        """
+        This method loads the sidecar file, returns False if it does not exist
+        or if it is outdated
+        """
+        if not os.path.isfile(self.index_file_path):
+            return False
+        try:
+            with open(self.index_file_path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (OSError, ValueError) as error:
+            Logger().log_warn(
+                f"Subcase index {self.index_file_path} is not valid: {error}"
+            )
+            return False
+        if data.get("version") != self.version or data.get("file") != self.__file_key():
+            return False
+        self.entries = data["entries"]
+        return True
+
+    def save(self) -> None:
+        """
+        This method writes the sidecar file (a read only folder only costs the rescan)
+        """
+        data = {
+            "version": self.version,
+            "file": self.__file_key(),
+            "entries": self.entries,
+        }
+        try:
+            with open(self.index_file_path, "w", encoding="utf-8") as file:
+                json.dump(data, file)
+        except OSError as error:
+            Logger().log_warn(f"Could not write the subcase index: {error}")
+
+    def build(self) -> None:
+        """
+        This method scans the file for the $ header lines. The rows of a table start
+        after the separator line which follows the X-FORCE line and end at the next
+        header line. The data rows are the non blank lines up to the closing separator
+        line. A $TIME without a table gets an entry without rows
+        """
+        self.entries = []
+        with open(self.file_path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                headers = [
+                    (match.start(), match.end(), match.group().strip())
+                    for match in HEADER_PATTERN.finditer(mapped)
+                ]
+                self.entries = self.__find_tables(mapped, headers)
+
+    @staticmethod
+    def __find_tables(mapped: mmap.mmap, headers: List) -> List[Dict]:
+        """
+        This method builds the entries from the header lines
+        """
+        entries = []
+        subcase_id = 0
+        subcase_time = 0
+        announced = None
+        for i, (_, header_end, header) in enumerate(headers):
+            if header.startswith(b"$SUBCASE"):
+                subcase_id = int(header[0:23].replace(b"$SUBCASE", b"").strip())
+            if header.startswith(b"$TIME"):
+                subcase_time = float(header.replace(b"$TIME", b"").strip())
+                announced = {
+                    "subcase_id": subcase_id,
+                    "time": subcase_time,
+                    "start": 0,
+                    "end": 0,
+                    "rows": 0,
+                    "first_column_length": 0,
+                }
+                entries.append(announced)
+
+            region_end = headers[i + 1][0] if i + 1 < len(headers) else len(mapped)
+            position = mapped.find(b"X-FORCE", header_end, region_end)
+            if position == -1:
+                continue
+
+            # the separator line after the X-FORCE line gives the width of the id column
+            separator_start = mapped.find(b"\n", position, region_end) + 1
+            separator_end = mapped.find(b"\n", separator_start, region_end)
+            if separator_start == 0 or separator_end == -1:
+                continue
+            separator = mapped[separator_start:separator_end].strip()
+            start = separator_end + 1
+            # the closing separator is the first line starting with a -
+            rows_end = mapped.find(b"\n-", start - 1, region_end) + 1
+            rows_end = region_end if rows_end == 0 else rows_end
+
+            entry = {
+                "subcase_id": subcase_id,
+                "time": subcase_time,
+                "start": start,
+                "end": region_end,
+                "rows": count_rows(mapped, start, rows_end),
+                "first_column_length": separator.find(b"+"),
+            }
+            # the first table of a $TIME fills its entry
+            if announced is not None:
+                announced.update(entry)
+            else:
+                entries.append(entry)
+            announced = None
+        return entries
+
+    def select(self, subcase_ids: List[int] = None) -> List[Dict]:
+        """
+        This method returns the entries of the given subcases (all if None) in file order
+        """
+        if subcase_ids is None:
+            return list(self.entries)
+        subcase_ids = set(subcase_ids)
+        return [entry for entry in self.entries if entry["subcase_id"] in subcase_ids]
@@ -0,0 +1,215 @@
+import os
+import tempfile
+import unittest
+from mpcforces_extractor.reader.bulk_data import (
+    BulkData,
+    BulkDataParser,
+    CardTokenizer,
+    find_card_boundaries,
+    find_include_segments,
+    parse_byte_range,
+    parse_nastran_float,
+)
+from mpcforces_extractor.test_ressources.simple_model import get_simple_model_fem
+
+
+class TestParseNastranFloat(unittest.TestCase):
+    def test_parse_nastran_float(self):
+        """
+        Test the different real formats of a .fem file
+        """
+        self.assertEqual(parse_nastran_float("13.11648"), 13.11648)
+        self.assertEqual(parse_nastran_float("-16.8891"), -16.8891)
+        self.assertEqual(parse_nastran_float("13.116+2"), 1311.6)
+        self.assertAlmostEqual(parse_nastran_float("13.116-8"), 13.116e-8)
+        self.assertAlmostEqual(parse_nastran_float("-1.5-3"), -1.5e-3)
+        self.assertEqual(parse_nastran_float("1.0E-3"), 1.0e-3)
+        self.assertEqual(parse_nastran_float("1.0D+2"), 100.0)
+        self.assertEqual(parse_nastran_float(""), 0.0)
+        self.assertEqual(parse_nastran_float("        "), 0.0)
+
+
+class TestCardTokenizer(unittest.TestCase):
+    def test_iter_cards(self):
+        """
+        Test the grouping of lines into cards. Continuation lines are appended,
+        comments and empty lines are skipped
+        """
+        lines = [
+            "$$ comment\n",
+            "CHEXA        497       1       1       2       3       4       5       6+\n",
+            "+              7       8\n",
+            "\n",
+            "CBAR         498       1       1       2\n",
+        ]
+        cards = list(CardTokenizer(8).iter_cards(lines))
+        self.assertEqual(len(cards), 2)
+        self.assertEqual(
+            cards[0], ["CHEXA", "497", "1", "1", "2", "3", "4", "5", "6", "7", "8"]
+        )
+        self.assertEqual(cards[1], ["CBAR", "498", "1", "1", "2"])
+
+    def test_iter_cards_formats(self):
+        """
+        Test that large field and free field cards give the same fields as small field cards
+        """
+        lines = [
+            "GRID    1               -16.889186.0    13.116+2\n",
+            "GRID*                  1                        -16.8891            86.0*\n",
+            "*               13.116+2\n",
+            "grid,1,,-16.8891,86.0,13.116+2\n",
+            "GRID*,1,,-16.8891,86.0\n",
+            "*,13.116+2\n",
+            "CQUAD4,1,1,1,2,3,4\n",
+            "RBE2*                  9               1          123456               2*\n",
+            "*                      3\n",
+        ]
+        cards = list(CardTokenizer(8).iter_cards(lines))
+        self.assertEqual(len(cards), 6)
+        for card in cards[:4]:
+            self.assertEqual(
+                card[:6], ["GRID", "1", "", "-16.8891", "86.0", "13.116+2"]
+            )
+        self.assertEqual(cards[4], ["CQUAD4", "1", "1", "1", "2", "3", "4"])
+        self.assertEqual(cards[5][:6], ["RBE2", "9", "1", "123456", "2", "3"])
+
+    def test_iter_cards_line_keywords(self):
+        """
+        Test that small field lines of the line keywords are yielded unsplit without
+        their continuation lines, the other formats are still split
+        """
+        lines = [
+            "GRID    1               1.0     2.0     3.0            +\n",
+            "+              7\n",
+            "GRID,2,,7.,8.,9.\n",
+            "CBAR         498       1       1       2\n",
+        ]
+        cards = list(CardTokenizer(8, line_keywords=["GRID"]).iter_cards(lines))
+        self.assertEqual(cards[0], ("GRID", lines[0]))
+        self.assertEqual(cards[1], ["GRID", "2", "", "7.", "8.", "9."])
+        self.assertEqual(cards[2], ["CBAR", "498", "1", "1", "2"])
+
+
+class TestBulkDataParser(unittest.TestCase):
+    def test_parse(self):
+        """
+        Test that all the supported cards are decoded in one pass
+        """
+        lines = [
+            "GRID           1        -16.889186.0    13.116+2\n",
+            "GRID           2        0.0     0.0     0.0     \n",
+            "CQUAD4         1       1       1       2       3       40.0\n",
+            "RBE2           9       1  123456       2       3     0.0\n",
+            "RBE3          10               1  1234561.0         123       2       3\n",
+            "+       2.0          12       4\n",
+            "FORCE          1       1       01.0     10000.00-1000.000.0     \n",
+            "MOMENT         2       2       02.0     1.0     0.0     0.0     \n",
+            "SPC            1       1  123456     0.0\n",
+        ]
+        bulk_data = BulkDataParser(8).parse(lines)
+
+        self.assertEqual(bulk_data.grid_ids.tolist(), [1, 2])
+        self.assertEqual(
+            bulk_data.grid_coords.tolist(),
+            [[-16.8891, 86.0, 1311.6], [0.0, 0.0, 0.0]],
+        )
+        self.assertEqual(bulk_data.elements, [("CQUAD4", 1, 1, [1, 2, 3, 4])])
+        self.assertEqual(bulk_data.rigids[0], ("RBE2", 9, 1, 123456, [2, 3]))
+        # weights and their components are not nodes
+        self.assertEqual(bulk_data.rigids[1], ("RBE3", 10, 1, 123456, [2, 3, 4]))
+        self.assertEqual(
+            bulk_data.loads[0], ("FORCE", 1, 1, 0, 1.0, [10000.0, -1000.0, 0.0])
+        )
+        self.assertEqual(bulk_data.loads[1], ("MOMENT", 2, 2, 0, 2.0, [1.0, 0.0, 0.0]))
+        self.assertEqual(bulk_data.spcs, [(1, 1, "123456", 0.0)])
+
+    def test_parse_mixed_formats(self):
+        """
+        Test that GRIDs of all formats are decoded together
+        """
+        lines = [
+            "GRID    1               1.0     2.0     3.0\n",
+            "GRID*                  2                         4.0D+00            -5.5*\n",
+            "*                  6.0-1\n",
+            "GRID,3,,7.,8.,9.\n",
+            "GRID           4       01.0+3   -2.5\n",
+            "CTRIA3*                1               1               1               2*\n",
+            "*                      3\n",
+        ]
+        bulk_data = BulkDataParser(8).parse(lines)
+        self.assertEqual(bulk_data.grid_ids.tolist(), [1, 2, 3, 4])
+        self.assertEqual(
+            bulk_data.grid_coords.tolist(),
+            [[1.0, 2.0, 3.0], [4.0, -5.5, 0.6], [7.0, 8.0, 9.0], [1000.0, -2.5, 0.0]],
+        )
+        self.assertEqual(bulk_data.elements, [("CTRIA3", 1, 1, [1, 2, 3])])
+
+
+class TestParallelParsing(unittest.TestCase):
+    def test_chunks_match_serial_parse(self):
+        """
+        Test that the chunks never split a card and that merging the chunks
+        gives exactly the serial result
+        """
+        lines = get_simple_model_fem()
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "simple_model.fem")
+            with open(file_path, "w", encoding="utf-8", newline="\n") as file:
+                file.writelines(lines)
+
+            boundaries = find_card_boundaries(file_path, 20)
+            self.assertEqual(boundaries[0], 0)
+            self.assertEqual(boundaries[-1], os.path.getsize(file_path))
+
+            with open(file_path, "rb") as file:
+                content = file.read()
+            for offset in boundaries[1:-1]:
+                if offset < len(content):
+                    line = content[offset:].split(b"\n")[0].decode("utf-8")
+                    self.assertTrue(CardTokenizer.is_card_start(line))
+
+            merged = BulkData()
+            for start, end in zip(boundaries[:-1], boundaries[1:]):
+                merged.extend(parse_byte_range(file_path, 8, start, end))
+
+        serial = BulkDataParser(8).parse(lines)
+        self.assertEqual(merged.grid_ids.tolist(), serial.grid_ids.tolist())
+        self.assertEqual(merged.grid_coords.tolist(), serial.grid_coords.tolist())
+        self.assertEqual(merged.elements, serial.elements)
+        self.assertEqual(merged.rigids, serial.rigids)
+        self.assertEqual(merged.loads, serial.loads)
+        self.assertEqual(merged.spcs, serial.spcs)
+
+
+class TestIncludeSegments(unittest.TestCase):
+    def test_find_include_segments(self):
+        """
+        Test the splitting of a deck at its INCLUDE statements, circular and missing
+        includes are skipped
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            master = os.path.join(folder, "master.fem")
+            child = os.path.join(folder, "child.fem")
+            with open(master, "wb") as file:
+                file.write(b"GRID           1\n")
+                file.write(b"INCLUDE child.fem\n")
+                file.write(b"INCLUDE 'missing.fem'\n")
+                file.write(b"GRID           2\n")
+            with open(child, "wb") as file:
+                file.write(b"GRID           3\n")
+                file.write(b"INCLUDE 'master.fem'\n")
+
+            segments = find_include_segments(master)
+
+        self.assertEqual(
+            segments,
+            [
+                (os.path.abspath(master), 0, 17),
+                (os.path.abspath(child), 0, 17),
+                (os.path.abspath(master), 57, 74),
+            ],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
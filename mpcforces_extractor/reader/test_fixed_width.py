@@ -0,0 +1,80 @@
+import unittest
+from mpcforces_extractor.reader.bulk_data import parse_nastran_float
+from mpcforces_extractor.reader.fixed_width import (
+    decode_floats,
+    decode_force_rows,
+    decode_ints,
+)
+
+
+class TestFixedWidth(unittest.TestCase):
+    def test_decode_floats(self):
+        """
+        Test the vectorized decoding against the field by field parser
+        """
+        fields = [
+            "13.11648",
+            "-16.8891",
+            "13.116+2",
+            "13.116-8",
+            "-1.5-3",
+            ".5-2",
+            "1.0E-3",
+            "1.0D+2",
+            "",
+            "        ",
+            "  -2.5  ",
+            "1.23456789012+02",
+            "7",
+        ]
+        decoded = decode_floats(fields)
+        self.assertEqual(decoded.tolist(), [parse_nastran_float(f) for f in fields])
+        self.assertEqual(decoded[2], 1311.6)
+        self.assertEqual(decoded[8], 0.0)
+        self.assertEqual(len(decode_floats([])), 0)
+
+    def test_decode_ints(self):
+        """
+        Test the integer decoding
+        """
+        self.assertEqual(decode_ints(["       1", "22      "]).tolist(), [1, 22])
+        self.assertEqual(len(decode_ints([])), 0)
+
+    def test_decode_force_rows(self):
+        """
+        Test the decoding of a force table: blank and missing columns are 0,
+        separator lines are skipped
+        """
+        lines = [
+            "       1 -1.00000E-00  1.00000E-00  1.00000E-00  1.00000E-00\n",
+            "       2 -1.00000E-00               1.00000E+01               1.00000E-00\n",
+            "--------+-----------------------------------------------------------------------------\n",
+            "      33  2.5\n",
+        ]
+        node_ids, forces = decode_force_rows(lines, 8)
+        self.assertEqual(node_ids.tolist(), [1, 2, 33])
+        self.assertEqual(
+            forces.tolist(),
+            [
+                [-1.0, 1.0, 1.0, 1.0, 0.0, 0.0],
+                [-1.0, 0.0, 10.0, 0.0, 1.0, 0.0],
+                [2.5, 0.0, 0.0, 0.0, 0.0, 0.0],
+            ],
+        )
+
+    def test_decode_force_rows_node_filter(self):
+        """
+        Test that only the rows of the filtered nodes are decoded
+        """
+        lines = [
+            "       1 -1.00000E-00  1.00000E-00\n",
+            "       2  2.00000E-00\n",
+            "       3  3.00000E-00\n",
+        ]
+        node_ids, forces = decode_force_rows(lines, 8, node_filter=[3, 1, 99])
+        self.assertEqual(node_ids.tolist(), [1, 3])
+        self.assertEqual(forces[:, 0].tolist(), [-1.0, 3.0])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,7 +1,11 @@
+import gzip
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
 
 from mpcforces_extractor.reader.forces_reader import ForcesReader
+from mpcforces_extractor.reader.test_subcase_index import get_forces_lines
 from mpcforces_extractor.datastructure.subcases import Subcase, ForceType
 
 
@@ -40,5 +44,162 @@ class TestForcesReader(unittest.TestCase):
         )
 
 
+class TestStreamingForcesReader(unittest.TestCase):
+    lines = [
+        "$SUBCASE              1\n",
+        "$TIME       1.00000000E+00\n",
+        "$MPC FORCE [REAL]\n",
+        "--------+-----------------------------------------------------------------------------\n",
+        "  GRID #   X-FORCE      Y-FORCE      Z-FORCE      X-MOMENT     Y-MOMENT     Z-MOMENT\n",
+        "--------+-----------------------------------------------------------------------------\n",
+        "       1 -1.00000E-00  1.00000E-00  1.00000E-00  1.00000E-00\n",
+        "       2 -1.00000E-00  1.00000E-00  1.00000E-00               1.00000E-00\n",
+        "       3  2.00000E-00\n",
+        "--------+-----------------------------------------------------------------------------\n",
+        " \n",
+        "$SUBCASE              2\n",
+        "$TIME       2.00000000E+00\n",
+        "$MPC FORCE [REAL]\n",
+        "--------+-----------------------------------------------------------------------------\n",
+        "  GRID #   X-FORCE      Y-FORCE      Z-FORCE      X-MOMENT     Y-MOMENT     Z-MOMENT\n",
+        "--------+-----------------------------------------------------------------------------\n",
+        "       4  3.00000E-00\n",
+    ]
+
+    def test_iter_force_blocks(self):
+        """
+        Test the blocks of the streaming reader. Every table ends at the next $ line,
+        so the forces of a subcase never leak into another one
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "model.mpcf")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.writelines(self.lines)
+            reader = ForcesReader(file_path, streaming=True)
+            reader.block_rows = 2
+            blocks = list(reader.iter_force_blocks())
+
+        self.assertIsNone(reader.file_content)
+        self.assertEqual([block[0] for block in blocks], [1, 1, 2])
+        self.assertEqual([block[1] for block in blocks], [1.0, 1.0, 2.0])
+        self.assertEqual(blocks[0][2].tolist(), [1, 2])
+        self.assertEqual(blocks[1][2].tolist(), [3])
+        self.assertEqual(blocks[2][2].tolist(), [4])
+        self.assertEqual(
+            blocks[0][3].tolist(),
+            [[-1.0, 1.0, 1.0, 1.0, 0.0, 0.0], [-1.0, 1.0, 1.0, 0.0, 1.0, 0.0]],
+        )
+        self.assertEqual(blocks[2][3].tolist(), [[3.0, 0.0, 0.0, 0.0, 0.0, 0.0]])
+
+    def test_build_subcases(self):
+        """
+        Test that the streaming reader builds the same subcases as the default reader
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "model.mpcf")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.writelines(self.lines)
+
+            Subcase.reset()
+            ForcesReader(file_path).build_subcases(ForceType.MPCFORCE)
+            expected = {
+                subcase.subcase_id: subcase.node_id2mpcforces
+                for subcase in Subcase.subcases
+            }
+            Subcase.reset()
+            ForcesReader(file_path, streaming=True).build_subcases(ForceType.MPCFORCE)
+
+        self.assertEqual(
+            {
+                subcase.subcase_id: subcase.node_id2mpcforces
+                for subcase in Subcase.subcases
+            },
+            expected,
+        )
+        self.assertEqual(sorted(expected[1]), [1, 2, 3])
+        self.assertEqual(sorted(expected[2]), [4])
+
+
+class TestTailForcesReader(unittest.TestCase):
+    def test_update_subcases(self):
+        """
+        Test that the tail mode only reads the complete blocks and continues at the
+        end of the parsed part when the file grows
+        """
+        lines = get_forces_lines([1, 2, 3])
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "model.mpcf")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.writelines(lines)
+            Subcase.reset()
+            ForcesReader(file_path).build_subcases(ForceType.MPCFORCE)
+            expected = {
+                subcase.subcase_id: (subcase.time, subcase.node_id2mpcforces)
+                for subcase in Subcase.subcases
+            }
+
+            # the solver is writing the first row of subcase 2
+            content = "".join(lines)
+            cut = content.index("       1  2.00000E+00") + 12
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(content[:cut])
+            Subcase.reset()
+            reader = ForcesReader(file_path, streaming=True)
+            self.assertEqual(reader.update_subcases(ForceType.MPCFORCE), [1])
+            self.assertEqual(reader.update_subcases(ForceType.MPCFORCE), [])
+
+            # the table of subcase 2 is closed, subcase 3 is announced
+            cut = content.index("$MPC FORCE", content.index("$TIME       3"))
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(content[:cut])
+            self.assertEqual(reader.update_subcases(ForceType.MPCFORCE), [2])
+
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.write(content)
+            self.assertEqual(reader.update_subcases(ForceType.MPCFORCE), [3])
+            # the trailing " \n" line is not part of a block
+            self.assertEqual(reader.offset, os.path.getsize(file_path) - 2)
+            # every node once, whatever the number of subcases
+            self.assertEqual(
+                reader.node_ids.tolist(),
+                sorted(Subcase.get_subcase_by_id(1).node_id2mpcforces),
+            )
+
+        self.assertEqual(
+            {
+                subcase.subcase_id: (subcase.time, subcase.node_id2mpcforces)
+                for subcase in Subcase.subcases
+            },
+            expected,
+        )
+
+
+class TestCompressedForcesReader(unittest.TestCase):
+    def test_compressed_forces(self):
+        """
+        Test that a gzip compressed forces file is read directly
+        """
+        lines = [
+            "$SUBCASE 1\n",
+            "$TIME 0.0\n",
+            "GRID #   X-FORCE      Y-FORCE      Z-FORCE      X-MOMENT     Y-MOMENT     Z-MOMENT\n",
+            "--------+-----------------------------------------------------------------------------\n",
+            "       1 -1.00000E-00  1.00000E-00  1.00000E-00  1.00000E-00\n",
+        ]
+        Subcase.reset()
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "model.mpcf.gz")
+            with gzip.open(file_path, "wt", encoding="utf-8") as file:
+                file.writelines(lines)
+            mpc_reader = ForcesReader(file_path)
+
+        self.assertEqual(mpc_reader.file_content, lines)
+        mpc_reader.build_subcases(ForceType.MPCFORCE)
+        self.assertEqual(
+            Subcase.get_subcase_by_id(1).node_id2mpcforces[1],
+            [-1.0, 1.0, 1.0, 1.0, 0.0, 0.0],
+        )
+
+
 if __name__ == "__main__":
     unittest.main()
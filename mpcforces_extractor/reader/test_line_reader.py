@@ -0,0 +1,85 @@
+import bz2
+import gzip
+import lzma
+import os
+import tempfile
+import unittest
+from mpcforces_extractor.reader.line_reader import (
+    is_compressed,
+    iter_decompressed_lines,
+    iter_file_lines,
+    open_text,
+)
+from mpcforces_extractor.reader.modelreaders import FemFileReader
+from mpcforces_extractor.test_ressources.simple_model import get_simple_model_fem
+
+
+class TestLineReader(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.lines = get_simple_model_fem()
+        self.file_paths = {}
+        for extension, opener in [
+            ("fem", open),
+            ("fem.gz", gzip.open),
+            ("fem.bz2", bz2.open),
+            ("fem.xz", lzma.open),
+        ]:
+            file_path = os.path.join(self.folder.name, "simple_model." + extension)
+            with opener(file_path, "wt", encoding="utf-8") as file:
+                file.writelines(self.lines)
+            self.file_paths[extension] = file_path
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_compressed_lines(self):
+        """
+        Test that all the compression formats give the lines of the plain file
+        """
+        self.assertFalse(is_compressed(self.file_paths["fem"]))
+        for file_path in self.file_paths.values():
+            self.assertEqual(list(iter_file_lines(file_path)), self.lines)
+            with open_text(file_path) as file:
+                self.assertEqual(file.readlines(), self.lines)
+        self.assertTrue(is_compressed(self.file_paths["fem.gz"]))
+
+        # small batches and a consumer which stops early
+        lines = iter_decompressed_lines(self.file_paths["fem.xz"], 1, 64)
+        self.assertEqual(next(lines), self.lines[0])
+        lines.close()
+
+    def test_compressed_fem_file(self):
+        """
+        Test that the FemFileReader reads compressed decks in all modes
+        """
+        reader = FemFileReader(self.file_paths["fem"], 8)
+        for file_path in [self.file_paths["fem.gz"], self.file_paths["fem.bz2"]]:
+            for other in [
+                FemFileReader(file_path, 8),
+                FemFileReader(file_path, 8, streaming=True),
+                FemFileReader(file_path, 8, workers=2),
+            ]:
+                self.assertEqual(
+                    other.bulk_data.grid_coords.tolist(),
+                    reader.bulk_data.grid_coords.tolist(),
+                )
+                self.assertEqual(other.bulk_data.elements, reader.bulk_data.elements)
+                self.assertEqual(other.bulk_data.rigids, reader.bulk_data.rigids)
+                self.assertEqual(other.bulk_data.spcs, reader.bulk_data.spcs)
+
+    def test_broken_file(self):
+        """
+        Test that decompression errors reach the consumer
+        """
+        file_path = os.path.join(self.folder.name, "broken.fem.gz")
+        with open(self.file_paths["fem.gz"], "rb") as file:
+            content = file.read()
+        with open(file_path, "wb") as file:
+            file.write(content[: len(content) // 2])
+        with self.assertRaises(EOFError):
+            list(iter_file_lines(file_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
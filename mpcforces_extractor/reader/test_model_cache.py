@@ -0,0 +1,166 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from mpcforces_extractor.force_extractor import FEMExtractor
+from mpcforces_extractor.datastructure.entities import Node, Element, Part, PartMode
+from mpcforces_extractor.datastructure.rigids import MPC
+from mpcforces_extractor.reader.bulk_data import BulkDataParser
+from mpcforces_extractor.reader.model_cache import (
+    ModelCache,
+    pack_lists,
+    unpack_lists,
+)
+from mpcforces_extractor.test_ressources.simple_model import get_simple_model_fem
+
+
+class TestModelCache(unittest.TestCase):
+    def setUp(self):
+        Node.reset()
+        Element.reset_graph()
+        Part.reset()
+        MPC.reset()
+        self.folder = tempfile.TemporaryDirectory()
+        self.fem_file_path = os.path.join(self.folder.name, "simple_model.fem")
+        self.cache_file_path = os.path.join(self.folder.name, "out", "model.npz")
+        with open(self.fem_file_path, "w", encoding="utf-8") as file:
+            file.writelines(get_simple_model_fem())
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_pack_lists(self):
+        """
+        Test the flat storage of the connectivity lists
+        """
+        lists = [[1, 2, 3], [], [4]]
+        flat, offsets = pack_lists(lists)
+        self.assertEqual(offsets.tolist(), [0, 3, 3, 4])
+        self.assertEqual(unpack_lists(flat, offsets), lists)
+        self.assertEqual(unpack_lists(*pack_lists([])), [])
+
+    def test_snapshot_roundtrip(self):
+        """
+        Test that the first run writes the snapshot and the second run uses it
+        without parsing the .fem file
+        """
+        FEMExtractor(
+            self.fem_file_path, 8, cache_file_path=self.cache_file_path
+        ).build_fem_data()
+        self.assertTrue(os.path.isfile(self.cache_file_path))
+        part_id2node_ids = dict(Part.part_id2node_ids)
+        bulk_data = BulkDataParser(8).parse(get_simple_model_fem())
+
+        snapshot = ModelCache(self.cache_file_path).load(self.fem_file_path)
+        self.assertEqual(snapshot.part_id2node_ids, part_id2node_ids)
+        self.assertEqual(
+            snapshot.bulk_data.grid_ids.tolist(), bulk_data.grid_ids.tolist()
+        )
+        self.assertEqual(
+            snapshot.bulk_data.grid_coords.tolist(), bulk_data.grid_coords.tolist()
+        )
+        self.assertEqual(snapshot.bulk_data.elements, bulk_data.elements)
+        self.assertEqual(snapshot.bulk_data.rigids, bulk_data.rigids)
+        self.assertEqual(snapshot.bulk_data.loads, bulk_data.loads)
+        self.assertEqual(snapshot.bulk_data.spcs, bulk_data.spcs)
+
+        Node.reset()
+        Element.reset_graph()
+        Part.reset()
+        MPC.reset()
+        with patch.object(BulkDataParser, "parse") as mock_parse:
+            FEMExtractor(
+                self.fem_file_path, 8, cache_file_path=self.cache_file_path
+            ).build_fem_data()
+            mock_parse.assert_not_called()
+        self.assertEqual(Part.part_id2node_ids, part_id2node_ids)
+        self.assertEqual(len(Node.table), len(bulk_data.grid_ids))
+
+        # the cached parts are only used for the same part settings, parts of other
+        # settings are detected and written to the snapshot
+        FEMExtractor(
+            self.fem_file_path,
+            8,
+            cache_file_path=self.cache_file_path,
+            corner_nodes_only=True,
+        ).build_fem_data()
+        self.assertTrue(Part.corner_nodes_only)
+        self.assertEqual(Part.part_id2node_ids, part_id2node_ids)
+        self.assertTrue(
+            ModelCache(self.cache_file_path).load(self.fem_file_path).corner_nodes_only
+        )
+        Part.corner_nodes_only = False
+
+    def test_switch_part_mode(self):
+        """
+        Test that the snapshot gets the parts of a new part mode, so the next run
+        with this mode does not detect them again
+        """
+        FEMExtractor(
+            self.fem_file_path, 8, cache_file_path=self.cache_file_path
+        ).build_fem_data()
+        for _ in range(2):
+            Node.reset()
+            Element.reset_graph()
+            Part.reset()
+            MPC.reset()
+            with patch.object(
+                Element,
+                "get_part_id2node_ids_property",
+                wraps=Element.get_part_id2node_ids_property,
+            ) as mock_get_parts:
+                FEMExtractor(
+                    self.fem_file_path,
+                    8,
+                    cache_file_path=self.cache_file_path,
+                    part_mode=PartMode.PROPERTY,
+                ).build_fem_data()
+            part_id2node_ids = dict(Part.part_id2node_ids)
+            snapshot = ModelCache(self.cache_file_path).load(self.fem_file_path)
+            self.assertEqual(snapshot.part_mode, PartMode.PROPERTY.value)
+            self.assertEqual(snapshot.part_id2node_ids, part_id2node_ids)
+            self.assertEqual(
+                snapshot.source_paths, [os.path.abspath(self.fem_file_path)]
+            )
+        # detected in the first run with the new mode only
+        mock_get_parts.assert_not_called()
+        self.assertTrue(part_id2node_ids)
+        Part.mode = PartMode.GRAPH
+
+    def test_snapshot_invalidation(self):
+        """
+        Test that a changed deck invalidates the snapshot, a touched deck does not
+        """
+        cache = ModelCache(self.cache_file_path)
+        bulk_data = BulkDataParser(8).parse(get_simple_model_fem())
+        cache.save([self.fem_file_path], bulk_data, {1: [1, 2]})
+        self.assertIsNotNone(cache.load(self.fem_file_path))
+
+        # same content, new mtime -> the hash decides
+        stat = os.stat(self.fem_file_path)
+        os.utime(self.fem_file_path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 10**9))
+        self.assertIsNotNone(cache.load(self.fem_file_path))
+
+        with open(self.fem_file_path, "a", encoding="utf-8") as file:
+            file.write("GRID         999        0.0     0.0     0.0\n")
+        self.assertIsNone(cache.load(self.fem_file_path))
+        self.assertIsNone(cache.load(os.path.join(self.folder.name, "other.fem")))
+
+    def test_reader_settings(self):
+        """
+        Test that a snapshot written with other reader settings is not used
+        """
+        bulk_data = BulkDataParser(8).parse(get_simple_model_fem())
+        ModelCache(self.cache_file_path, 8).save([self.fem_file_path], bulk_data, {})
+        self.assertIsNotNone(
+            ModelCache(self.cache_file_path, 8).load(self.fem_file_path)
+        )
+        self.assertIsNone(ModelCache(self.cache_file_path, 16).load(self.fem_file_path))
+
+        cache = ModelCache(self.cache_file_path, 8)
+        cache.reader_settings["cards"] = cache.reader_settings["cards"][1:]
+        self.assertIsNone(cache.load(self.fem_file_path))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -1,9 +1,14 @@
+import gzip
+import os
+import tempfile
 import unittest
 from unittest.mock import patch
 from mpcforces_extractor.reader.modelreaders import FemFileReader
+from mpcforces_extractor.reader.bulk_data import CardTokenizer
 from mpcforces_extractor.datastructure.entities import Node, Element, Element1D
 from mpcforces_extractor.datastructure.rigids import MPC_CONFIG
 from mpcforces_extractor.datastructure.loads import Force, Moment
+from mpcforces_extractor.test_ressources.simple_model import get_simple_model_fem
 
 
 class TestFemFileReader(unittest.TestCase):
@@ -17,10 +22,11 @@ class TestFemFileReader(unittest.TestCase):
         """
 
         # Test the init method
+        Node.reset()
         mock_read_lines.return_value = []
         fem_file_reader = FemFileReader("test.fem", 8)
         self.assertEqual(fem_file_reader.file_path, "test.fem")
-        self.assertEqual(fem_file_reader.nodes_id2node, {})
+        self.assertEqual(len(fem_file_reader.node_table), 0)
         self.assertEqual(fem_file_reader.rigid_elements, [])
         self.assertEqual(fem_file_reader.node2property, {})
         self.assertEqual(fem_file_reader.blocksize, 8)
@@ -182,6 +188,151 @@ class TestFemFileReader(unittest.TestCase):
         self.assertTrue(isinstance(fem_file_reader.load_id2load[1], Force))
         self.assertTrue(isinstance(fem_file_reader.load_id2load[2], Moment))
 
+    def test_streaming(self):
+        """
+        Test the memory mapped streaming mode and the parallel mode. Make sure they
+        read the same data as the default mode without keeping the lines
+        """
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "simple_model.fem")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.writelines(get_simple_model_fem())
+
+            reader = FemFileReader(file_path, 8)
+            streaming_reader = FemFileReader(file_path, 8, streaming=True)
+            parallel_reader = FemFileReader(file_path, 8, workers=2)
+
+        self.assertEqual(streaming_reader.file_content, [])
+        self.assertEqual(len(streaming_reader.bulk_data.grid_ids), 24)
+        self.assertEqual(
+            streaming_reader.bulk_data.grid_ids.tolist(),
+            reader.bulk_data.grid_ids.tolist(),
+        )
+        self.assertEqual(
+            streaming_reader.bulk_data.grid_coords.tolist(),
+            reader.bulk_data.grid_coords.tolist(),
+        )
+        self.assertEqual(streaming_reader.bulk_data.elements, reader.bulk_data.elements)
+        self.assertEqual(streaming_reader.bulk_data.rigids, reader.bulk_data.rigids)
+        self.assertEqual(streaming_reader.bulk_data.spcs, reader.bulk_data.spcs)
+
+        # parallel chunked parsing gives exactly the serial result
+        self.assertEqual(
+            parallel_reader.bulk_data.grid_coords.tolist(),
+            reader.bulk_data.grid_coords.tolist(),
+        )
+        self.assertEqual(parallel_reader.bulk_data.elements, reader.bulk_data.elements)
+        self.assertEqual(parallel_reader.bulk_data.rigids, reader.bulk_data.rigids)
+        self.assertEqual(parallel_reader.bulk_data.loads, reader.bulk_data.loads)
+        self.assertEqual(parallel_reader.bulk_data.spcs, reader.bulk_data.spcs)
+
+    def test_includes(self):
+        """
+        Test that nested INCLUDEs (relative paths, continued file name) are merged
+        in deck order and give the same data as the single file
+        """
+        lines = get_simple_model_fem()
+        card_starts = [
+            i for i, line in enumerate(lines) if CardTokenizer.is_card_start(line)
+        ]
+        first = card_starts[len(card_starts) // 3]
+        second = card_starts[2 * len(card_starts) // 3]
+        third = card_starts[-2]
+
+        with tempfile.TemporaryDirectory() as folder:
+            os.makedirs(os.path.join(folder, "mesh"))
+            os.makedirs(os.path.join(folder, "nested"))
+            file_path = os.path.join(folder, "master.fem")
+            with open(file_path, "w", encoding="utf-8") as file:
+                file.writelines(lines[:first])
+                file.write("INCLUDE 'mesh/middle.fem'\n")
+                file.writelines(lines[third:])
+            with open(
+                os.path.join(folder, "mesh", "middle.fem"), "w", encoding="utf-8"
+            ) as file:
+                file.writelines(lines[first:second])
+                file.write("include '../nested/\n")
+                file.write("        part.fem'\n")
+            with open(
+                os.path.join(folder, "nested", "part.fem"), "w", encoding="utf-8"
+            ) as file:
+                file.writelines(lines[second:third])
+            single_file_path = os.path.join(folder, "single.fem")
+            with open(single_file_path, "w", encoding="utf-8") as file:
+                file.writelines(lines)
+
+            reader = FemFileReader(single_file_path, 8)
+            # the serial reading resolves the INCLUDEs in its single pass
+            with patch(
+                "mpcforces_extractor.reader.modelreaders.find_include_segments"
+            ) as mock_find_include_segments:
+                include_reader = FemFileReader(file_path, 8)
+                streaming_include_reader = FemFileReader(file_path, 8, streaming=True)
+                mock_find_include_segments.assert_not_called()
+            parallel_include_reader = FemFileReader(file_path, 8, workers=3)
+
+            for other in [
+                include_reader,
+                streaming_include_reader,
+                parallel_include_reader,
+            ]:
+                self.assertEqual(
+                    other.source_paths,
+                    [
+                        os.path.abspath(file_path),
+                        os.path.abspath(os.path.join(folder, "mesh", "middle.fem")),
+                        os.path.abspath(os.path.join(folder, "nested", "part.fem")),
+                    ],
+                )
+
+        for other in [
+            include_reader,
+            streaming_include_reader,
+            parallel_include_reader,
+        ]:
+            self.assertEqual(
+                other.bulk_data.grid_ids.tolist(), reader.bulk_data.grid_ids.tolist()
+            )
+            self.assertEqual(
+                other.bulk_data.grid_coords.tolist(),
+                reader.bulk_data.grid_coords.tolist(),
+            )
+            self.assertEqual(other.bulk_data.elements, reader.bulk_data.elements)
+            self.assertEqual(other.bulk_data.rigids, reader.bulk_data.rigids)
+            self.assertEqual(other.bulk_data.loads, reader.bulk_data.loads)
+            self.assertEqual(other.bulk_data.spcs, reader.bulk_data.spcs)
+
+    def test_compressed_includes(self):
+        """
+        Test that the INCLUDEs of a compressed deck are read with workers as well
+        """
+        lines = get_simple_model_fem()
+        card_starts = [
+            i for i, line in enumerate(lines) if CardTokenizer.is_card_start(line)
+        ]
+        middle = card_starts[len(card_starts) // 2]
+
+        with tempfile.TemporaryDirectory() as folder:
+            file_path = os.path.join(folder, "master.fem.gz")
+            with gzip.open(file_path, "wt", encoding="utf-8") as file:
+                file.writelines(lines[:middle])
+                file.write("INCLUDE 'part.fem'\n")
+            with open(os.path.join(folder, "part.fem"), "w", encoding="utf-8") as file:
+                file.writelines(lines[middle:])
+
+            reader = FemFileReader(file_path, 8)
+            parallel_reader = FemFileReader(file_path, 8, workers=2)
+            parallel_reader.create_entities()
+
+        self.assertEqual(parallel_reader.source_paths, reader.source_paths)
+        self.assertEqual(len(parallel_reader.source_paths), 2)
+        self.assertEqual(
+            parallel_reader.bulk_data.grid_ids.tolist(),
+            reader.bulk_data.grid_ids.tolist(),
+        )
+        self.assertEqual(parallel_reader.bulk_data.elements, reader.bulk_data.elements)
+        self.assertEqual(parallel_reader.bulk_data.rigids, reader.bulk_data.rigids)
+
 
 if __name__ == "__main__":
     unittest.main()
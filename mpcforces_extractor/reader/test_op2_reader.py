@@ -0,0 +1,168 @@
+import os
+import struct
+import tempfile
+import unittest
+import numpy as np
+from mpcforces_extractor.force_extractor import MPCForceExtractor, SPCForcesExtractor
+from mpcforces_extractor.reader.op2_reader import OP2Reader, is_op2
+from mpcforces_extractor.datastructure.subcases import Subcase, ForceType
+
+
+def write_op2(file_path, tables, endian="<", split_records=False):
+    """
+    Writes a small OP2 file. tables: (name, [(ident words, node_ids, forces)])
+    ident words: dict of the (1 based) word numbers of the ident record and their values,
+    floats are written as float32
+    """
+
+    def block(data):
+        length = struct.pack(endian + "i", len(data))
+        return length + data + length
+
+    def markers(*values):
+        return b"".join(block(struct.pack(endian + "i", value)) for value in values)
+
+    def record(data):
+        # a split record is continued in a second block
+        if split_records and len(data) > 8:
+            half = len(data) // 8 * 4
+            return (
+                markers(half // 4)
+                + block(data[:half])
+                + markers((len(data) - half) // 4)
+                + block(data[half:])
+            )
+        return markers(len(data) // 4) + block(data)
+
+    content = markers(3) + block(struct.pack(endian + "3i", 10, 18, 24))
+    content += markers(7) + block(b"NASTRAN FORT TAPE ID CODE - ")
+    content += markers(2) + block(b"OPTISTRU") + markers(-1, 0)
+    for name, subtables in tables:
+        content += markers(2) + block(name.ljust(8).encode())
+        content += markers(-1, 7) + block(struct.pack(endian + "7i", *range(7)))
+        content += markers(-2, 1, 0) + record(name.ljust(8).encode() + bytes(8))
+        content += markers(-3, 1, 0)
+        subtable = -3
+        for words, node_ids, forces in subtables:
+            ident = np.zeros(146, dtype=endian + "i4")
+            for number, value in words.items():
+                if isinstance(value, float):
+                    ident[number - 1] = np.array(value, endian + "f4").view(
+                        endian + "i4"
+                    )
+                else:
+                    ident[number - 1] = value
+            rows = np.zeros(
+                len(node_ids),
+                dtype=[
+                    ("ekey", endian + "i4"),
+                    ("grid_type", endian + "i4"),
+                    ("forces", endian + "f4", (6,)),
+                ],
+            )
+            rows["ekey"] = np.array(node_ids) * 10 + 1
+            rows["grid_type"] = 1
+            rows["forces"] = forces
+            subtable -= 1
+            content += record(ident.tobytes()) + markers(subtable, 1, 0)
+            subtable -= 1
+            content += record(rows.tobytes()) + markers(subtable, 1, 0)
+        content += markers(0)
+    content += markers(0)
+    with open(file_path, "wb") as file:
+        file.write(content)
+
+
+def get_ident(subcase_id, table_code, time=None):
+    """
+    Ident words of a real force table, static or transient (time)
+    """
+    analysis_code = 1 if time is None else 6
+    words = {1: analysis_code * 10 + 1, 2: table_code, 4: subcase_id, 9: 1, 10: 8}
+    if time is not None:
+        words[5] = time
+    return words
+
+
+class TestOP2Reader(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.folder.name, "model.op2")
+        self.mpc_forces = {
+            1: [[1.0, 2.0, 3.0, 0.0, 0.0, 0.5], [-1.0, 0.0, 0.0, 0.25, 0.0, 0.0]],
+            2: [[2.0, 4.0, 6.0, 0.0, 0.0, 1.0], [-2.0, 0.0, 0.0, 0.5, 0.0, 0.0]],
+        }
+        self.tables = [
+            ("OUGV1", [(get_ident(1, 1), [1, 2], np.ones((2, 6)))]),
+            (
+                "OQMG1",
+                [
+                    (get_ident(1, 39, 0.5), [10, 20], self.mpc_forces[1]),
+                    (get_ident(2, 39, 1.0), [10, 20], self.mpc_forces[2]),
+                ],
+            ),
+            ("OQG1", [(get_ident(1, 3, 0.5), [30], [[0.0, 0.0, 9.0, 0.0, 0.0, 0.0]])]),
+        ]
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_force_blocks(self):
+        """
+        Test the MPC and SPC force tables of both byte orders and of split records,
+        the other tables are skipped
+        """
+        for endian, split_records in [("<", False), (">", True)]:
+            write_op2(self.file_path, self.tables, endian, split_records)
+            self.assertTrue(is_op2(self.file_path))
+            reader = OP2Reader(self.file_path)
+            blocks = list(reader.iter_force_blocks(ForceType.MPCFORCE))
+            self.assertEqual([block[0] for block in blocks], [1, 2])
+            self.assertEqual([block[1] for block in blocks], [0.5, 1.0])
+            self.assertEqual(blocks[0][2].tolist(), [10, 20])
+            self.assertEqual(blocks[1][3].tolist(), self.mpc_forces[2])
+
+            blocks = list(reader.iter_force_blocks(ForceType.SPCFORCE))
+            self.assertEqual(len(blocks), 1)
+            self.assertEqual(blocks[0][2].tolist(), [30])
+            self.assertEqual(blocks[0][3].tolist(), [[0.0, 0.0, 9.0, 0.0, 0.0, 0.0]])
+
+    def test_selection(self):
+        """
+        Test the selection of subcases and nodes of interest
+        """
+        write_op2(self.file_path, self.tables)
+        reader = OP2Reader(self.file_path, node_ids=[20])
+        blocks = list(reader.iter_force_blocks(ForceType.MPCFORCE, subcase_ids=[2]))
+        self.assertEqual(len(blocks), 1)
+        self.assertEqual(blocks[0][0], 2)
+        self.assertEqual(blocks[0][2].tolist(), [20])
+        self.assertEqual(blocks[0][3].tolist(), [self.mpc_forces[2][1]])
+
+    def test_extractors(self):
+        """
+        Test that the extractors read the OP2 file into the subcases
+        """
+        write_op2(self.file_path, self.tables)
+        Subcase.reset()
+        MPCForceExtractor(self.file_path).build_subcase_data()
+        SPCForcesExtractor(self.file_path).build_subcase_data()
+        self.assertEqual([subcase.subcase_id for subcase in Subcase.subcases], [1, 2])
+        subcase = Subcase.get_subcase_by_id(1)
+        self.assertEqual(subcase.time, 0.5)
+        self.assertEqual(subcase.node_id2mpcforces[10], self.mpc_forces[1][0])
+        self.assertEqual(subcase.node_id2spcforces[30], [0.0, 0.0, 9.0, 0.0, 0.0, 0.0])
+
+    def test_not_op2(self):
+        """
+        Test that an ASCII forces file is not taken for an OP2 file
+        """
+        with open(self.file_path, "w", encoding="utf-8") as file:
+            file.write("$SUBCASE              1\n")
+        self.assertFalse(is_op2(self.file_path))
+        with self.assertRaises(ValueError):
+            OP2Reader(self.file_path)
+
+
+if __name__ == "__main__":
+    unittest.main()
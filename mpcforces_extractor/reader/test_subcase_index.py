@@ -0,0 +1,163 @@
+import mmap
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+from mpcforces_extractor.reader.forces_reader import ForcesReader
+from mpcforces_extractor.reader.subcase_index import SubcaseIndex, count_rows
+from mpcforces_extractor.datastructure.subcases import Subcase, ForceType
+
+
+def get_forces_lines(subcase_ids):
+    """
+    Lines of a .mpcf file with one table per subcase
+    """
+    lines = ["OPTISTRUCT RESULT\n", " \n"]
+    for subcase_id in subcase_ids:
+        lines += [
+            f"$SUBCASE              {subcase_id}\n",
+            f"$TIME       {subcase_id:.8E}\n",
+            " \n",
+            "$MPC FORCE [REAL]\n",
+            "--------+-----------------------------------------------------------------------------\n",
+            "  GRID #   X-FORCE      Y-FORCE      Z-FORCE      X-MOMENT     Y-MOMENT     Z-MOMENT\n",
+            "--------+-----------------------------------------------------------------------------\n",
+            f"       1  {subcase_id:.5E}  1.00000E-00\n",
+            f"       2               {subcase_id:.5E}\n",
+            "--------+-----------------------------------------------------------------------------\n",
+            " \n",
+        ]
+    return lines
+
+
+class TestSubcaseIndex(unittest.TestCase):
+    def setUp(self):
+        self.folder = tempfile.TemporaryDirectory()
+        self.file_path = os.path.join(self.folder.name, "model.mpcf")
+        with open(self.file_path, "w", encoding="utf-8") as file:
+            file.writelines(get_forces_lines([1, 2, 3]))
+
+    def tearDown(self):
+        self.folder.cleanup()
+
+    def test_build(self):
+        """
+        Test the entries of the index and the reuse of the sidecar file
+        """
+        index = SubcaseIndex.open(self.file_path)
+        self.assertTrue(os.path.isfile(self.file_path + ".idx"))
+        self.assertEqual([entry["subcase_id"] for entry in index.entries], [1, 2, 3])
+        self.assertEqual([entry["time"] for entry in index.entries], [1.0, 2.0, 3.0])
+        self.assertEqual([entry["rows"] for entry in index.entries], [2, 2, 2])
+        self.assertEqual(index.entries[0]["first_column_length"], 8)
+
+        with open(self.file_path, "rb") as file:
+            content = file.read()
+        entry = index.entries[1]
+        self.assertTrue(
+            content[entry["start"] : entry["end"]].startswith(b"       1  2.00000E+00")
+        )
+
+        with patch.object(SubcaseIndex, "build") as mock_build:
+            SubcaseIndex.open(self.file_path)
+            mock_build.assert_not_called()
+
+        # the file changed -> the index is rebuilt
+        with open(self.file_path, "a", encoding="utf-8") as file:
+            file.writelines(get_forces_lines([4]))
+        self.assertEqual(len(SubcaseIndex.open(self.file_path).entries), 4)
+
+    def test_count_rows(self):
+        """
+        Test the counting of the non blank lines of a byte range in chunks of the
+        memory map, a line split between two chunks is counted once
+        """
+        with open(self.file_path, "rb") as file:
+            content = file.read()
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as mapped:
+                for chunk_size in [1, 7, 1 << 22]:
+                    with patch.object(SubcaseIndex, "count_chunk_size", chunk_size):
+                        for start, end in [(0, len(content)), (5, 50), (3, 3)]:
+                            self.assertEqual(
+                                count_rows(mapped, start, end),
+                                len(
+                                    [
+                                        line
+                                        for line in content[start:end].split(b"\n")
+                                        if line.strip()
+                                    ]
+                                ),
+                            )
+
+    def test_selected_subcases(self):
+        """
+        Test that reading selected subcases through the index gives the same
+        forces as reading the whole file
+        """
+        Subcase.reset()
+        ForcesReader(self.file_path).build_subcases(ForceType.MPCFORCE)
+        expected = {
+            subcase.subcase_id: (subcase.time, subcase.node_id2mpcforces)
+            for subcase in Subcase.subcases
+        }
+
+        for streaming in [True, False]:
+            Subcase.reset()
+            ForcesReader(self.file_path, streaming=streaming).build_subcases(
+                ForceType.MPCFORCE, subcase_ids=[3, 1]
+            )
+            self.assertEqual(
+                {
+                    subcase.subcase_id: (subcase.time, subcase.node_id2mpcforces)
+                    for subcase in Subcase.subcases
+                },
+                {1: expected[1], 3: expected[3]},
+            )
+
+    def test_parallel_subcases(self):
+        """
+        Test that the parallel per subcase parsing builds the same subcases
+        """
+        Subcase.reset()
+        ForcesReader(self.file_path).build_subcases(ForceType.MPCFORCE)
+        expected = {
+            subcase.subcase_id: (subcase.time, subcase.node_id2mpcforces)
+            for subcase in Subcase.subcases
+        }
+
+        Subcase.reset()
+        reader = ForcesReader(self.file_path, workers=2)
+        self.assertIsNone(reader.file_content)
+        reader.build_subcases(ForceType.MPCFORCE)
+        self.assertEqual(
+            {
+                subcase.subcase_id: (subcase.time, subcase.node_id2mpcforces)
+                for subcase in Subcase.subcases
+            },
+            expected,
+        )
+        self.assertEqual(
+            [subcase.subcase_id for subcase in Subcase.subcases], [1, 2, 3]
+        )
+
+    def test_node_filter(self):
+        """
+        Test that only the forces of the nodes of interest are kept, for the
+        in memory, the streaming and the parallel reading
+        """
+        for streaming, workers in [(False, 1), (True, 1), (False, 2)]:
+            Subcase.reset()
+            reader = ForcesReader(
+                self.file_path, streaming=streaming, workers=workers, node_ids=[2]
+            )
+            reader.build_subcases(ForceType.MPCFORCE)
+            self.assertEqual(reader.node_ids.tolist(), [2])
+            self.assertEqual(
+                [subcase.subcase_id for subcase in Subcase.subcases], [1, 2, 3]
+            )
+            for subcase in Subcase.subcases:
+                self.assertEqual(list(subcase.node_id2mpcforces.keys()), [2])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -11,7 +11,7 @@ class VisualizerConnectedParts:
         """
         This class is used to visualize the connected parts in Hypermesh
         """
-        self.part_id2connected_node_ids = Element.get_part_id2node_ids_graph()
+        self.part_id2connected_node_ids = Element.get_part_id2node_ids()
         self.output_folder = output_folder
         self.part_id2connected_element_ids = {}
         self.commands = []
@@ -46,8 +46,7 @@ class VisualizerConnectedParts:
                 node_id2part_id[node_id] = part_id
 
         for _, element in Element.element_id2element.items():
-            node = element.nodes[0]
-            node_id = node.id
+            node_id = element.node_ids[0]
             part_id = node_id2part_id.get(node_id)
             if part_id is not None:
                 if part_id not in self.part_id2connected_element_ids: